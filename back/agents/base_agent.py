@@ -1,9 +1,22 @@
-from typing import Dict, Any, Optional
-from google.adk import BaseAgent
-from google.adk.models import LiteLlm
+from typing import Dict, Any, Optional, Callable, Awaitable
+from contextlib import contextmanager
+import asyncio
+import inspect
+import json
 import os
+import time
 from dotenv import load_dotenv
 import logging
+from .llm import call_model, stream_model, LLM_TIMEOUT, router, bulk_calls
+from sdlc_common.cache import response_cache, bypass_cache
+from .metrics import AgentMetrics, current_run, approx_tokens
+from sdlc_common.tracing import span
+from sdlc_common.structured import ensure_code_map, parse_code_map
+from .clients import get_model
+from sdlc_common.deadline import DeadlineExceeded, bounded, expired, remaining
+from sdlc_common.ratelimit import scheduler, estimate_tokens, PRIORITY, DEFAULT_PRIORITY
+from sdlc_common.fairshare import fair_share
+from sdlc_common.routing import Accept
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,24 +24,48 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Receives each text delta as it streams from the model
+OnDelta = Callable[[str], Awaitable[None]]
+
+# Rate-limit priority lane of each agent
+LANES = {"planner": "plan", "coder": "code", "tester": "test", "fixer": "fix"}
+
+
+class StreamInterrupted(Exception):
+    """A stream failed after deltas were sent, so it must not be retried."""
+
 class BaseAgent:
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
+        # Per-agent model call timeout, e.g. PLANNER_TIMEOUT=30
+        self.timeout = float(os.getenv(f"{name.upper()}_TIMEOUT", LLM_TIMEOUT))
+        self.metrics = AgentMetrics(name)
+        self.stage = LANES.get(name)
+        self.priority = PRIORITY.get(self.stage, DEFAULT_PRIORITY)
         
-        # Log API key configuration
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            logger.error("GEMINI_API_KEY environment variable not found")
-            raise ValueError("GEMINI_API_KEY environment variable not found")
-        
-        try:
-            # Initialize LiteLlm model
-            self.model = LiteLlm(api_key=api_key, model_name='gemini-2.0-flash')
-            self.status = "idle"
-        except Exception as e:
-            logger.error(f"Failed to initialize model: {str(e)}")
-            raise
+        # The model clients are shared and only built on first use; routed
+        # calls pick a model tier per call, the others use model_name
+        self.model_name = 'gemini-2.0-flash'
+        self._model = None
+
+    @property
+    def model(self):
+        return self.client(self.model_name)
+
+    def client(self, model_name: str):
+        if self._model is None:
+            try:
+                return get_model(model_name)
+            except Exception as e:
+                logger.error(f"Failed to initialize model: {str(e)}")
+                raise
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        # Lets tests and benchmarks swap in a fake or recorded model
+        self._model = model
 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process input data and return results."""
@@ -38,36 +75,149 @@ class BaseAgent:
         return {
             "name": self.name,
             "description": self.description,
-            "status": self.status
+            "status": "working" if self.metrics.in_flight else "idle",
+            **self.metrics.snapshot()
         }
 
-    async def generate_response(self, prompt: str, context: Dict[str, Any] = None) -> str:
-        """Generate response using Gemini model."""
+    @contextmanager
+    def track(self):
+        """Record one call of this agent in its metrics, the current run state and a span."""
+        run = current_run.get()
+        if run is not None:
+            run[self.name] = "working"
+        self.metrics.in_flight += 1
+        started = time.perf_counter()
+        ok = False
         try:
-            logger.info(f"Generating response for prompt: {prompt[:100]}...")
-            logger.info(f"Context: {context}")
-            
-            # Prepare the prompt
-            full_prompt = f"{context}\n\n{prompt}" if context else prompt
-            
-            # Get the chat object from the model
-            chat = self.model
-            logger.info("Got chat object")
-            
-            # Send the message
-            response = chat.generate_text(full_prompt)
-            logger.info("Message sent")
-            
-            # Get the text from the response
-            if hasattr(response, 'text'):
-                text = response.text()
-                logger.info(f"Got response text: {text[:100]}...")
+            with span(f"agent.{self.name}"):
+                yield
+            ok = True
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.observe(time.perf_counter() - started, ok)
+            if run is not None:
+                run[self.name] = "success" if ok else "failure"
+
+    async def generate_response(self, prompt: str, context: Dict[str, Any] = None,
+                                timeout: Optional[float] = None, use_cache: bool = True,
+                                on_delta: Optional[OnDelta] = None, model_name: Optional[str] = None,
+                                cache_result: bool = True) -> str:
+        """Generate response using Gemini model; ``cache_result`` off leaves the cache to the caller."""
+        # Prepare the prompt
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        prompt_tokens = approx_tokens(full_prompt)
+        model_name = model_name or self.model_name
+        with span("llm.call", agent=self.name, model=model_name, prompt_tokens=prompt_tokens) as trace:
+            try:
+                use_cache = use_cache and not bypass_cache.get()
+                key = response_cache.make_key(model_name, full_prompt)
+                if use_cache:
+                    cached = await response_cache.aget(key)
+                    if cached is not None:
+                        logger.debug("Serving %s response from cache", self.name)
+                        trace.set(cache_hit=True)
+                        self.metrics.record_llm(model_name, prompt_tokens, 0, cached=True)
+                        if on_delta is not None:
+                            await on_delta(cached)
+                        return cached
+
+                # Send the message without blocking the event loop, within the request deadline
+                timeout = bounded(self.timeout if timeout is None else timeout)
+                model = self.client(model_name)
+                if on_delta is None:
+                    async def call():
+                        return await call_model(model, full_prompt, timeout=timeout, metrics=self.metrics)
+                else:
+                    async def call():
+                        parts = []
+                        try:
+                            async for delta in stream_model(model, full_prompt, timeout=timeout,
+                                                            metrics=self.metrics):
+                                parts.append(delta)
+                                await on_delta(delta)
+                        except Exception as e:
+                            if parts:
+                                raise StreamInterrupted("Model stream failed after output was sent") from e
+                            raise
+                        return "".join(parts)
+                estimated = estimate_tokens(full_prompt)
+
+                async def limited():
+                    return await scheduler.run(model_name, call, estimated, self.priority)
+                # The tenant's turn comes first, except for batch calls: those are
+                # grouped into bulk requests that hold one model slot each
+                admitted = limited() if bulk_calls.get() else fair_share.run(limited, estimated)
+                try:
+                    # The deadline also bounds fair-share and rate-limit waits and retries
+                    text = await asyncio.wait_for(admitted, remaining())
+                except asyncio.TimeoutError as e:
+                    if expired():
+                        raise DeadlineExceeded(f"Request deadline exceeded during {self.name} model call") from e
+                    raise
+                completion_tokens = approx_tokens(text)
+                fair_share.record_usage(estimated, prompt_tokens + completion_tokens)
+                trace.set(cache_hit=False, completion_tokens=completion_tokens)
+                self.metrics.record_llm(model_name, prompt_tokens, completion_tokens, cached=False)
+                if use_cache and cache_result:
+                    response_cache.set(key, text)
                 return text
-            
-            logger.error("Response object does not have text attribute")
-            raise ValueError("Invalid response format from Gemini API")
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {str(e)}")
-            logger.error(f"Full error: {str(e)}")
-            raise
+
+            except Exception as e:
+                logger.error(f"Error generating response: {str(e)}")
+                raise
+
+    async def generate_routed(self, prompt: str, accept: Optional[Accept] = None,
+                              on_delta: Optional[OnDelta] = None) -> str:
+        """Generate a response on this agent's model tiers, cheapest first.
+
+        Only the last tier tried streams its deltas; the output of an earlier
+        tier may still be rejected, so it is sent in one piece once accepted.
+        Likewise only an accepted output is cached, so a cache hit never skips
+        the escalation a rejected output would have caused.
+        """
+        streamed = False
+        outcome = {}
+
+        async def attempt(model_name: str, final: bool) -> str:
+            nonlocal streamed
+            streamed = final and on_delta is not None
+            outcome["model"] = model_name
+            return await self.generate_response(prompt, on_delta=on_delta if final else None,
+                                                model_name=model_name, cache_result=False)
+
+        async def check(text: str) -> bool:
+            ok = True if accept is None else accept(text)
+            if inspect.isawaitable(ok):
+                ok = await ok
+            outcome["accepted"] = ok
+            return ok
+
+        text = await router.run(self.stage, attempt, check)
+        if outcome.get("accepted") and not bypass_cache.get():
+            response_cache.set(response_cache.make_key(outcome["model"], prompt), text)
+        if on_delta is not None and not streamed:
+            await on_delta(text)
+        return text
+
+    async def generate_code_map(self, prompt: str, on_delta: Optional[OnDelta] = None,
+                                accept: Optional[Callable[[str], Awaitable[bool]]] = None) -> str:
+        """Generate a filename -> code JSON, repairing it or re-asking once if malformed.
+
+        A cheap tier's output is only accepted if it parses (and passes
+        ``accept``, given the JSON); otherwise the next tier is tried.
+        """
+        async def valid(text: str) -> bool:
+            files = parse_code_map(text)
+            return bool(files) and (accept is None or await accept(json.dumps(files)))
+
+        response = await self.generate_routed(prompt, valid, on_delta=on_delta)
+
+        async def reask(correction: str) -> str:
+            return await self.generate_response(f"{prompt}\n\n{correction}",
+                                                model_name=router.tiers(self.stage)[-1])
+
+        files = await ensure_code_map(response, reask)
+        if files is None:
+            logger.error("Model did not return a valid filename -> code JSON")
+            return response
+        return json.dumps(files)
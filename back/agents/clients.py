@@ -0,0 +1,91 @@
+"""Process-wide registry of model clients.
+
+Clients are built lazily on first use and shared by every agent using the
+same model, so importing the app stays cheap and connections (and their
+TLS handshakes) are pooled instead of paid per agent.
+"""
+from typing import Any, Dict
+import asyncio
+import logging
+import os
+import threading
+from sdlc_common import replay
+from .llm import AdkTextModel
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive pool shared by all provider calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "20"))
+# Endpoint contacted by warm_up() to open a pooled connection early
+WARM_UP_URL = os.getenv("WARM_UP_URL", "https://generativelanguage.googleapis.com/")
+
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+_http_ready = False
+
+
+def _configure_http_pool() -> None:
+    """Install shared keep-alive HTTP clients for litellm."""
+    global _http_ready
+    if _http_ready:
+        return
+    import httpx
+    import litellm
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS
+    )
+    litellm.client_session = httpx.Client(limits=limits)
+    litellm.aclient_session = httpx.AsyncClient(limits=limits)
+    _http_ready = True
+
+
+def litellm_model(model_name: str) -> str:
+    """The litellm name of ``model_name``: bare model names are Gemini models."""
+    return model_name if "/" in model_name else f"gemini/{model_name}"
+
+
+def get_model(model_name: str) -> Any:
+    """Return the shared client for ``model_name``, building it on first use."""
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    with _lock:
+        if model_name not in _models and replay.LLM_REPLAY == "replay":
+            # Offline: serve recorded responses, no provider or API key needed
+            _models[model_name] = replay.ReplayModel(replay.fixtures(), model_name, replay.LLM_REPLAY_SPEED)
+        if model_name not in _models:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                logger.error("GEMINI_API_KEY environment variable not found")
+                raise ValueError("GEMINI_API_KEY environment variable not found")
+            from google.adk.models import LiteLlm
+
+            _configure_http_pool()
+            model = AdkTextModel(LiteLlm(model=litellm_model(model_name), api_key=api_key))
+            if replay.LLM_REPLAY == "record":
+                model = replay.RecordingModel(model, replay.fixtures(), model_name)
+            _models[model_name] = model
+        return _models[model_name]
+
+
+async def warm_up(model_names) -> None:
+    """Build the clients for ``model_names`` and open a pooled connection.
+
+    Failures are logged, not raised: the app still starts, and the first
+    call that needs a missing client reports the error.
+    """
+    loop = asyncio.get_running_loop()
+    for model_name in set(model_names):
+        try:
+            await loop.run_in_executor(None, get_model, model_name)
+        except Exception as e:
+            logger.warning(f"Could not build the {model_name} client during warm-up: {str(e)}")
+    try:
+        import litellm
+
+        await litellm.aclient_session.head(WARM_UP_URL, timeout=5)
+    except Exception as e:
+        logger.warning(f"Connection warm-up failed: {str(e)}")
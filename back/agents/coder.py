@@ -1,6 +1,8 @@
 from typing import Dict, Any
 from .base_agent import BaseAgent
-from google.adk import AgentContext
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CoderAgent(BaseAgent):
     def __init__(self):
@@ -21,26 +23,29 @@ class CoderAgent(BaseAgent):
             4. Add appropriate comments
             5. Structure the code for maintainability
             
-            Return the complete implementation in JSON format with clear sections."""
+            Return the complete implementation as a JSON object mapping each filename
+            to the full code of that file. Respond with only the JSON."""
 
-    async def process(self, context: AgentContext) -> Dict[str, Any]:
-        self.status = "working"
-        try:
-            plan = context.input.get("plan")
-            if not plan:
-                raise ValueError("plan is required")
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        with self.track():
+            try:
+                plan = input_data.get("plan")
+                if not plan:
+                    raise ValueError("plan is required")
                 
-            prompt = self.prompt.format(plan=plan)
-            logger.info(f"Generating code for plan: {plan[:50]}...")
-            response = await self.model.generate_text(prompt)
+                prompt = self.prompt.format(plan=plan)
+                candidate = input_data.get("candidate", 0)
+                if candidate:
+                    # A distinct prompt, so speculative candidates are not served the same cached answer
+                    prompt += f"\n\nThis is alternative implementation #{candidate + 1}; take an independent approach."
+                logger.debug("Generating code for a %d-char plan", len(plan))
+                response = await self.generate_code_map(prompt, on_delta=input_data.get("on_delta"))
             
-            # Ensure we return a dictionary with the code
-            if isinstance(response, str):
-                return {"code": response}
+                # Ensure we return a dictionary with the code
+                if isinstance(response, str):
+                    return {"code": response}
             
-            self.status = "success"
-            return response
-        except Exception as e:
-            logger.error(f"Error in coder process: {str(e)}")
-            self.status = "failure"
-            raise e
+                return response
+            except Exception as e:
+                logger.error(f"Error in coder process: {str(e)}")
+                raise e
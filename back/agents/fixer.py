@@ -1,5 +1,8 @@
 from typing import Dict, Any
 from .base_agent import BaseAgent
+import logging
+
+logger = logging.getLogger(__name__)
 
 class FixerAgent(BaseAgent):
     def __init__(self):
@@ -22,31 +25,32 @@ class FixerAgent(BaseAgent):
             4. Add necessary comments
             5. Ensure all requirements are met
             
-            Return the fixed code in JSON format with clear sections."""
+            Return the fixed code as a JSON object mapping each filename to the full
+            code of that file. Respond with only the JSON."""
 
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        self.status = "working"
-        try:
-            code = input_data.get("code")
-            test_results = input_data.get("test_results")
+        with self.track():
+            try:
+                code = input_data.get("code")
+                test_results = input_data.get("test_results")
             
-            if not code or not test_results:
-                raise ValueError("Both code and test_results are required")
+                if not code or not test_results:
+                    raise ValueError("Both code and test_results are required")
                 
-            context = {
-                "code": code,
-                "test_results": test_results
-            }
-            prompt = self.prompt.format(**context)
-            response = await self.generate_response(prompt)
+                context = {
+                    "code": code,
+                    "test_results": test_results
+                }
+                prompt = self.prompt.format(**context)
+                # e.g. a sandbox run: fixed code that still fails moves up a tier
+                response = await self.generate_code_map(prompt, on_delta=input_data.get("on_delta"),
+                                                        accept=input_data.get("accept"))
             
-            # Ensure we return a dictionary with the fixed code
-            if isinstance(response, str):
-                return {"code": response}
+                # Ensure we return a dictionary with the fixed code
+                if isinstance(response, str):
+                    return {"code": response}
             
-            self.status = "success"
-            return response
-        except Exception as e:
-            logger.error(f"Error in fixer process: {str(e)}")
-            self.status = "failure"
-            raise e
+                return response
+            except Exception as e:
+                logger.error(f"Error in fixer process: {str(e)}")
+                raise e
@@ -0,0 +1,264 @@
+"""Async model-call layer shared by all agents.
+
+Model clients that expose a coroutine (``generate_text_async``) are awaited
+natively. Blocking clients are offloaded to a bounded thread pool so a slow
+provider call never stalls the event loop. ADK models (``LiteLlm`` and other
+``BaseLlm`` classes, which only offer ``generate_content_async``) are used
+through ``AdkTextModel``, which gives them that text-in, text-out interface.
+
+In batch runs, prompts sent to the same model at about the same time are
+grouped into one bulk request when the client supports it
+(``generate_batch_async`` or ``generate_batch``: a list of prompts in, a
+list of responses or exceptions out, in the same order).
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import os
+import logging
+import time
+from sdlc_common.loops import per_loop
+from sdlc_common.routing import ModelRouter, load_policy
+from sdlc_common.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Default per-call timeout in seconds, overridable per call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Maximum number of blocking model calls running at once
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "16"))
+# Prompts for one model arriving within this many seconds share a bulk request
+BULK_WINDOW = float(os.getenv("BULK_WINDOW", "0.05"))
+# Maximum number of prompts per bulk request
+BULK_MAX_SIZE = int(os.getenv("BULK_MAX_SIZE", "50"))
+
+# Model tiers per stage, cheapest first; MODEL_ROUTING overrides them. Reviews
+# decide whether code passes, so the tester stays on the stronger model.
+DEFAULT_TIERS = {
+    "plan": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+    "code": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+    "test": ["gemini-2.0-flash"],
+    "fix": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+}
+router = ModelRouter(load_policy(os.getenv("MODEL_ROUTING", ""), DEFAULT_TIERS))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+_slots = per_loop(lambda: asyncio.Semaphore(LLM_MAX_WORKERS))
+
+# Set for batch runs: their model calls may be grouped into bulk requests
+bulk_calls: ContextVar[bool] = ContextVar("bulk_calls", default=False)
+
+
+def response_text(response: Any) -> str:
+    """Extract the text from a model response object."""
+    if isinstance(response, str):
+        return response
+    text = getattr(response, "text", None)
+    if callable(text):
+        text = text()
+    if isinstance(text, str):
+        return text
+    raise ValueError("Invalid response format from model")
+
+
+@asynccontextmanager
+async def _slot(metrics: Any = None):
+    """Hold one of the bounded model-call slots, counting callers that wait."""
+    if metrics is not None:
+        metrics.queued += 1
+    started = time.perf_counter()
+    slots = _slots()
+    try:
+        await slots.acquire()
+    finally:
+        if metrics is not None:
+            metrics.queued -= 1
+    current_span().add("queue_wait_s", time.perf_counter() - started)
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+class _Bulk:
+    """Prompts waiting to be sent to one model as a single bulk request."""
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.sending = set()
+        self.requests = 0
+        self.prompts = 0
+
+    def submit(self, prompt: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((prompt, future))
+        if len(self.pending) >= BULK_MAX_SIZE:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(BULK_WINDOW, self.flush)
+        return future
+
+    def flush(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        group, self.pending = self.pending, []
+        if group:
+            task = asyncio.ensure_future(self._send(group))
+            self.sending.add(task)
+            task.add_done_callback(self.sending.discard)
+
+    async def _send(self, group: List[Tuple[str, asyncio.Future]]) -> None:
+        self.requests += 1
+        self.prompts += len(group)
+        prompts = [prompt for prompt, _ in group]
+        try:
+            async_batch = getattr(self.model, "generate_batch_async", None)
+            if async_batch is not None:
+                responses = await async_batch(prompts)
+            else:
+                async with _slot():
+                    loop = asyncio.get_running_loop()
+                    responses = await loop.run_in_executor(_executor, self.model.generate_batch, prompts)
+            if len(responses) != len(group):
+                raise ValueError(f"Bulk request returned {len(responses)} responses for {len(group)} prompts")
+        except Exception as e:
+            logger.error(f"Bulk model request failed: {str(e)}")
+            responses = [e] * len(group)
+        for (_, future), response in zip(group, responses):
+            # Callers that timed out or were cancelled have already left
+            if future.done():
+                continue
+            if isinstance(response, Exception):
+                future.set_exception(response)
+            else:
+                future.set_result(response)
+
+
+_bulks: Dict[int, _Bulk] = {}
+
+
+def bulk_stats() -> Dict[str, Any]:
+    requests = sum(bulk.requests for bulk in _bulks.values())
+    prompts = sum(bulk.prompts for bulk in _bulks.values())
+    return {
+        "requests": requests,
+        "prompts": prompts,
+        "mean_size": prompts / requests if requests else 0.0
+    }
+
+
+async def call_model(model: Any, prompt: str, timeout: Optional[float] = None, metrics: Any = None) -> str:
+    """Call ``model`` with ``prompt`` without blocking the event loop."""
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+
+    if bulk_calls.get() and (hasattr(model, "generate_batch_async") or hasattr(model, "generate_batch")):
+        bulk = _bulks.get(id(model))
+        if bulk is None or bulk.model is not model:
+            bulk = _bulks[id(model)] = _Bulk(model)
+        response = await asyncio.wait_for(bulk.submit(prompt), timeout)
+        return response_text(response)
+
+    async_generate = getattr(model, "generate_text_async", None)
+    if async_generate is not None:
+        response = await asyncio.wait_for(async_generate(prompt), timeout)
+        return response_text(response)
+
+    async with _slot(metrics):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_executor, model.generate_text, prompt)
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Model call timed out after {timeout}s")
+            raise
+    return response_text(response)
+
+
+class AdkTextModel:
+    """Text-in, text-out client over an ADK model's ``generate_content_async``."""
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    def _request(self, prompt: str) -> Any:
+        from google.adk.models.llm_request import LlmRequest
+        from google.genai import types
+
+        return LlmRequest(
+            model=self.llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])]
+        )
+
+    @staticmethod
+    def _text(response: Any) -> str:
+        if getattr(response, "error_code", None):
+            raise ValueError(f"Model call failed ({response.error_code}): {response.error_message}")
+        parts = response.content.parts if response.content is not None else None
+        return "".join(part.text or "" for part in parts or [] if not part.thought)
+
+    async def generate_text_async(self, prompt: str) -> str:
+        parts = []
+        async for response in self.llm.generate_content_async(self._request(prompt), stream=False):
+            parts.append(self._text(response))
+        return "".join(parts)
+
+    async def stream_text_async(self, prompt: str) -> AsyncIterator[str]:
+        streamed = False
+        async for response in self.llm.generate_content_async(self._request(prompt), stream=True):
+            # Partial responses carry the deltas; the final one repeats the
+            # whole text and is only used when nothing was streamed
+            if response.partial:
+                streamed = True
+                yield self._text(response)
+            elif not streamed:
+                yield self._text(response)
+
+
+_DONE = object()
+
+
+async def stream_model(model: Any, prompt: str, timeout: Optional[float] = None,
+                       metrics: Any = None) -> AsyncIterator[str]:
+    """Yield text deltas from ``model`` as they arrive.
+
+    Uses ``stream_text_async`` or ``stream_text`` when the client provides
+    them and falls back to a single delta holding the whole response.
+    The timeout applies to the stream as a whole.
+    """
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    async_stream = getattr(model, "stream_text_async", None)
+    if async_stream is not None:
+        chunks = async_stream(prompt).__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), deadline - loop.time())
+            except StopAsyncIteration:
+                return
+            yield response_text(chunk)
+
+    if not hasattr(model, "stream_text"):
+        yield await call_model(model, prompt, timeout=timeout, metrics=metrics)
+        return
+
+    async with _slot(metrics):
+        chunks = await asyncio.wait_for(
+            loop.run_in_executor(_executor, lambda: iter(model.stream_text(prompt))),
+            deadline - loop.time()
+        )
+        while True:
+            chunk = await asyncio.wait_for(
+                loop.run_in_executor(_executor, next, chunks, _DONE),
+                deadline - loop.time()
+            )
+            if chunk is _DONE:
+                return
+            yield response_text(chunk)
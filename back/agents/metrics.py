@@ -0,0 +1,176 @@
+"""Live per-agent metrics and per-run agent state.
+
+All counters are updated from the event loop thread only, so the hot path
+is plain integer arithmetic without locks.
+"""
+from typing import Dict, Any, Optional
+from collections import deque
+from contextvars import ContextVar
+import json
+import math
+import os
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, math.inf)
+# Number of recent calls kept for the rolling percentiles
+ROLLING_WINDOW = 1000
+
+# USD per million (prompt, completion) tokens, e.g. MODEL_PRICES='{"gemini-2.0-flash": [0.1, 0.4]}'
+MODEL_PRICES = {"gemini-2.0-flash": (0.10, 0.40), "gemini-2.0-flash-lite": (0.075, 0.30), **json.loads(os.getenv("MODEL_PRICES", "{}"))}
+
+# Agent name -> status for the pipeline run executing in the current task
+current_run: ContextVar[Optional[Dict[str, str]]] = ContextVar("current_run", default=None)
+# Run id -> agent state of every pipeline run in progress
+active_runs: Dict[str, Dict[str, str]] = {}
+
+
+class AgentMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.recent = deque(maxlen=ROLLING_WINDOW)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.cost = 0.0
+
+    def observe(self, duration: float, ok: bool) -> None:
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.latency_sum += duration
+        self.recent.append(duration)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+                break
+
+    def record_llm(self, model: str, prompt_tokens: int, completion_tokens: int, cached: bool) -> None:
+        """Account one model call; cached calls cost no tokens."""
+        if cached:
+            self.cache_hits += 1
+            return
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        self.cost += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency_p50": self.percentile(50),
+            "latency_p95": self.percentile(95),
+            "latency_p99": self.percentile(99),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hits": self.cache_hits,
+            "cost_usd": round(self.cost, 6)
+        }
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1 if text else 0
+
+
+def render_prometheus(metrics) -> str:
+    """Render agent metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP agent_in_flight Agent calls currently running.",
+        "# TYPE agent_in_flight gauge"
+    ]
+    lines += [f'agent_in_flight{{agent="{m.name}"}} {m.in_flight}' for m in metrics]
+    lines += [
+        "# HELP agent_queue_depth Agent calls waiting for a model slot.",
+        "# TYPE agent_queue_depth gauge"
+    ]
+    lines += [f'agent_queue_depth{{agent="{m.name}"}} {m.queued}' for m in metrics]
+    lines += [
+        "# HELP agent_calls_total Finished agent calls by outcome.",
+        "# TYPE agent_calls_total counter"
+    ]
+    for m in metrics:
+        lines.append(f'agent_calls_total{{agent="{m.name}",outcome="success"}} {m.completed}')
+        lines.append(f'agent_calls_total{{agent="{m.name}",outcome="failure"}} {m.failed}')
+    lines += [
+        "# HELP agent_latency_seconds Agent call latency.",
+        "# TYPE agent_latency_seconds histogram"
+    ]
+    for m in metrics:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else bound
+            lines.append(f'agent_latency_seconds_bucket{{agent="{m.name}",le="{le}"}} {cumulative}')
+        lines.append(f'agent_latency_seconds_sum{{agent="{m.name}"}} {m.latency_sum}')
+        lines.append(f'agent_latency_seconds_count{{agent="{m.name}"}} {cumulative}')
+    lines += [
+        "# HELP agent_tokens_total Model tokens spent by agent.",
+        "# TYPE agent_tokens_total counter"
+    ]
+    for m in metrics:
+        lines.append(f'agent_tokens_total{{agent="{m.name}",kind="prompt"}} {m.prompt_tokens}')
+        lines.append(f'agent_tokens_total{{agent="{m.name}",kind="completion"}} {m.completion_tokens}')
+    lines += [
+        "# HELP agent_cache_hits_total Model calls answered from the response cache.",
+        "# TYPE agent_cache_hits_total counter"
+    ]
+    lines += [f'agent_cache_hits_total{{agent="{m.name}"}} {m.cache_hits}' for m in metrics]
+    lines += [
+        "# HELP agent_cost_usd_total Estimated model spend in USD.",
+        "# TYPE agent_cost_usd_total counter"
+    ]
+    lines += [f'agent_cost_usd_total{{agent="{m.name}"}} {m.cost}' for m in metrics]
+    return "\n".join(lines) + "\n"
+
+
+def label_value(value: str) -> str:
+    """Escape a Prometheus label value: backslash, double quote and newline."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_fair_share(stats: Dict[str, Any]) -> str:
+    """Render per-tenant fair-share queue metrics in the Prometheus text format."""
+    # Tenant names come from configuration, but are escaped like any label value
+    tenants = {label_value(name): t for name, t in stats["tenants"].items()}
+    lines = [
+        "# HELP tenant_queue_wait_seconds Time model calls waited for their tenant's fair share.",
+        "# TYPE tenant_queue_wait_seconds summary"
+    ]
+    for name, t in tenants.items():
+        for quantile, key in (("0.5", "wait_p50"), ("0.95", "wait_p95"), ("0.99", "wait_p99")):
+            if t[key] is not None:
+                lines.append(f'tenant_queue_wait_seconds{{tenant="{name}",quantile="{quantile}"}} {t[key]}')
+        lines.append(f'tenant_queue_wait_seconds_sum{{tenant="{name}"}} {t["wait_sum"]}')
+        lines.append(f'tenant_queue_wait_seconds_count{{tenant="{name}"}} {t["admitted"]}')
+    lines += [
+        "# HELP tenant_queued Model calls waiting for their tenant's fair share.",
+        "# TYPE tenant_queued gauge"
+    ]
+    lines += [f'tenant_queued{{tenant="{name}"}} {t["queued"]}' for name, t in tenants.items()]
+    lines += [
+        "# HELP tenant_running Model calls admitted and running per tenant.",
+        "# TYPE tenant_running gauge"
+    ]
+    lines += [f'tenant_running{{tenant="{name}"}} {t["running"]}' for name, t in tenants.items()]
+    lines += [
+        "# HELP tenant_tokens_total Model tokens charged to each tenant.",
+        "# TYPE tenant_tokens_total counter"
+    ]
+    lines += [f'tenant_tokens_total{{tenant="{name}"}} {t["tokens_used"]}' for name, t in tenants.items()]
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,10 @@
-from typing import Dict, Any
-from .base_agent import BaseAgent
-from google.adk import AgentContext
+from typing import Dict, Any, Optional
+from .base_agent import BaseAgent, OnDelta
+from sdlc_common.cache import bypass_cache
+from sdlc_common.semantic_cache import semantic_cache
+from sdlc_common.tracing import current_span
+from sdlc_common.structured import extract_json, repair_json
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -27,32 +31,47 @@ class PlannerAgent(BaseAgent):
             
             Return the plan in JSON format with clear sections."""
 
-    async def process(self, context: AgentContext) -> Dict[str, Any]:
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process the task description and create a plan."""
-        task_description = context.input.get("task_description")
+        task_description = input_data.get("task_description")
         if not task_description:
             raise ValueError("task_description is required")
             
         # Get the plan as a string
-        plan_str = await self.create_plan(task_description)
+        plan_str = await self.create_plan(task_description, on_delta=input_data.get("on_delta"))
         
         # Return as a dictionary
         return {
             "plan": plan_str
         }
 
-    async def create_plan(self, task_description: str) -> str:
+    async def create_plan(self, task_description: str, on_delta: Optional[OnDelta] = None) -> str:
         """Create a detailed implementation plan for a task."""
-        self.status = "working"
+        with self.track():
+            try:
+                logger.debug("Generating plan for a %d-char task", len(task_description))
+                use_cache = not bypass_cache.get()
+                hit = semantic_cache.lookup(task_description) if use_cache else None
+                if hit is not None and "plan" in hit:
+                    logger.debug("Reusing plan of a near-duplicate task (similarity %.2f)", hit["similarity"])
+                    current_span().set(semantic_cache_hit=True, similarity=hit["similarity"])
+                    if on_delta is not None:
+                        await on_delta(hit["plan"])
+                    return hit["plan"]
+                prompt = self.prompt.format(task_description=task_description)
+                response = await self.generate_routed(prompt, self.is_plan, on_delta=on_delta)
+                if use_cache:
+                    semantic_cache.update(task_description, plan=response)
+                return response
+            except Exception as e:
+                logger.error(f"Error in create_plan: {str(e)}")
+                raise e
+
+    @staticmethod
+    def is_plan(text: str) -> bool:
+        """Whether ``text`` is the sectioned JSON plan the prompt asks for."""
         try:
-            logger.info(f"Generating plan for task: {task_description[:50]}...")
-            prompt = self.prompt.format(task_description=task_description)
-            logger.info(f"Prompt: {prompt[:100]}...")
-            response = await self.model.generate_text(prompt)
-            logger.info(f"Got response: {response[:100]}...")
-            self.status = "success"
-            return response
-        except Exception as e:
-            logger.error(f"Error in create_plan: {str(e)}")
-            self.status = "failure"
-            raise e
+            plan = json.loads(repair_json(extract_json(text)))
+        except ValueError:
+            return False
+        return isinstance(plan, dict) and len(plan) >= 3
@@ -1,6 +1,24 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .base_agent import BaseAgent
-from google.adk import AgentContext
+from sdlc_common import sandbox
+from sdlc_common.structured import parse_code_map
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Execute the code locally before asking the LLM for a review
+SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "1") == "1"
+# Review multi-file code as concurrent per-file chunks (map-reduce)
+TESTER_FANOUT = os.getenv("TESTER_FANOUT", "1") == "1"
+# Maximum number of chunk reviews running at once
+TESTER_CONCURRENCY = int(os.getenv("TESTER_CONCURRENCY", "4"))
+
+def is_test_file(name: str) -> bool:
+    base = os.path.basename(name)
+    return base.endswith(".py") and (base.startswith("test_") or base.endswith("_test.py"))
 
 class TesterAgent(BaseAgent):
     def __init__(self):
@@ -23,36 +41,127 @@ class TesterAgent(BaseAgent):
             
             Return the test results in JSON format with clear sections."""
 
-    async def process(self, context: AgentContext) -> Dict[str, Any]:
-        self.status = "working"
-        try:
-            code = context.input.get("code")
-            if not code:
-                raise ValueError("code is required")
+        self.tests_prompt = """You are an expert software tester.
+            Write pytest test files for the following plan, before the code exists:
+
+            Plan: {plan}
+
+            Please:
+            1. Import the modules using the file names given in the plan
+            2. Test the public behaviour the plan requires
+            3. Include edge cases and error conditions
+            4. Name every file test_<module>.py
+
+            Return a JSON object mapping each test filename to its code. Respond with only the JSON."""
+
+    async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        with self.track():
+            try:
+                code = input_data.get("code")
+                if not code:
+                    raise ValueError("code is required")
                 
-            prompt = self.prompt.format(code=code)
-            logger.info(f"Generating tests for code: {code[:50]}...")
-            response = await self.model.generate_text(prompt)
+                logger.debug("Testing %d chars of code", len(code))
+                files = self.parse_files(code)
+                if files and SANDBOX_ENABLED:
+                    # Syntax, import and test failures are reported without an LLM call
+                    execution = await self.execute(files, input_data.get("tests") or {})
+                    if any(f["kind"] in ("syntax", "import", "test") for f in execution["failures"]):
+                        return {
+                            "status": "failure",
+                            "results": sandbox.format_report(execution),
+                            "execution": execution
+                        }
+
+                chunks = self.split_code(code) if TESTER_FANOUT else {}
+                if len(chunks) < 2:
+                    prompt = self.prompt.format(code=code)
+                    response = await self.generate_routed(prompt, on_delta=input_data.get("on_delta"))
+                else:
+                    response = await self.review_chunks(chunks)
             
-            # Ensure we return a dictionary with proper status
-            if isinstance(response, str):
-                # If we get a string response, create a dictionary
-                return {
-                    "status": "success",
-                    "results": response
-                }
+                # Ensure we return a dictionary with proper status
+                if isinstance(response, str):
+                    # If we get a string response, create a dictionary
+                    return {
+                        "status": "success",
+                        "results": response
+                    }
             
-            # If we already have a dictionary, ensure it has the right structure
-            if not isinstance(response, dict):
-                raise ValueError("Invalid response format")
+                # If we already have a dictionary, ensure it has the right structure
+                if not isinstance(response, dict):
+                    raise ValueError("Invalid response format")
                 
-            # Ensure status is set
-            if "status" not in response:
-                response["status"] = "success"
+                # Ensure status is set
+                if "status" not in response:
+                    response["status"] = "success"
             
-            self.status = response["status"]
-            return response
-        except Exception as e:
-            logger.error(f"Error in tester process: {str(e)}")
-            self.status = "failure"
-            raise e
+                return response
+            except Exception as e:
+                logger.error(f"Error in tester process: {str(e)}")
+                raise e
+
+    async def generate_tests(self, plan: str, on_delta=None) -> Dict[str, str]:
+        """Generate pytest files from the plan alone, so it can run alongside coding."""
+        with self.track():
+            response = await self.generate_code_map(self.tests_prompt.format(plan=plan), on_delta=on_delta)
+            files = self.parse_files(response)
+            return {name: source for name, source in files.items() if is_test_file(name)}
+
+    async def execute(self, files: Dict[str, str], tests: Dict[str, str]) -> Dict[str, Any]:
+        """Run the code in the sandbox together with plan-derived tests.
+
+        The tests were written before the code, so if they cannot even be
+        collected (e.g. they guessed a module name wrong) they are dropped.
+        """
+        if not tests:
+            return await sandbox.execute(files)
+        execution = await sandbox.execute({**tests, **files})
+        if execution["failures"] and all(
+            f["kind"] == "test" and f["file"] is None and "ERROR collecting" in f["message"]
+            for f in execution["failures"]
+        ):
+            logger.info("Plan-derived tests could not be collected; running without them")
+            execution = await sandbox.execute(files)
+        return execution
+
+    async def passes(self, code: str, tests: Dict[str, str]) -> bool:
+        """Cheap sandbox-only check used to pick between coder candidates."""
+        files = self.parse_files(code)
+        if not files:
+            return False
+        if not SANDBOX_ENABLED:
+            return True
+        # Code the sandbox could not isolate (status "skipped") is not held against it
+        return (await self.execute(files, tests))["status"] != "failed"
+
+    def parse_files(self, code: str) -> Dict[str, str]:
+        """Parse a filename -> code JSON, returning {} for anything else."""
+        return parse_code_map(code) or {}
+
+    def split_code(self, code: str) -> Dict[str, str]:
+        """Split a filename -> code JSON into one JSON chunk per file."""
+        files = self.parse_files(code)
+        return {name: json.dumps({name: source}) for name, source in files.items()}
+
+    async def review_chunks(self, chunks: Dict[str, str]) -> str:
+        """Review chunks concurrently and merge the results, dropping findings repeated for a file."""
+        slots = asyncio.Semaphore(TESTER_CONCURRENCY)
+
+        async def review(chunk: str) -> str:
+            async with slots:
+                return await self.generate_routed(self.prompt.format(code=chunk))
+
+        results = await asyncio.gather(*[review(chunk) for chunk in chunks.values()])
+        seen, sections = set(), []
+        for name, result in zip(chunks, results):
+            lines: List[str] = []
+            for line in result.splitlines():
+                # A finding repeated in another file is another bug, so keys are per file
+                key = (name, " ".join(line.lower().split()))
+                if len(key[1]) > 15 and key in seen:
+                    continue
+                seen.add(key)
+                lines.append(line)
+            sections.append(f"### {name}\n" + "\n".join(lines).strip())
+        return "\n\n".join(sections)
@@ -0,0 +1,82 @@
+"""
+Throughput and provider requests per task: N individual /task/start calls
+vs one /tasks/batch call.
+
+Both go through the app over an in-process ASGI transport against a local
+fake provider that takes ``--latency`` per request. In batch mode the fake
+also accepts bulk requests (each extra prompt adds ``--item-latency``), and
+the NDJSON stream is checked to hold exactly one result per task.
+Run from the ``back`` directory:
+
+    python -m benchmarks.batch --tasks 50 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+os.environ.setdefault("LLM_MAX_WORKERS", "8")
+# Measure the model path, not sandbox subprocesses
+os.environ.setdefault("SANDBOX_ENABLED", "0")
+# Same model tiers in both modes, whatever the first mode taught the router
+os.environ.setdefault("ROUTING_ADAPT", "0")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+AGENTS = [main.planner, main.coder, main.tester, main.fixer]
+
+
+async def individual(client: httpx.AsyncClient, tasks: int):
+    async def one(i):
+        response = await client.post("/task/start", json={"task_description": f"nightly task {i}", "no_cache": True})
+        return response.json()["status"] if response.status_code == 200 else "error"
+
+    return await asyncio.gather(*[one(i) for i in range(tasks)])
+
+
+async def batch(client: httpx.AsyncClient, tasks: int):
+    descriptions = [f"nightly task {i}" for i in range(tasks)]
+    statuses = {}
+    async with client.stream("POST", "/tasks/batch",
+                             json={"task_descriptions": descriptions, "no_cache": True}) as response:
+        async for line in response.aiter_lines():
+            if line:
+                result = json.loads(line)
+                assert result["index"] not in statuses, f"task {result['index']} reported twice"
+                assert result["task_description"] == descriptions[result["index"]]
+                statuses[result["index"]] = result["status"]
+    assert sorted(statuses) == list(range(tasks)), "missing results in the NDJSON stream"
+    return list(statuses.values())
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, mode, bulk in (("individual", individual, False), ("batch", batch, True)):
+            model = install(AGENTS, latency=args.latency, bulk=bulk)
+            model.bulk_item_latency = args.item_latency
+            started = time.perf_counter()
+            statuses = await mode(client, args.tasks)
+            elapsed = time.perf_counter() - started
+            done = sum(1 for status in statuses if status in ("completed", "fixed"))
+            print(f"{label:<11} {elapsed:6.2f}s  {args.tasks / elapsed:5.1f} tasks/s  "
+                  f"{model.calls / args.tasks:.1f} prompts/task  {model.requests / args.tasks:.2f} provider requests/task  "
+                  f"{done}/{args.tasks} done")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--item-latency", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
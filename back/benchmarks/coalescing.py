@@ -0,0 +1,79 @@
+"""
+Model calls and wall time for a burst of identical /task/start requests,
+with and without single-flight coalescing, plus the disconnect cases: the
+originator leaving while others wait, and every client leaving.
+
+Run from the ``back`` directory:
+
+    python -m benchmarks.coalescing --requests 20 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import main  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+from singleflight import single_flight  # noqa: E402
+
+TASK = "Write a function that sorts a list of dicts by a given key"
+
+
+def request(spaces: int = 1):
+    # Requests differ only in whitespace, like retried or re-typed payloads
+    return main.TaskRequest(task_description=TASK.replace(" ", " " * spaces, 1), no_cache=True)
+
+
+async def burst(requests: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*[main.start_task(request(1 + i % 3)) for i in range(requests)])
+    return time.perf_counter() - started
+
+
+async def originator_leaves(requests: int) -> int:
+    originator = asyncio.ensure_future(main.start_task(request()))
+    await asyncio.sleep(0)
+    others = [asyncio.ensure_future(main.start_task(request())) for _ in range(requests - 1)]
+    await asyncio.sleep(0.05)
+    originator.cancel()
+    results = await asyncio.gather(*others)
+    return sum(1 for result in results if result.get("status"))
+
+
+async def everyone_leaves(requests: int) -> int:
+    clients = [asyncio.ensure_future(main.start_task(request())) for _ in range(requests)]
+    await asyncio.sleep(0.05)
+    for client in clients:
+        client.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    # A cancelled flight lands once its task has unwound, a few loop turns later
+    for _ in range(100):
+        if not single_flight.stats()["in_flight"]:
+            break
+        await asyncio.sleep(0.01)
+    return single_flight.stats()["in_flight"]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    model = install([main.planner, main.coder, main.tester, main.fixer], latency=args.latency)
+    for label, enabled in (("independent", False), ("single-flight", True)):
+        main.SINGLE_FLIGHT = enabled
+        model.calls = 0
+        elapsed = asyncio.run(burst(args.requests))
+        print(f"{label:<14} {args.requests} requests: {model.calls:>3} model calls, {elapsed:.2f}s")
+
+    served = asyncio.run(originator_leaves(args.requests))
+    print(f"originator disconnects: {served} of {args.requests - 1} remaining clients got the result")
+    left = asyncio.run(everyone_leaves(args.requests))
+    print(f"all clients disconnect: {left} pipelines still running, {single_flight.stats()}")
+
+
+if __name__ == "__main__":
+    main_cli()
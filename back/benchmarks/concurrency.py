@@ -0,0 +1,46 @@
+"""
+Shows that N concurrent /task/start requests finish in about the time of one.
+
+Keep ``--requests`` at or below LLM_MAX_WORKERS. Run from the ``back`` directory:
+
+    python -m benchmarks.concurrency --requests 10 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import main  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+
+async def timed(requests: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        main.start_task(main.TaskRequest(task_description=f"task {i}", no_cache=True))
+        for i in range(requests)
+    ])
+    return time.perf_counter() - started
+
+
+async def run(requests: int):
+    return await timed(1), await timed(requests)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    install([main.planner, main.coder, main.tester, main.fixer], latency=args.latency)
+
+    single, concurrent = asyncio.run(run(args.requests))
+    print(f"1 request:  {single:.2f}s")
+    print(f"{args.requests} requests: {concurrent:.2f}s ({concurrent / single:.2f}x of one request)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,77 @@
+"""
+Model calls and latency under overload with and without request deadlines.
+
+A burst of distinct /task/start requests shares a small model-call pool, so
+most of them queue. Their clients give up after ``--timeout`` seconds, like
+a proxy would. Without a deadline the server still runs every pipeline to
+the end; with one (X-Request-Timeout or REQUEST_TIMEOUT) it stops queued and
+in-flight work at the deadline and skips the fixer when too little time is
+left. Run from the ``back`` directory:
+
+    python -m benchmarks.deadlines --requests 12 --timeout 3 --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+os.environ.setdefault("LLM_MAX_WORKERS", "4")
+
+from fastapi import HTTPException  # noqa: E402
+
+import main  # noqa: E402
+import pipeline  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+
+async def one(i: int, timeout: float):
+    started = time.perf_counter()
+    try:
+        result = await main.start_task(main.TaskRequest(task_description=f"task {i}", no_cache=True))
+        outcome = "degraded" if result.get("degraded") else "complete"
+    except HTTPException as e:
+        outcome = "timeout" if e.status_code == 504 else "error"
+    elapsed = time.perf_counter() - started
+    if elapsed > timeout and outcome != "timeout":
+        outcome = "late"  # the client had already given up
+    return outcome, elapsed
+
+
+async def run(requests: int, timeout: float, model):
+    # One event loop for both modes: the model-call slots are bound to it
+    for label, deadline in (("no deadline", 0.0), ("deadline", timeout)):
+        main.REQUEST_TIMEOUT = deadline
+        model.calls = 0
+        started = time.perf_counter()
+        results = await asyncio.gather(*[one(i, timeout) for i in range(requests)])
+        elapsed = time.perf_counter() - started
+        outcomes = {name: sum(1 for o, _ in results if o == name)
+                    for name in ("complete", "degraded", "late", "timeout", "error")}
+        latencies = sorted(seconds for _, seconds in results)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{label:<12} {model.calls:>4} model calls, burst {elapsed:.2f}s, "
+              f"p50 {statistics.median(latencies):.2f}s p95 {p95:.2f}s, {outcomes}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--timeout", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    model = install([main.planner, main.coder, main.tester, main.fixer], latency=args.latency)
+    # Generated code with a failing test, so every run reaches the fixer
+    model.reply = json.dumps({
+        "main.py": "def add(a, b):\n    return a - b\n",
+        "test_main.py": "from main import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+    })
+    pipeline.FIX_MIN_BUDGET = args.latency * 2
+    asyncio.run(run(args.requests, args.timeout, model))
+
+
+if __name__ == "__main__":
+    main_cli()
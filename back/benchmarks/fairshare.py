@@ -0,0 +1,98 @@
+"""
+Task latency of light users while a heavy user bursts: model calls admitted
+in arrival order vs weighted fair sharing per user.
+
+A heavy user sends ``--heavy`` /task/start requests at once; meanwhile each
+of ``--light-users`` users sends one request every ``--interval`` seconds.
+All go through the app over an in-process ASGI transport, identified by
+their API key, against a local fake model taking ``--latency`` per call.
+FAIR_SHARE_SLOTS matches LLM_MAX_WORKERS, so the fair-share queue is the
+only place calls wait. Run from the ``back`` directory:
+
+    python -m benchmarks.fairshare --heavy 60 --light-users 3 --light-tasks 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+os.environ.setdefault("LLM_MAX_WORKERS", "8")
+os.environ.setdefault("FAIR_SHARE_SLOTS", os.environ["LLM_MAX_WORKERS"])
+os.environ.setdefault("SANDBOX_ENABLED", "0")
+os.environ.setdefault("SINGLE_FLIGHT", "0")
+os.environ.setdefault("ROUTING_ADAPT", "0")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from agents import base_agent  # noqa: E402
+from sdlc_common import fairshare  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+AGENTS = [main.planner, main.coder, main.tester, main.fixer]
+
+
+def p99(values):
+    return sorted(values)[min(len(values) - 1, int(0.99 * len(values)))]
+
+
+async def task(client: httpx.AsyncClient, user: str, i: int) -> float:
+    started = time.perf_counter()
+    response = await client.post("/task/start", headers={"Authorization": f"Bearer key-{user}"},
+                                 json={"task_description": f"{user} task {i}", "no_cache": True})
+    assert response.status_code == 200, response.text
+    return time.perf_counter() - started
+
+
+async def light_user(client: httpx.AsyncClient, user: str, tasks: int, interval: float):
+    latencies = []
+    for i in range(tasks):
+        latencies.append(await task(client, user, i))
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def measure(client: httpx.AsyncClient, args):
+    started = time.perf_counter()
+    heavy = asyncio.gather(*[task(client, "heavy", i) for i in range(args.heavy)])
+    light = asyncio.gather(*[light_user(client, f"light{u}", args.light_tasks, args.interval)
+                             for u in range(args.light_users)])
+    heavy_latencies, light_latencies = await asyncio.gather(heavy, light)
+    light_latencies = [latency for user in light_latencies for latency in user]
+    return light_latencies, heavy_latencies, time.perf_counter() - started
+
+
+async def run(args):
+    install(AGENTS, latency=args.latency)
+    users = ["heavy"] + [f"light{u}" for u in range(args.light_users)]
+    main.API_KEYS = fairshare.load_api_keys(json.dumps({f"key-{user}": user for user in users}))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, enabled in (("arrival order", False), ("fair share", True)):
+            fairshare.FAIR_SHARE = enabled
+            # Fresh per-user statistics for each mode
+            base_agent.fair_share = fairshare.FairShare(fairshare.FAIR_SHARE_SLOTS, {})
+            light, heavy, elapsed = await measure(client, args)
+            print(f"{label:<14} light users p50 {statistics.median(light):5.2f}s  p99 {p99(light):5.2f}s  "
+                  f"heavy p50 {statistics.median(heavy):5.2f}s  makespan {elapsed:5.2f}s")
+        for user, stats in base_agent.fair_share.stats()["tenants"].items():
+            print(f"  {user:<7} {stats['admitted']:>4} calls  queue wait p50 {stats['wait_p50']:.2f}s  "
+                  f"p99 {stats['wait_p99']:.2f}s")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heavy", type=int, default=60)
+    parser.add_argument("--light-users", type=int, default=3)
+    parser.add_argument("--light-tasks", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,43 @@
+"""Local fake LLM with injected latency for benchmarks."""
+from typing import Iterable, List
+import random
+import time
+
+
+class FakeModel:
+    """Blocking stand-in for the Gemini client used by ``BaseAgent``."""
+
+    def __init__(self, latency: float = 0.5, reply: str = '{"main.py": "print(\'hello\')"}',
+                 jitter: float = 0.0, bulk: bool = False, bulk_item_latency: float = 0.01):
+        self.latency = latency
+        # Each call takes latency * uniform(1 - jitter, 1 + jitter)
+        self.jitter = jitter
+        self.reply = reply
+        # Prompts answered, and provider requests made for them
+        self.calls = 0
+        self.requests = 0
+        # Accept bulk requests; each extra prompt in one adds bulk_item_latency
+        if bulk:
+            self.generate_batch = self._generate_batch
+        self.bulk_item_latency = bulk_item_latency
+
+    def generate_text(self, prompt: str) -> str:
+        self.calls += 1
+        self.requests += 1
+        time.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+        return self.reply
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        self.calls += len(prompts)
+        self.requests += 1
+        time.sleep(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)
+                   + self.bulk_item_latency * (len(prompts) - 1))
+        return [self.reply] * len(prompts)
+
+
+def install(agents: Iterable, latency: float = 0.5, jitter: float = 0.0, bulk: bool = False) -> FakeModel:
+    """Swap the model of every agent for one shared ``FakeModel``."""
+    model = FakeModel(latency=latency, jitter=jitter, bulk=bulk)
+    for agent in agents:
+        agent.model = model
+    return model
@@ -0,0 +1,68 @@
+"""
+Load test for the job queue against a fake LLM.
+
+Submits jobs at a fixed rate, waits for them to finish and reports
+throughput and p50/p95/p99 job latency. Run from the ``back`` directory:
+
+    JOB_DB=/tmp/load.db JOB_WORKERS=8 python -m benchmarks.load_test --jobs 200 --rate 50
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import pipeline  # noqa: E402
+from jobs import job_queue, QueueFull  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(jobs: int, rate: float):
+    await job_queue.start()
+    submitted, rejected = [], 0
+    started = time.perf_counter()
+    for i in range(jobs):
+        try:
+            submitted.append(await job_queue.submit({"task_description": f"load task {i}", "no_cache": True}))
+        except QueueFull:
+            rejected += 1
+        await asyncio.sleep(1 / rate)
+
+    while True:
+        results = [job_queue.store.get(job_id) for job_id in submitted]
+        if all(job["status"] in ("completed", "failed") for job in results):
+            break
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - started
+    await job_queue.stop()
+    return results, rejected, elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50, help="submissions per second")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM latency per call")
+    args = parser.parse_args()
+
+    install([pipeline.planner, pipeline.coder, pipeline.tester, pipeline.fixer], latency=args.latency)
+    results, rejected, elapsed = asyncio.run(run(args.jobs, args.rate))
+
+    latencies = [job["finished"] - job["created"] for job in results]
+    failed = sum(job["status"] == "failed" for job in results)
+    print(f"completed: {len(results) - failed}  failed: {failed}  rejected (429): {rejected}")
+    print(f"throughput: {len(results) / elapsed:.1f} jobs/s over {elapsed:.1f}s")
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 50):.2f}s  "
+              f"p95: {percentile(latencies, 95):.2f}s  p99: {percentile(latencies, 99):.2f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,120 @@
+"""
+Latency, cost and pass rate per task: every stage on the strong model vs
+cheap-first model routing.
+
+Each model tier is a fake with its own latency. The cheap tier returns an
+unusable answer (prose instead of JSON, or code that fails its test) for
+``--cheap-fail`` of its calls; the strong tier writes buggy code for
+``--strong-bug`` of its coding calls, so both modes exercise the fixer.
+A task passes when its final code passes the sandbox. Run from the
+``back`` directory:
+
+    python -m benchmarks.routing --tasks 20 --cheap-fail 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import zlib
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import pipeline  # noqa: E402
+from agents import base_agent  # noqa: E402
+from sdlc_common.cache import bypass_cache  # noqa: E402
+from agents.llm import DEFAULT_TIERS  # noqa: E402
+from sdlc_common.routing import ModelRouter  # noqa: E402
+
+CHEAP, STRONG = "gemini-2.0-flash-lite", "gemini-2.0-flash"
+AGENTS = (pipeline.planner, pipeline.coder, pipeline.tester, pipeline.fixer)
+TEST = "from calc import add\n\ndef test_add():\n    assert add(1, 2) == 3\n"
+
+
+def code(op: str) -> str:
+    return json.dumps({"calc.py": f"def add(a, b):\n    return a {op} b\n", "test_calc.py": TEST})
+
+
+class TierModel:
+    """Blocking fake of one model tier."""
+
+    def __init__(self, name: str, latency: float, fail: float, bug: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.bug = bug
+        self.calls = 0
+
+    def generate_text(self, prompt: str) -> str:
+        self.calls += 1
+        time.sleep(self.latency)
+        # Same prompt, same answer, so both modes see the same failures
+        rng = random.Random(zlib.crc32(f"{self.name}\n{prompt}".encode()))
+        failed = rng.random() < self.fail
+        if "software architect" in prompt:
+            task = prompt.split("Task: ", 1)[1].splitlines()[0]
+            if failed:
+                return f"Here is the plan: {task}."
+            return json.dumps({"problem": task, "approach": "A pure function",
+                               "functions": "add(a, b)", "tests": "add(1, 2) == 3"})
+        if "expert software tester" in prompt:
+            return "All checks passed."
+        if failed:
+            return "Sure! The function adds a and b." if rng.random() < 0.5 else code("-")
+        if "software developer" in prompt and rng.random() < self.bug:
+            return code("-")
+        return code("+")
+
+
+async def measure(tasks: int, policy, models):
+    base_agent.router = ModelRouter(policy)
+    bypass_cache.set(True)
+    cost = sum(agent.metrics.cost for agent in AGENTS)
+    calls = {name: model.calls for name, model in models.items()}
+    latencies, passed = [], 0
+    for i in range(tasks):
+        started = time.perf_counter()
+        result = await pipeline.run_pipeline(f"Write an add function, variant {i}")
+        latencies.append(time.perf_counter() - started)
+        final = result.get("fixed_code") or result.get("code")
+        passed += await pipeline.tester.passes(final, {})
+    cost = sum(agent.metrics.cost for agent in AGENTS) - cost
+    calls = {name: model.calls - calls[name] for name, model in models.items()}
+    return statistics.median(latencies), cost / tasks, passed, calls
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--cheap-latency", type=float, default=0.15)
+    parser.add_argument("--strong-latency", type=float, default=0.4)
+    parser.add_argument("--cheap-fail", type=float, default=0.2)
+    parser.add_argument("--strong-bug", type=float, default=0.1)
+    args = parser.parse_args()
+
+    models = {
+        CHEAP: TierModel(CHEAP, args.cheap_latency, args.cheap_fail),
+        STRONG: TierModel(STRONG, args.strong_latency, 0.0, args.strong_bug),
+    }
+    base_agent.get_model = models.__getitem__
+    modes = [("strong only", {stage: [STRONG] for stage in DEFAULT_TIERS}), ("cheap first", DEFAULT_TIERS)]
+
+    async def run():
+        for label, policy in modes:
+            median, cost, passed, calls = await measure(args.tasks, policy, models)
+            print(f"{label:<12} median {median:.2f}s per task  ${cost * 1000:.4f} per 1k tasks  "
+                  f"{passed}/{args.tasks} passed  model calls {calls}")
+        for stage, tiers in base_agent.router.stats().items():
+            for model in tiers["tiers"]:
+                stats = tiers.get(model)
+                if stats:
+                    print(f"  {stage:<5} {model:<22} {stats['calls']:>3} calls  "
+                          f"success {stats['success_rate']:.2f}  p50 {stats['latency_p50']:.2f}s")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,59 @@
+"""
+Compares the sequential pipeline with the DAG pipeline.
+
+The DAG pipeline generates tests from the plan while the coder runs, so it
+does more work in about the same wall time. With jittered model latency,
+several coder candidates cut the coding phase to the fastest passing one,
+at the cost of one extra coding call each. With both enabled a candidate
+can only pass once the plan tests exist, so test generation bounds coding.
+Run from the ``back`` directory:
+
+    python -m benchmarks.speculative --runs 10 --latency 1.0 --jitter 0.8 --candidates 3
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import pipeline  # noqa: E402
+from sdlc_common.cache import bypass_cache  # noqa: E402
+from benchmarks.fake_llm import install  # noqa: E402
+
+
+async def measure(runs: int, dag: bool, tests: bool, candidates: int, model):
+    pipeline.PIPELINE_DAG = dag
+    pipeline.SPECULATIVE_TESTS = tests
+    pipeline.CODER_CANDIDATES = candidates
+    bypass_cache.set(True)
+    calls = model.calls
+    started = time.perf_counter()
+    for i in range(runs):
+        await pipeline.run_pipeline(f"task {i}")
+    return (time.perf_counter() - started) / runs, (model.calls - calls) / runs
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--candidates", type=int, default=3)
+    args = parser.parse_args()
+
+    model = install([pipeline.planner, pipeline.coder, pipeline.tester, pipeline.fixer],
+                    latency=args.latency, jitter=args.jitter)
+    modes = [
+        ("sequential", False, False, 1),
+        ("dag + plan tests", True, True, 1),
+        (f"dag + {args.candidates} candidates", True, False, args.candidates),
+        ("dag + both", True, True, args.candidates),
+    ]
+    for label, dag, tests, candidates in modes:
+        seconds, calls = asyncio.run(measure(args.runs, dag, tests, candidates, model))
+        print(f"{label:<22} {seconds:.2f}s per run, {calls:.1f} model calls per run")
+
+
+if __name__ == "__main__":
+    main_cli()
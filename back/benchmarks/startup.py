@@ -0,0 +1,49 @@
+"""
+Import-to-ready time of the API process.
+
+Each run starts a fresh interpreter, imports ``main`` and, with --warm-up,
+runs the startup warm-up hook (client construction and one pooled
+connection). Run from the ``back`` directory:
+
+    python -m benchmarks.startup --runs 5 --warm-up
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+if {warm_up}:
+    asyncio.run(main.warm_up(main.router.models()))
+print(json.dumps({{"import": imported - started, "ready": time.perf_counter() - started}}))
+"""
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true")
+    args = parser.parse_args()
+
+    env = dict(os.environ, GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"))
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(warm_up=args.warm_up)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ("import", "ready"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:<7} median {statistics.median(values):.3f}s  max {max(values):.3f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,132 @@
+"""
+Offline benchmark suite for the pipeline on recorded model responses.
+
+Replays a fixture file (see ``sdlc_common/replay.py``) and measures:
+
+- single-run latency of ``/task/start`` (mean and p50)
+- concurrent throughput of ``/task/start`` (tasks/s)
+- memory per in-flight job (tracemalloc peak / concurrency)
+- tokens per completed task (from the recorded usage)
+
+Results are written as JSON so runs can be compared with ``--compare``.
+Record real fixtures with ``LLM_REPLAY=record LLM_FIXTURES=... `` while
+running the tasks below against the API. If the fixture file does not
+exist yet, it is first recorded from the local fake model. Run from the
+``back`` directory:
+
+    python -m benchmarks.suite --fixtures benchmarks/fixtures/pipeline.jsonl --speed 1.0
+    python -m benchmarks.suite --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "fake-key")
+
+import main  # noqa: E402
+from sdlc_common.replay import Fixtures, RecordingModel, ReplayModel  # noqa: E402
+from benchmarks.fake_llm import FakeModel  # noqa: E402
+
+AGENTS = (main.planner, main.coder, main.tester, main.fixer)
+TASKS = [
+    "Write a function that sorts a list of dicts by a given key",
+    "Build a command line todo list that stores items in a JSON file",
+    "Implement an LRU cache class with get and put",
+    "Parse a CSV file and print the average of each numeric column",
+]
+
+
+def use_model(model) -> None:
+    for agent in AGENTS:
+        agent.model = model
+
+
+async def start(task: str):
+    return await main.start_task(main.TaskRequest(task_description=task, no_cache=True))
+
+
+async def record_fake(fixtures: Fixtures, latency: float) -> None:
+    use_model(RecordingModel(FakeModel(latency=latency, jitter=0.3), fixtures, AGENTS[0].model_name))
+    for task in TASKS:
+        await start(task)
+
+
+async def measure(runs: int, concurrency: int, model: ReplayModel):
+    results = {}
+
+    latencies = []
+    for _ in range(runs):
+        for task in TASKS:
+            started = time.perf_counter()
+            await start(task)
+            latencies.append(time.perf_counter() - started)
+    results["single_run_latency_mean_s"] = statistics.mean(latencies)
+    results["single_run_latency_p50_s"] = statistics.median(latencies)
+
+    tokens = model.prompt_tokens + model.completion_tokens
+    batch = [TASKS[i % len(TASKS)] for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*[start(task) for task in batch])
+    elapsed = time.perf_counter() - started
+    results["throughput_tasks_per_s"] = concurrency / elapsed
+    results["tokens_per_task"] = (model.prompt_tokens + model.completion_tokens - tokens) / concurrency
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    await asyncio.gather(*[start(task) for task in batch])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["memory_per_inflight_job_kb"] = (peak - baseline) / concurrency / 1024
+    return results
+
+
+def compare(current: dict, previous_path: str) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)["results"]
+    for name, value in current.items():
+        before = previous.get(name)
+        if before:
+            print(f"  {name:<30} {before:>10.3f} -> {value:>10.3f} ({(value - before) / before:+.1%})")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="benchmarks/fixtures/pipeline.jsonl")
+    parser.add_argument("--speed", type=float, default=1.0, help="scale recorded latencies (0 = instant)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="latency when recording from the fake model")
+    parser.add_argument("--output", default=None, help="results file (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    args = parser.parse_args()
+
+    fixtures = Fixtures(args.fixtures)
+    if not len(fixtures):
+        print(f"recording {args.fixtures} from the fake model")
+        asyncio.run(record_fake(fixtures, args.fake_latency))
+
+    model = ReplayModel(fixtures, AGENTS[0].model_name, speed=args.speed)
+    use_model(model)
+    results = asyncio.run(measure(args.runs, args.concurrency, model))
+
+    output = args.output or os.path.join("benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "timestamp": time.time(),
+            "config": {**vars(args), "fixture_entries": len(fixtures)},
+            "results": results
+        }, f, indent=2)
+    for name, value in results.items():
+        print(f"{name:<30} {value:.3f}")
+    print(f"saved {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,45 @@
+"""Minimal DAG executor: every stage starts as soon as its dependencies finish."""
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+import asyncio
+
+# Receives the tasks of all earlier stages, keyed by stage name
+StageFn = Callable[[Dict[str, "asyncio.Task"]], Awaitable[Any]]
+
+
+class Stage:
+    def __init__(self, name: str, run: StageFn, after: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+
+
+async def run_dag(stages: List[Stage]) -> Dict[str, Any]:
+    """Run ``stages`` concurrently where the dependencies allow.
+
+    Stages must be listed after the stages they depend on. A stage may also
+    await an earlier stage lazily through the task mapping it receives, to
+    overlap its own work with that stage. If any stage fails, the others are
+    cancelled and the error is raised.
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(stage: Stage):
+        for dependency in stage.after:
+            await tasks[dependency]
+        return await stage.run(tasks)
+
+    seen = set()
+    for stage in stages:
+        missing = [d for d in stage.after if d not in seen]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown or later stages: {missing}")
+        seen.add(stage.name)
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(start(stage))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,201 @@
+"""Durable job queue for SDLC pipeline runs.
+
+Jobs are persisted in SQLite so that queued and interrupted runs are picked
+up again after a restart. A fixed pool of async workers drains the queue,
+taking the jobs of each tenant in turn, so one tenant's backlog does not
+hold up everyone else's jobs. Database writes run in a worker thread, so a
+commit never blocks the event loop.
+"""
+from typing import Dict, Any, Optional
+from collections import OrderedDict, deque
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from sdlc_common.cache import bypass_cache
+from sdlc_common.fairshare import tenant, DEFAULT_TENANT
+from paths import data_path
+from pipeline import run_pipeline
+
+logger = logging.getLogger(__name__)
+
+JOB_DB = os.getenv("JOB_DB", data_path("jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class TenantQueue:
+    """FIFO per tenant; ``get`` serves the tenants with queued jobs in turn."""
+
+    def __init__(self):
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._items = asyncio.Semaphore(0)
+
+    def qsize(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def put_nowait(self, item: str, owner: str = DEFAULT_TENANT) -> None:
+        self._queues.setdefault(owner, deque()).append(item)
+        self._items.release()
+
+    async def get(self) -> str:
+        await self._items.acquire()
+        owner, queue = self._queues.popitem(last=False)
+        item = queue.popleft()
+        if queue:
+            # To the back of the rotation
+            self._queues[owner] = queue
+        return item
+
+
+class JobStore:
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, request TEXT NOT NULL, status TEXT NOT NULL, "
+            "partial TEXT NOT NULL, result TEXT, error TEXT, "
+            "created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self._db.commit()
+
+    def create(self, request: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, request, status, partial, created) VALUES (?, ?, 'queued', '{}', ?)",
+                (job_id, json.dumps(request), time.time())
+            )
+            self._db.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        for name in ("partial", "result"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["partial"] = json.loads(job["partial"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def unfinished(self):
+        """Ids of jobs that were queued or running, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+
+class JobQueue:
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, max_depth: int = JOB_QUEUE_SIZE):
+        self.store = store
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queue: Optional[TenantQueue] = None
+        self._tasks = []
+        # Made in start(), inside the loop that runs the workers
+        self._starting: Optional[asyncio.Lock] = None
+        # Submissions admitted but not yet in the queue (their row is being written)
+        self._admitting = 0
+
+    def depth(self) -> int:
+        return (self._queue.qsize() if self._queue is not None else 0) + self._admitting
+
+    async def start(self) -> None:
+        """Re-enqueue unfinished jobs and start the worker pool; does nothing if it is running."""
+        if self._starting is None:
+            self._starting = asyncio.Lock()
+        async with self._starting:
+            if self._queue is not None:
+                return
+            queue = TenantQueue()
+            recovered = await asyncio.to_thread(self.store.unfinished)
+            for job_id in recovered:
+                job = await asyncio.to_thread(self.store.get, job_id)
+                queue.put_nowait(job_id, job["request"].get("tenant", DEFAULT_TENANT))
+            if recovered:
+                logger.info(f"Recovered {len(recovered)} unfinished jobs")
+            self._queue = queue
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs still queued stay "queued" in the store and are recovered by the next start
+        self._queue = None
+
+    async def submit(self, request: Dict[str, Any]) -> str:
+        """Persist a job and queue it; starts the worker pool if it is not running."""
+        if self._queue is None:
+            await self.start()
+        if self.depth() >= self.max_depth:
+            raise QueueFull(f"Job queue is full ({self.max_depth} jobs)")
+        self._admitting += 1
+        try:
+            job_id = await asyncio.to_thread(self.store.create, request)
+        finally:
+            self._admitting -= 1
+        self._queue.put_nowait(job_id, request.get("tenant", DEFAULT_TENANT))
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            await self._run(await self._queue.get())
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return
+        request = job["request"]
+        partial: Dict[str, Any] = {}
+
+        async def emit(event: Dict[str, Any]):
+            if event["event"] == "phase":
+                partial[event["phase"]] = event["result"]
+                await asyncio.to_thread(self.store.update, job_id, partial=dict(partial))
+
+        await asyncio.to_thread(self.store.update, job_id, status="running", started=time.time())
+        bypass_cache.set(request.get("no_cache", False))
+        tenant.set(request.get("tenant", DEFAULT_TENANT))
+        try:
+            result = await run_pipeline(request["task_description"], emit=emit)
+            await asyncio.to_thread(self.store.update, job_id, status="completed", result=result,
+                                    finished=time.time())
+        except asyncio.CancelledError:
+            # Left as "running" so the job is resumed on the next start
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(self.store.update, job_id, status="failed", error=str(e),
+                                    finished=time.time())
+
+
+job_queue = JobQueue(JobStore(JOB_DB))
@@ -1,71 +1,219 @@
-from fastapi import FastAPI, HTTPException
-from typing import Dict, Any
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from typing import Dict, Any, List, Optional
+import asyncio
+import json
 import uvicorn
-from agents.planner import PlannerAgent
-from agents.coder import CoderAgent
-from agents.tester import TesterAgent
-from agents.fixer import FixerAgent
+from sdlc_common.cache import response_cache, bypass_cache
+from sdlc_common.semantic_cache import semantic_cache
+from pipeline import planner, coder, tester, fixer, run_pipeline, run_batch
+from jobs import job_queue, QueueFull
+from agents.metrics import active_runs, render_prometheus, render_fair_share
+from agents.clients import warm_up
+from agents.llm import router, bulk_stats
+from sdlc_common.ratelimit import scheduler, RateLimited
+from sdlc_common.fairshare import fair_share, key_digest, load_api_keys, tenant, DEFAULT_TENANT
+from sdlc_common.tracing import span, current_span
+from sdlc_common.deadline import DeadlineExceeded, set_deadline, remaining
+from singleflight import single_flight, request_key
+import os
 from pydantic import BaseModel
 
 app = FastAPI(title="Multi-Agent SDLC System")
 
-# Initialize agents
-planner = PlannerAgent()
-coder = CoderAgent()
-tester = TesterAgent()
-fixer = FixerAgent()
+# Identical concurrent /task/start requests share one pipeline run
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1") == "1"
+# Seconds between checks for a disconnected /task/start client
+DISCONNECT_POLL = float(os.getenv("DISCONNECT_POLL", "0.5"))
+# Default /task/start deadline in seconds (0 = none); clients override it
+# with an X-Request-Timeout header, e.g. to match their proxy's timeout
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "0"))
+# Most tasks accepted by one /tasks/batch call
+BATCH_MAX_TASKS = int(os.getenv("BATCH_MAX_TASKS", "1000"))
+# API key -> tenant (inline JSON or a JSON file path). When set, requests
+# must send "Authorization: Bearer <key>" and their model calls count
+# against that tenant's fair share; otherwise all requests share one tenant
+API_KEYS = load_api_keys(os.getenv("API_KEYS", ""))
 
 class TaskRequest(BaseModel):
     task_description: str
+    no_cache: bool = False
+
+class BatchRequest(BaseModel):
+    task_descriptions: List[str]
+    no_cache: bool = False
+
+@app.on_event("startup")
+async def start_workers():
+    await job_queue.start()
+    if os.getenv("WARM_UP", "1") == "1":
+        await warm_up(router.models())
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await job_queue.stop()
+
+async def until_disconnected(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL)
+
+async def run_shared(task_request: TaskRequest, timeout: float):
+    """Run the pipeline, attached to an identical in-flight run if there is one."""
+    if not SINGLE_FLIGHT:
+        return await run_pipeline(task_request.task_description), False
+    # A shared run keeps the tenant and deadline of the request that started
+    # it, so only requests of the same tenant with the same timeout share one
+    key = request_key(**task_request.model_dump(), tenant=tenant.get(), timeout=timeout)
+    return await single_flight.do(key, lambda: run_pipeline(task_request.task_description))
+
+async def run_once(task_request: TaskRequest, request: Optional[Request], timeout: float):
+    """Run the pipeline until it finishes, the client leaves or the deadline passes.
+
+    Leaving cancels the run and every model call in flight for it, unless
+    other clients are still waiting on the same run. Each client waits only
+    until its own deadline, also when it joined another client's run.
+    """
+    call = asyncio.ensure_future(run_shared(task_request, timeout))
+    watch = asyncio.ensure_future(until_disconnected(request)) if request is not None else None
+    try:
+        done, _ = await asyncio.wait({call, watch} - {None}, timeout=remaining(),
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if watch is not None:
+            watch.cancel()
+        call.cancel()
+    if call not in done:
+        if watch in done:
+            raise HTTPException(status_code=499, detail="Client closed request")
+        raise DeadlineExceeded("Request deadline exceeded")
+    result, joined = call.result()
+    current_span().set(coalesced=joined)
+    return result
+
+def request_tenant(request: Optional[Request]) -> str:
+    """The tenant of the request's API key; 401 without a valid one when keys are configured."""
+    if not API_KEYS or request is None:
+        return DEFAULT_TENANT
+    scheme, _, key = request.headers.get("authorization", "").partition(" ")
+    name = API_KEYS.get(key_digest(key.strip())) if scheme.lower() == "bearer" else None
+    if name is None:
+        raise HTTPException(status_code=401, detail="A valid API key is required",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return name
+
+def request_timeout(request: Optional[Request]) -> float:
+    header = request.headers.get("x-request-timeout") if request is not None else None
+    try:
+        return float(header) if header else REQUEST_TIMEOUT
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Request-Timeout must be a number of seconds")
 
 @app.post("/task/start")
-async def start_task(task_request: TaskRequest):
+async def start_task(task_request: TaskRequest, request: Request = None):
     """Start a new development task workflow."""
+    bypass_cache.set(task_request.no_cache)
+    tenant.set(request_tenant(request))
+    timeout = request_timeout(request)
+    set_deadline(timeout)
     try:
-        # 1. Planning phase
-        plan = await planner.process(task_request.task_description)
-        if not isinstance(plan, str):
-            raise ValueError("Planner returned invalid response format")
-        
-        # 2. Coding phase
-        code_response = await coder.process({"plan": plan})
-        if not isinstance(code_response, dict):
-            raise ValueError("Coder returned invalid response format")
-        code = code_response.get("code")
-        
-        # 3. Testing phase
-        test_response = await tester.process({"code": code})
-        if not isinstance(test_response, dict):
-            raise ValueError("Tester returned invalid response format")
-            
-        # Ensure test results have a status
-        if "status" not in test_response:
-            test_response["status"] = "success"
-        
-        if test_response["status"] == "success":
-            return {
-                "status": "completed",
-                "plan": plan,
-                "code": code,
-                "test_results": test_response
-            }
-        else:
-            # 4. Fixing phase
-            fix_response = await fixer.process({"code": code, "test_results": test_response})
-            if not isinstance(fix_response, dict):
-                raise ValueError("Fixer returned invalid response format")
-            fixed_code = fix_response.get("code")
-            
-            return {
-                "status": "fixed",
-                "plan": plan,
-                "original_code": code,
-                "fixed_code": fixed_code,
-                "test_results": test_response
-            }
+        with span("task.start", no_cache=task_request.no_cache):
+            return await run_once(task_request, request, timeout)
+    except HTTPException:
+        raise
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except RateLimited as e:
+        headers = {"Retry-After": str(int(e.retry_after or 60))}
+        raise HTTPException(status_code=429, detail=str(e), headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse(event: Dict[str, Any]) -> str:
+    """Format a pipeline event as a server-sent event."""
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+@app.post("/task/stream")
+async def stream_task(task_request: TaskRequest, request: Request = None):
+    """Start a task and stream each phase (and model deltas) as server-sent events."""
+    events: asyncio.Queue = asyncio.Queue()
+    timeout = request_timeout(request)
+    user = request_tenant(request)
+
+    async def run():
+        bypass_cache.set(task_request.no_cache)
+        tenant.set(user)
+        set_deadline(timeout)
+        try:
+            result = await run_pipeline(task_request.task_description, emit=events.put)
+            await events.put({"event": "done", "result": result})
+        except Exception as e:
+            await events.put({"event": "error", "detail": str(e)})
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await events.get()
+                yield sse(event)
+                if event["event"] in ("done", "error"):
+                    break
+        finally:
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.post("/tasks/batch")
+async def start_batch(batch_request: BatchRequest, request: Request = None):
+    """Run a batch of tasks stage by stage and stream each task's result as an NDJSON line."""
+    count = len(batch_request.task_descriptions)
+    if count == 0:
+        raise HTTPException(status_code=400, detail="task_descriptions must not be empty")
+    if count > BATCH_MAX_TASKS:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {BATCH_MAX_TASKS} tasks")
+    results: asyncio.Queue = asyncio.Queue()
+    user = request_tenant(request)
+
+    async def run():
+        bypass_cache.set(batch_request.no_cache)
+        tenant.set(user)
+        try:
+            with span("task.batch", tasks=count, no_cache=batch_request.no_cache):
+                await run_batch(batch_request.task_descriptions, emit=results.put)
+        except Exception as e:
+            await results.put({"status": "error", "error": str(e)})
+        finally:
+            await results.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield json.dumps(result) + "\n"
+        finally:
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/task", status_code=202)
+async def submit_task(task_request: TaskRequest, request: Request = None):
+    """Queue a task and return its job id immediately."""
+    try:
+        job_id = await job_queue.submit({**task_request.model_dump(), "tenant": request_tenant(request)})
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/task/{job_id}")
+async def get_task(job_id: str):
+    """Get the status and (partial) results of a queued task."""
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/agents/status")
 async def get_agents_status():
     """Get current status of all agents."""
@@ -73,8 +221,26 @@ async def get_agents_status():
         "planner": planner.get_status(),
         "coder": coder.get_status(),
         "tester": tester.get_status(),
-        "fixer": fixer.get_status()
+        "fixer": fixer.get_status(),
+        "runs": active_runs,
+        "job_queue_depth": job_queue.depth(),
+        "rate_limit": scheduler.stats(),
+        "single_flight": single_flight.stats(),
+        "routing": router.stats(),
+        "bulk_requests": bulk_stats(),
+        "fair_share": fair_share.stats()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Agent metrics in the Prometheus text format."""
+    return (render_prometheus([agent.metrics for agent in (planner, coder, tester, fixer)])
+            + render_fair_share(fair_share.stats()))
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get response cache and near-duplicate task cache counters."""
+    return {**response_cache.stats(), "semantic": semantic_cache.stats()}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,400 @@
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import asyncio
+import logging
+import os
+import uuid
+from agents.planner import PlannerAgent
+from agents.coder import CoderAgent
+from agents.tester import TesterAgent
+from agents.fixer import FixerAgent
+from agents.metrics import active_runs, current_run
+from sdlc_common.cache import bypass_cache
+from sdlc_common.semantic_cache import semantic_cache
+from sdlc_common.tracing import span, current_span
+from sdlc_common.deadline import DeadlineExceeded, remaining
+from agents.llm import bulk_calls
+from dag import Stage, run_dag
+
+logger = logging.getLogger(__name__)
+
+# Run independent stages concurrently instead of plan -> code -> test -> fix
+PIPELINE_DAG = os.getenv("PIPELINE_DAG", "0") == "1"
+# In DAG mode: generate tests from the plan while the coder works (one extra LLM call)
+SPECULATIVE_TESTS = os.getenv("SPECULATIVE_TESTS", "1") == "1"
+# In DAG mode: coder candidates started in parallel; each one costs a full coding call
+CODER_CANDIDATES = int(os.getenv("CODER_CANDIDATES", "1"))
+# Time a fixer run needs (seconds) until its own p95 latency has been observed
+FIX_MIN_BUDGET = float(os.getenv("FIX_MIN_BUDGET", "10"))
+# Tasks of a batch worked on at once within each stage
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "32"))
+
+# Initialize agents
+planner = PlannerAgent()
+coder = CoderAgent()
+tester = TesterAgent()
+fixer = FixerAgent()
+
+# Receives pipeline events such as {"event": "phase", "phase": "planning", ...}
+Emit = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+async def run_pipeline(task_description: str, emit: Optional[Emit] = None) -> Dict[str, Any]:
+    """Run plan -> code -> test -> fix, reporting each phase through ``emit``."""
+    run_id = uuid.uuid4().hex
+    state = {agent.name: "pending" for agent in (planner, coder, tester, fixer)}
+    active_runs[run_id] = state
+    token = current_run.set(state)
+    try:
+        with span("pipeline", run_id=run_id, mode="dag" if PIPELINE_DAG else "sequential") as trace:
+            if PIPELINE_DAG:
+                result = await _run_stages(task_description, emit)
+            else:
+                result = await _run_phases(task_description, emit)
+            trace.set(status=result["status"])
+        _remember(task_description, result)
+        return result
+    finally:
+        current_run.reset(token)
+        del active_runs[run_id]
+
+
+def _remember(task_description: str, result: Dict[str, Any]) -> None:
+    if not bypass_cache.get():
+        # Final code is reused by near-duplicate tasks that get the same plan
+        code = None if result.get("degraded") else result.get("code") or result.get("fixed_code")
+        semantic_cache.update(task_description, plan=result["plan"], code=code)
+
+
+def _cached_code(task_description: str, plan: str) -> Optional[str]:
+    """Code of a near-duplicate task, if it was built from the very same plan."""
+    if bypass_cache.get():
+        return None
+    hit = semantic_cache.lookup(task_description)
+    if hit is not None and hit.get("plan") == plan and hit.get("code"):
+        logger.debug("Reusing code of a near-duplicate task (similarity %.2f)", hit["similarity"])
+        current_span().set(semantic_cache_hit=True)
+        return hit["code"]
+    return None
+
+
+def _fixer_fits() -> bool:
+    """Whether a fixer run is likely to finish before the request deadline."""
+    left = remaining()
+    return left is None or left >= (fixer.metrics.percentile(95) or FIX_MIN_BUDGET)
+
+
+def _unfixed(plan: str, code: str, test_response: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """Result for a run that returns its tested code without fixing it."""
+    current_span().set(degraded=reason)
+    return {
+        "status": "tested",
+        "plan": plan,
+        "code": code,
+        "test_results": test_response,
+        "degraded": reason
+    }
+
+
+async def _fix(plan: str, code: str, test_response: Dict[str, Any], on_delta,
+               tests: Optional[Dict[str, str]] = None) -> Any:
+    """Run the fixer, or degrade to the tested code when the deadline is too close."""
+    if not _fixer_fits():
+        return _unfixed(plan, code, test_response, "fixer skipped: too little time left before the deadline")
+
+    async def passes(fixed_code: str) -> bool:
+        return await tester.passes(fixed_code, tests or {})
+
+    try:
+        fix_response = await fixer.process({
+            "code": code,
+            "test_results": test_response,
+            "on_delta": on_delta,
+            # Fixes from a cheap model tier must pass the sandbox to be kept
+            "accept": passes
+        })
+    except DeadlineExceeded:
+        return _unfixed(plan, code, test_response, "fixer stopped at the deadline")
+    if not isinstance(fix_response, dict):
+        raise ValueError("Fixer returned invalid response format")
+    return fix_response
+
+
+def _reporters(emit: Optional[Emit]):
+    async def phase_done(phase: str, result: Any):
+        if emit is not None:
+            await emit({"event": "phase", "phase": phase, "result": result})
+
+    def deltas(phase: str):
+        if emit is None:
+            return None
+
+        async def on_delta(text: str):
+            await emit({"event": "delta", "phase": phase, "text": text})
+        return on_delta
+
+    return phase_done, deltas
+
+
+async def _run_phases(task_description: str, emit: Optional[Emit]) -> Dict[str, Any]:
+    phase_done, deltas = _reporters(emit)
+
+    # 1. Planning phase
+    plan = await planner.create_plan(task_description, on_delta=deltas("planning"))
+    if not isinstance(plan, str):
+        raise ValueError("Planner returned invalid response format")
+    await phase_done("planning", plan)
+    
+    # 2. Coding phase
+    code = _cached_code(task_description, plan)
+    if code is None:
+        code_response = await coder.process({"plan": plan, "on_delta": deltas("coding")})
+        if not isinstance(code_response, dict):
+            raise ValueError("Coder returned invalid response format")
+        code = code_response.get("code")
+    await phase_done("coding", code)
+    
+    # 3. Testing phase
+    test_response = await tester.process({"code": code, "on_delta": deltas("testing")})
+    if not isinstance(test_response, dict):
+        raise ValueError("Tester returned invalid response format")
+        
+    # Ensure test results have a status
+    if "status" not in test_response:
+        test_response["status"] = "success"
+    await phase_done("testing", test_response)
+    
+    if test_response["status"] == "success":
+        return {
+            "status": "completed",
+            "plan": plan,
+            "code": code,
+            "test_results": test_response
+        }
+
+    # 4. Fixing phase, skipped when the deadline leaves too little time
+    fix_response = await _fix(plan, code, test_response, deltas("fixing"))
+    if fix_response.get("degraded"):
+        return fix_response
+    fixed_code = fix_response.get("code")
+    await phase_done("fixing", fixed_code)
+    
+    return {
+        "status": "fixed",
+        "plan": plan,
+        "original_code": code,
+        "fixed_code": fixed_code,
+        "test_results": test_response
+    }
+
+
+async def _first_passing(plan: str, tests: "asyncio.Task", on_delta) -> str:
+    """Run CODER_CANDIDATES coders in parallel and keep the first whose code passes the sandbox."""
+    if CODER_CANDIDATES <= 1:
+        code_response = await coder.process({"plan": plan, "on_delta": on_delta})
+        if not isinstance(code_response, dict):
+            raise ValueError("Coder returned invalid response format")
+        return code_response.get("code")
+
+    # Only the first candidate streams, to keep the delta stream readable
+    candidates = [
+        asyncio.ensure_future(coder.process({
+            "plan": plan, "candidate": i, "on_delta": on_delta if i == 0 else None
+        }))
+        for i in range(CODER_CANDIDATES)
+    ]
+    fallback = None
+    try:
+        for finished in asyncio.as_completed(candidates):
+            try:
+                code_response = await finished
+            except Exception as e:
+                logger.warning(f"Coder candidate failed: {str(e)}")
+                continue
+            code = code_response.get("code") if isinstance(code_response, dict) else None
+            if not code:
+                continue
+            if fallback is None:
+                fallback = code
+            if await tester.passes(code, await tests):
+                return code
+    finally:
+        for candidate in candidates:
+            candidate.cancel()
+    if fallback is None:
+        raise ValueError("Coder returned invalid response format")
+    return fallback
+
+
+async def _run_stages(task_description: str, emit: Optional[Emit]) -> Dict[str, Any]:
+    """DAG variant of ``_run_phases``: test generation runs alongside coding."""
+    phase_done, deltas = _reporters(emit)
+
+    async def plan_stage(stages):
+        plan = await planner.create_plan(task_description, on_delta=deltas("planning"))
+        if not isinstance(plan, str):
+            raise ValueError("Planner returned invalid response format")
+        await phase_done("planning", plan)
+        return plan
+
+    async def tests_stage(stages):
+        if not SPECULATIVE_TESTS:
+            return {}
+        try:
+            tests = await tester.generate_tests(stages["plan"].result())
+        except Exception as e:
+            # Speculative work must never fail the run
+            logger.warning(f"Test generation failed: {str(e)}")
+            return {}
+        await phase_done("test_generation", tests)
+        return tests
+
+    async def code_stage(stages):
+        code = _cached_code(task_description, stages["plan"].result())
+        if code is None:
+            code = await _first_passing(stages["plan"].result(), stages["tests"], deltas("coding"))
+        await phase_done("coding", code)
+        return code
+
+    async def test_stage(stages):
+        test_response = await tester.process({
+            "code": stages["code"].result(),
+            "tests": stages["tests"].result(),
+            "on_delta": deltas("testing")
+        })
+        if not isinstance(test_response, dict):
+            raise ValueError("Tester returned invalid response format")
+        if "status" not in test_response:
+            test_response["status"] = "success"
+        await phase_done("testing", test_response)
+        return test_response
+
+    async def fix_stage(stages):
+        test_response = stages["test"].result()
+        if test_response["status"] == "success":
+            return None
+        fix_response = await _fix(stages["plan"].result(), stages["code"].result(), test_response,
+                                  deltas("fixing"), stages["tests"].result())
+        if fix_response.get("degraded"):
+            return fix_response
+        fixed_code = fix_response.get("code")
+        await phase_done("fixing", fixed_code)
+        return fixed_code
+
+    results = await run_dag([
+        Stage("plan", plan_stage),
+        Stage("tests", tests_stage, after=["plan"]),
+        Stage("code", code_stage, after=["plan"]),
+        Stage("test", test_stage, after=["code", "tests"]),
+        Stage("fix", fix_stage, after=["test"])
+    ])
+    if results["test"]["status"] == "success":
+        return {
+            "status": "completed",
+            "plan": results["plan"],
+            "code": results["code"],
+            "test_results": results["test"]
+        }
+    if isinstance(results["fix"], dict):
+        return results["fix"]
+    return {
+        "status": "fixed",
+        "plan": results["plan"],
+        "original_code": results["code"],
+        "fixed_code": results["fix"],
+        "test_results": results["test"]
+    }
+
+
+async def run_batch(task_descriptions: List[str], emit: Emit) -> None:
+    """Run plan -> code -> test -> fix stage by stage across a batch of tasks.
+
+    Every task still in the batch goes through a stage before the next stage
+    starts, so the prompts of a stage reach the model together and can share
+    bulk requests. ``emit`` receives each task's result as soon as the task
+    is done, e.g. {"index": 3, "task_description": ..., "status": "fixed", ...};
+    a failed task reports {"status": "failed", "error": ...} and leaves the batch.
+    """
+    run_id = uuid.uuid4().hex
+    state = {agent.name: "pending" for agent in (planner, coder, tester, fixer)}
+    active_runs[run_id] = state
+    run_token, bulk_token = current_run.set(state), bulk_calls.set(True)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    work: Dict[int, Dict[str, Any]] = {i: {} for i in range(len(task_descriptions))}
+
+    async def stage(step):
+        async def one(i: int):
+            try:
+                async with slots:
+                    result = await step(task_descriptions[i], work[i])
+            except Exception as e:
+                logger.error(f"Batch task {i} failed: {str(e)}")
+                result = {"status": "failed", "error": str(e)}
+            else:
+                if result is None:
+                    return
+                _remember(task_descriptions[i], result)
+            # Report the task the moment it is done, not when the whole stage is
+            del work[i]
+            await emit({"index": i, "task_description": task_descriptions[i], **result})
+
+        await asyncio.gather(*[one(i) for i in list(work)])
+
+    try:
+        with span("pipeline.batch", run_id=run_id, tasks=len(task_descriptions)):
+            for step in (_plan_step, _code_step, _test_step, _fix_step):
+                if work:
+                    await stage(step)
+    finally:
+        bulk_calls.reset(bulk_token)
+        current_run.reset(run_token)
+        del active_runs[run_id]
+
+
+# Batch steps: each records its output in ``work`` and returns the task's
+# result once the task is done, or None to go on to the next stage
+
+async def _plan_step(task_description: str, work: Dict[str, Any]) -> None:
+    plan = await planner.create_plan(task_description)
+    if not isinstance(plan, str):
+        raise ValueError("Planner returned invalid response format")
+    work["plan"] = plan
+
+
+async def _code_step(task_description: str, work: Dict[str, Any]) -> None:
+    code = _cached_code(task_description, work["plan"])
+    if code is None:
+        code_response = await coder.process({"plan": work["plan"]})
+        if not isinstance(code_response, dict):
+            raise ValueError("Coder returned invalid response format")
+        code = code_response.get("code")
+    work["code"] = code
+
+
+async def _test_step(task_description: str, work: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    test_response = await tester.process({"code": work["code"]})
+    if not isinstance(test_response, dict):
+        raise ValueError("Tester returned invalid response format")
+    if "status" not in test_response:
+        test_response["status"] = "success"
+    work["test_results"] = test_response
+    if test_response["status"] == "success":
+        return {
+            "status": "completed",
+            "plan": work["plan"],
+            "code": work["code"],
+            "test_results": test_response
+        }
+    return None
+
+
+async def _fix_step(task_description: str, work: Dict[str, Any]) -> Dict[str, Any]:
+    fix_response = await _fix(work["plan"], work["code"], work["test_results"], None)
+    if fix_response.get("degraded"):
+        return fix_response
+    return {
+        "status": "fixed",
+        "plan": work["plan"],
+        "original_code": work["code"],
+        "fixed_code": fix_response.get("code"),
+        "test_results": work["test_results"]
+    }
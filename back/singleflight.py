@@ -0,0 +1,81 @@
+"""Single-flight coalescing of identical in-flight requests.
+
+The first caller for a key starts the work as its own task; callers that
+arrive while it runs attach to that task and receive the same result or
+error. A caller that goes away (cancelled, e.g. its client disconnected)
+only detaches: the work keeps running for the others and is cancelled once
+the last caller has left. The work runs in the context of the caller that
+started it, so the key must cover every context variable it depends on.
+"""
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import hashlib
+import json
+
+
+def request_key(**payload: Any) -> str:
+    """Key of a request payload, with whitespace in strings normalized."""
+    normalized = {
+        name: " ".join(value.split()) if isinstance(value, str) else value
+        for name, value in payload.items()
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``work()`` once per key at a time and share its outcome.
+
+        Returns ``(result, joined)``; ``joined`` is True for callers that
+        attached to a flight another caller started.
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if joined:
+            self.joined += 1
+        else:
+            flight = _Flight(asyncio.ensure_future(work()))
+            self._flights[key] = flight
+            self.started += 1
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), joined
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last interested caller is gone; stop the work
+                self.abandoned += 1
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # retrieved, so an unwaited failure is not logged
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "started": self.started,
+            "joined": self.joined,
+            "abandoned": self.abandoned
+        }
+
+
+single_flight = SingleFlight()
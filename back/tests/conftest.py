@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Keep the job database of a test run out of the working tree
+os.environ.setdefault("JOB_DB", os.path.join(tempfile.mkdtemp(prefix="sdlc-back-tests-"), "jobs.db"))
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+# No connection warm-up against the real provider
+os.environ.setdefault("WARM_UP_URL", "http://127.0.0.1:9/")
+os.environ.setdefault("ADK_SUPPRESS_GEMINI_LITELLM_WARNINGS", "true")
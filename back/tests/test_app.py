@@ -0,0 +1,24 @@
+from fastapi.testclient import TestClient
+from google.adk.models import LiteLlm
+
+import main
+from agents import clients
+
+
+def test_app_starts_and_builds_the_model_clients():
+    with TestClient(main.app) as client:
+        response = client.get("/agents/status")
+    assert response.status_code == 200
+    assert set(response.json()) >= {"planner", "coder", "tester", "fixer"}
+    model = clients.get_model("gemini-2.0-flash")
+    assert isinstance(model.llm, LiteLlm)
+    assert model.llm.model == "gemini/gemini-2.0-flash"
+
+
+def test_app_starts_when_a_client_cannot_be_built(monkeypatch):
+    def broken(model_name):
+        raise ValueError("GEMINI_API_KEY environment variable not found")
+
+    monkeypatch.setattr(clients, "get_model", broken)
+    with TestClient(main.app) as client:
+        assert client.get("/agents/status").status_code == 200
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import pipeline
+from sdlc_common.cache import bypass_cache
+
+
+@pytest.fixture
+def agents(monkeypatch):
+    """Fake agents: "bug" tasks fail their tests, "broken" tasks fail to plan."""
+    calls = []
+    gates = {}
+
+    async def create_plan(task_description):
+        calls.append(("plan", task_description))
+        if "broken" in task_description:
+            raise ValueError("planner is down")
+        return f"plan for {task_description}"
+
+    async def code(input):
+        calls.append(("code", input["plan"]))
+        return {"code": input["plan"].replace("plan for", "code for")}
+
+    async def test(input):
+        calls.append(("test", input["code"]))
+        if input["code"] in gates:
+            await gates[input["code"]].wait()
+        if "bug" in input["code"]:
+            return {"status": "failure", "errors": ["boom"]}
+        return {"status": "success"}
+
+    async def fix(input):
+        calls.append(("fix", input["code"]))
+        return {"code": input["code"] + " (fixed)"}
+
+    monkeypatch.setattr(pipeline.planner, "create_plan", create_plan)
+    monkeypatch.setattr(pipeline.coder, "process", code)
+    monkeypatch.setattr(pipeline.tester, "process", test)
+    monkeypatch.setattr(pipeline.fixer, "process", fix)
+    return calls, gates
+
+
+def run_batch(tasks, gates=None, release=None):
+    async def scenario():
+        bypass_cache.set(True)
+        if gates is not None:
+            for name in release or ():
+                gates[name] = asyncio.Event()
+        emitted = []
+
+        async def emit(result):
+            emitted.append(result)
+            # A finished task opens the gate of the slow one
+            for gate in (gates or {}).values():
+                gate.set()
+
+        await asyncio.wait_for(pipeline.run_batch(tasks, emit), 5)
+        return emitted
+
+    return asyncio.run(scenario())
+
+
+def test_every_task_is_reported_once_with_its_result(agents):
+    results = run_batch(["add", "bug in sub", "broken mul"])
+    by_index = {result["index"]: result for result in results}
+    assert len(results) == 3 and set(by_index) == {0, 1, 2}
+    assert by_index[0]["status"] == "completed" and by_index[0]["code"] == "code for add"
+    assert by_index[1]["status"] == "fixed" and by_index[1]["fixed_code"] == "code for bug in sub (fixed)"
+    assert by_index[2] == {"index": 2, "task_description": "broken mul",
+                           "status": "failed", "error": "planner is down"}
+
+
+def test_each_stage_reaches_every_task_before_the_next_stage(agents):
+    calls, _ = agents
+    run_batch(["a", "b", "c"])
+    stages = [stage for stage, _ in calls]
+    assert stages == ["plan"] * 3 + ["code"] * 3 + ["test"] * 3
+
+
+def test_results_are_emitted_as_tasks_finish_not_per_stage(agents):
+    calls, gates = agents
+    # "slow" holds the test stage until another task has been emitted
+    results = run_batch(["slow", "fast"], gates, release=["code for slow"])
+    assert [result["task_description"] for result in results] == ["fast", "slow"]
+
+
+def test_batch_endpoint_streams_one_line_per_task(agents):
+    with TestClient(main.app) as client:
+        response = client.post("/tasks/batch", json={"task_descriptions": ["add", "bug in sub"], "no_cache": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((line["index"], line["status"]) for line in lines) == [(0, "completed"), (1, "fixed")]
+
+
+def test_batch_endpoint_rejects_empty_and_oversized_batches(agents, monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_TASKS", 2)
+    with TestClient(main.app) as client:
+        assert client.post("/tasks/batch", json={"task_descriptions": []}).status_code == 400
+        assert client.post("/tasks/batch", json={"task_descriptions": ["a", "b", "c"]}).status_code == 413
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+import pipeline
+from dag import Stage, run_dag
+from sdlc_common.cache import bypass_cache
+
+
+def test_independent_stages_overlap():
+    async def scenario():
+        started = {"a": asyncio.Event(), "b": asyncio.Event()}
+
+        def waits_for(own, other):
+            async def run(stages):
+                started[own].set()
+                # Deadlocks unless both stages run at once
+                await asyncio.wait_for(started[other].wait(), 1)
+                return own
+            return run
+
+        async def join(stages):
+            return stages["a"].result() + stages["b"].result()
+
+        return await run_dag([
+            Stage("a", waits_for("a", "b")),
+            Stage("b", waits_for("b", "a")),
+            Stage("join", join, after=["a", "b"])
+        ])
+
+    assert asyncio.run(scenario()) == {"a": "a", "b": "b", "join": "ab"}
+
+
+def test_a_failed_stage_cancels_the_others():
+    cancelled = []
+
+    async def scenario():
+        async def slow(stages):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+
+        async def broken(stages):
+            raise ValueError("stage failed")
+
+        await run_dag([Stage("slow", slow), Stage("broken", broken)])
+
+    with pytest.raises(ValueError, match="stage failed"):
+        asyncio.run(scenario())
+    assert cancelled == ["slow"]
+
+
+def test_dependencies_must_come_first():
+    async def noop(stages):
+        return None
+
+    with pytest.raises(ValueError, match="unknown or later"):
+        asyncio.run(run_dag([Stage("test", noop, after=["code"]), Stage("code", noop)]))
+
+
+@pytest.fixture
+def dag_agents(monkeypatch):
+    """Fake agents for the DAG pipeline; records the order of their calls."""
+    monkeypatch.setattr(pipeline, "PIPELINE_DAG", True)
+    calls = []
+    started = {"tests": asyncio.Event(), "code": asyncio.Event()}
+
+    async def create_plan(task_description, on_delta=None):
+        return f"plan for {task_description}"
+
+    async def generate_tests(plan):
+        calls.append("generate_tests")
+        started["tests"].set()
+        # Deadlocks unless coding runs at the same time
+        await asyncio.wait_for(started["code"].wait(), 1)
+        if "untestable" in plan:
+            raise ValueError("no tests")
+        return {"test_main.py": "def test_it(): pass\n"}
+
+    async def code(input):
+        candidate = input.get("candidate", 0)
+        calls.append(f"code {candidate}")
+        started["code"].set()
+        await asyncio.wait_for(started["tests"].wait(), 1)
+        await asyncio.sleep(0.01 * candidate)
+        return {"code": f"code {candidate}"}
+
+    async def test(input):
+        calls.append(("test", input["code"], input["tests"]))
+        return {"status": "success"}
+
+    monkeypatch.setattr(pipeline.planner, "create_plan", create_plan)
+    monkeypatch.setattr(pipeline.tester, "generate_tests", generate_tests)
+    monkeypatch.setattr(pipeline.coder, "process", code)
+    monkeypatch.setattr(pipeline.tester, "process", test)
+    return calls
+
+
+def run(task_description):
+    async def scenario():
+        bypass_cache.set(True)
+        phases = []
+
+        async def emit(event):
+            phases.append(event["phase"])
+
+        return await pipeline.run_pipeline(task_description, emit), phases
+
+    return asyncio.run(scenario())
+
+
+def test_plan_derived_tests_are_generated_alongside_coding(dag_agents):
+    result, phases = run("sort a list")
+    assert result["status"] == "completed" and result["code"] == "code 0"
+    assert set(phases) == {"planning", "test_generation", "coding", "testing"}
+    assert dag_agents[-1] == ("test", "code 0", {"test_main.py": "def test_it(): pass\n"})
+
+
+def test_failed_test_generation_does_not_fail_the_run(dag_agents):
+    result, phases = run("untestable task")
+    assert result["status"] == "completed"
+    assert "test_generation" not in phases
+    assert dag_agents[-1] == ("test", "code 0", {})
+
+
+def test_the_first_passing_coder_candidate_is_kept(dag_agents, monkeypatch):
+    monkeypatch.setattr(pipeline, "CODER_CANDIDATES", 3)
+    checked = []
+
+    async def passes(code, tests):
+        checked.append(code)
+        return code == "code 1"
+
+    monkeypatch.setattr(pipeline.tester, "passes", passes)
+    result, _ = run("sort a list")
+    assert result["code"] == "code 1"
+    # Candidate 0 finished first but failed; candidate 2 was never checked
+    assert checked == ["code 0", "code 1"]
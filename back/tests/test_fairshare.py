@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from agents.metrics import render_fair_share
+from sdlc_common import fairshare
+from sdlc_common.fairshare import FairShare, load_api_keys, tenant
+
+
+def request(headers):
+    return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+
+def test_tenant_comes_from_the_api_key(monkeypatch):
+    monkeypatch.setattr(main, "API_KEYS", load_api_keys('{"secret-a": "team-a"}'))
+    assert main.request_tenant(request({"Authorization": "Bearer secret-a"})) == "team-a"
+    for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": "Basic secret-a"},
+                    {"X-User-Id": "team-a"}):
+        with pytest.raises(HTTPException) as error:
+            main.request_tenant(request(headers))
+        assert error.value.status_code == 401
+
+
+def test_without_api_keys_every_request_shares_one_tenant(monkeypatch):
+    monkeypatch.setattr(main, "API_KEYS", {})
+    assert main.request_tenant(request({"X-User-Id": "someone-else"})) == fairshare.DEFAULT_TENANT
+
+
+def test_tenant_labels_are_escaped():
+    shares = FairShare(1, {})
+    shares.tenant('a"} evil{x="1\\\n')
+    text = render_fair_share(shares.stats())
+    assert 'tenant="a\\"} evil{x=\\"1\\\\\\n"' in text
+    assert all(line.startswith(("#", "tenant_")) for line in text.splitlines())
+
+
+def test_idle_tenants_are_forgotten(monkeypatch):
+    monkeypatch.setattr(fairshare, "FAIR_SHARE_IDLE", 0)
+
+    async def scenario():
+        shares = FairShare(2, {})
+        for name in ("a", "b", "c"):
+            tenant.set(name)
+            await shares.run(lambda: asyncio.sleep(0), 10)
+        return shares
+
+    shares = asyncio.run(scenario())
+    # Each new tenant sweeps the idle ones before it
+    assert list(shares.stats()["tenants"]) == ["c"]
+
+
+def test_admission_only_scans_backlogged_tenants():
+    async def scenario():
+        shares = FairShare(1, {})
+        for i in range(1000):
+            shares.tenant(f"idle{i}")
+        gate = asyncio.Event()
+        order = []
+
+        async def call(name):
+            tenant.set(name)
+            await shares.run(lambda: gate.wait() if name == "first" else asyncio.sleep(0), 10)
+            order.append(name)
+
+        tasks = [asyncio.create_task(call(name)) for name in ("first", "x", "y")]
+        await asyncio.sleep(0)
+        assert set(shares._backlogged) == {"x", "y"}
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert not shares._backlogged
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "x", "y"]
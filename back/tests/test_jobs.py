@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+
+import jobs
+from jobs import JobQueue, JobStore, QueueFull
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    async def run_pipeline(task_description, emit=None):
+        await emit({"event": "phase", "phase": "planning", "result": "plan"})
+        return {"status": "completed", "plan": "plan"}
+
+    monkeypatch.setattr(jobs, "run_pipeline", run_pipeline)
+    return JobStore(str(tmp_path / "data" / "jobs.db"))
+
+
+async def finished(queue, job_id):
+    for _ in range(200):
+        job = queue.store.get(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_submit_starts_the_workers_when_needed(store):
+    async def scenario():
+        queue = JobQueue(store, workers=1)
+        job_id = await queue.submit({"task_description": "sort a list"})
+        job = await finished(queue, job_id)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "completed"
+    assert job["partial"] == {"planning": "plan"}
+
+
+def test_database_writes_run_off_the_event_loop(store, monkeypatch):
+    threads = set()
+    create, update = store.create, store.update
+
+    def record(method):
+        def call(*args, **kwargs):
+            threads.add(threading.get_ident())
+            return method(*args, **kwargs)
+        return call
+
+    monkeypatch.setattr(store, "create", record(create))
+    monkeypatch.setattr(store, "update", record(update))
+
+    async def scenario():
+        queue = JobQueue(store, workers=1)
+        await finished(queue, await queue.submit({"task_description": "sort a list"}))
+        await queue.stop()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert threads and loop_thread not in threads
+
+
+def test_a_full_queue_rejects_jobs(store):
+    async def scenario():
+        queue = JobQueue(store, workers=0, max_depth=2)
+        await queue.start()
+        for _ in range(2):
+            await queue.submit({"task_description": "sort a list"})
+        with pytest.raises(QueueFull):
+            await queue.submit({"task_description": "sort a list"})
+
+    asyncio.run(scenario())
+
+
+def test_submitting_before_the_startup_event_starts_one_pool(store, monkeypatch):
+    runs = []
+
+    async def run_pipeline(task_description, emit=None):
+        runs.append(task_description)
+        await asyncio.sleep(0.05)
+        return {"status": "completed", "plan": "plan"}
+
+    monkeypatch.setattr(jobs, "run_pipeline", run_pipeline)
+
+    async def scenario():
+        queue = JobQueue(store, workers=2)
+        job_id = await queue.submit({"task_description": "sort a list"})
+        # The startup event arrives after the first request
+        await queue.start()
+        assert len(queue._tasks) == 2
+        job = await finished(queue, job_id)
+        await queue.stop()
+        assert all(task.done() for task in asyncio.all_tasks() if task is not asyncio.current_task())
+        return job
+
+    assert asyncio.run(scenario())["status"] == "completed"
+    # The job was queued once, not again by the second start's recovery
+    assert runs == ["sort a list"]
+
+
+def test_jobs_queued_at_stop_are_recovered_by_the_next_start(store):
+    async def scenario():
+        idle = JobQueue(store, workers=0)
+        job_id = await idle.submit({"task_description": "sort a list"})
+        await idle.stop()
+        queue = JobQueue(store, workers=1)
+        await queue.start()
+        job = await finished(queue, job_id)
+        await queue.stop()
+        return job
+
+    assert asyncio.run(scenario())["status"] == "completed"
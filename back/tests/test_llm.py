@@ -0,0 +1,76 @@
+import asyncio
+
+from google.adk.models import LiteLlm
+from google.adk.models.lite_llm import LiteLLMClient
+from litellm import ModelResponse, ModelResponseStream
+
+from agents import llm
+from agents.llm import AdkTextModel, call_model, stream_model
+
+
+class FakeProvider(LiteLLMClient):
+    """Stands in for litellm.acompletion behind a real LiteLlm."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        self.calls.append({"model": model, "messages": messages, **kwargs})
+        if not kwargs.get("stream"):
+            return ModelResponse(choices=[{"message": {"role": "assistant", "content": self.text},
+                                           "finish_reason": "stop"}])
+
+        async def chunks():
+            for i, word in enumerate(self.text.split(" ")):
+                delta = word if i == 0 else " " + word
+                yield ModelResponseStream(choices=[{"delta": {"role": "assistant", "content": delta}}])
+            yield ModelResponseStream(choices=[{"delta": {}, "finish_reason": "stop"}])
+
+        return chunks()
+
+
+def model(text):
+    llm = LiteLlm(model="gemini/gemini-2.0-flash", api_key="test-key")
+    provider = FakeProvider(text)
+    llm.llm_client = provider
+    return AdkTextModel(llm), provider
+
+
+def test_call_model_goes_through_generate_content_async():
+    client, provider = model('{"main.py": "print(1)"}')
+    text = asyncio.run(call_model(client, "Write main.py", timeout=5))
+    assert text == '{"main.py": "print(1)"}'
+    assert provider.calls[0]["model"] == "gemini/gemini-2.0-flash"
+    assert provider.calls[0]["messages"][-1]["content"] == "Write main.py"
+
+
+def test_stream_model_yields_each_delta_once():
+    client, _ = model("one two three")
+
+    async def collect():
+        return [delta async for delta in stream_model(client, "Count", timeout=5)]
+
+    deltas = asyncio.run(collect())
+    assert len(deltas) == 3
+    assert "".join(deltas) == "one two three"
+
+
+def test_model_slots_work_under_each_event_loop(monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_WORKERS", 1)
+    order = []
+
+    async def hold(n):
+        async with llm._slot():
+            order.append(n)
+            await asyncio.sleep(0.01)
+            order.append(-n)
+
+    async def contend():
+        # Waiting on a full semaphore binds it to the running loop
+        await asyncio.gather(hold(1), hold(2))
+
+    asyncio.run(contend())
+    asyncio.run(contend())
+    # One slot: the second holder waits for the first under both loops
+    assert order == [1, -1, 2, -2] * 2
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+import pipeline
+from agents.metrics import AgentMetrics, active_runs, render_prometheus
+from sdlc_common.cache import bypass_cache
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    """Planner calls wait on the returned event; "broken" tasks fail to plan."""
+    gate = asyncio.Event()
+
+    async def generate_routed(prompt, accept=None, on_delta=None):
+        if "broken" in prompt:
+            raise ValueError("planner is down")
+        await gate.wait()
+        return "plan"
+
+    async def generate_code_map(prompt, on_delta=None):
+        return {"main.py": "x = 1\n"}
+
+    async def test(input):
+        with pipeline.tester.track():
+            return {"status": "success"}
+
+    monkeypatch.setattr(pipeline.planner, "generate_routed", generate_routed)
+    monkeypatch.setattr(pipeline.coder, "generate_code_map", generate_code_map)
+    monkeypatch.setattr(pipeline.tester, "process", test)
+    return gate
+
+
+def test_concurrent_runs_keep_their_own_agent_state(gate):
+    planner = pipeline.planner.metrics
+    before = planner.completed, planner.failed
+
+    async def scenario():
+        gate.clear()
+        bypass_cache.set(True)
+        slow = asyncio.ensure_future(pipeline.run_pipeline("sort a list"))
+        broken = asyncio.ensure_future(pipeline.run_pipeline("broken sum"))
+        with pytest.raises(ValueError):
+            await broken
+        # The failed run is gone; the other one is still planning
+        assert list(active_runs.values()) == [
+            {"planner": "working", "coder": "pending", "tester": "pending", "fixer": "pending"}
+        ]
+        assert planner.in_flight == 1
+        assert pipeline.planner.get_status()["status"] == "working"
+        gate.set()
+        return await slow
+
+    assert asyncio.run(scenario())["status"] == "completed"
+    assert active_runs == {}
+    assert (planner.completed - before[0], planner.failed - before[1]) == (1, 1)
+    assert planner.in_flight == 0 and pipeline.planner.get_status()["status"] == "idle"
+
+
+def test_latencies_feed_the_histogram_and_percentiles():
+    metrics = AgentMetrics("coder")
+    for duration in (0.1, 0.2, 0.7, 3.0):
+        metrics.observe(duration, ok=True)
+    metrics.observe(200.0, ok=False)
+    assert metrics.percentile(50) == 0.7 and metrics.percentile(99) == 200.0
+    text = render_prometheus([metrics])
+    assert 'agent_latency_seconds_bucket{agent="coder",le="0.5"} 2' in text
+    assert 'agent_latency_seconds_bucket{agent="coder",le="5.0"} 4' in text
+    assert 'agent_latency_seconds_bucket{agent="coder",le="+Inf"} 5' in text
+    assert 'agent_calls_total{agent="coder",outcome="failure"} 1' in text
+
+
+def test_cached_calls_cost_no_tokens():
+    metrics = AgentMetrics("planner")
+    metrics.record_llm("gemini-2.0-flash", 1_000_000, 0, cached=True)
+    metrics.record_llm("gemini-2.0-flash", 1_000_000, 1_000_000, cached=False)
+    snapshot = metrics.snapshot()
+    assert snapshot["cache_hits"] == 1 and snapshot["prompt_tokens"] == 1_000_000
+    assert snapshot["cost_usd"] == pytest.approx(0.5)
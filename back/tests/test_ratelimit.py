@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from sdlc_common import ratelimit
+from sdlc_common.ratelimit import RateLimited, Scheduler, TokenBucket, rate_limit_info
+
+
+class TooManyRequests(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.retry_after = retry_after
+
+
+def test_no_limits_unless_configured():
+    # The test environment sets neither RATE_LIMITS nor RATE_LIMIT_PRESET
+    assert ratelimit.RATE_LIMITS == {}
+    assert Scheduler(ratelimit.RATE_LIMITS).limiter("gemini/gemini-2.0-flash") is None
+    assert Scheduler(ratelimit.PRESETS["free"]).limiter("gemini/gemini-2.0-flash").requests.limit == 15
+
+
+def test_burst_is_a_second_of_the_rate_not_a_minute():
+    assert TokenBucket(600).capacity == 10
+    assert TokenBucket(15).capacity == 1
+    assert TokenBucket(600, burst=3).capacity == 3
+
+
+def test_requests_beyond_the_burst_are_spread_over_time():
+    async def scenario():
+        scheduler = Scheduler({"fake/model": {"rpm": 600, "tpm": 10 ** 9}})
+        started = time.monotonic()
+        finished = []
+
+        async def one():
+            await scheduler.acquire("fake/model", 10)
+            finished.append(time.monotonic() - started)
+
+        await asyncio.gather(*[one() for _ in range(15)])
+        return sorted(finished)
+
+    finished = asyncio.run(scenario())
+    # Ten at once, then one every 0.1s
+    assert finished[9] < 0.05
+    assert finished[14] == pytest.approx(0.5, abs=0.1)
+
+
+def test_waiting_calls_are_served_by_priority():
+    async def scenario():
+        scheduler = Scheduler({"fake/model": {"rpm": 600, "tpm": 10 ** 9, "rpm_burst": 1}})
+        await scheduler.acquire("fake/model", 10)
+        order = []
+
+        async def one(lane):
+            await scheduler.acquire("fake/model", 10, ratelimit.PRIORITY[lane])
+            order.append(lane)
+
+        await asyncio.gather(*[one(lane) for lane in ("plan", "code", "test", "fix")])
+        return order
+
+    assert asyncio.run(scenario()) == ["fix", "test", "code", "plan"]
+
+
+def test_rate_limit_errors_are_retried_after_the_hint(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise TooManyRequests(retry_after=0.1)
+        return "ok"
+
+    scheduler = Scheduler({"fake/model": {"rpm": 6000, "tpm": 10 ** 9}})
+    assert asyncio.run(scheduler.run("fake/model", call, 10)) == "ok"
+    assert attempts[2] - attempts[0] >= 0.2
+    assert scheduler.retries == 2
+    # Each 429 lowered the request rate below the configured one
+    assert scheduler.limiter("fake/model").requests.rate < 100
+
+
+def test_gives_up_after_the_retry_budget(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_RETRIES", 2)
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.001)
+
+    async def call():
+        raise TooManyRequests()
+
+    with pytest.raises(RateLimited):
+        asyncio.run(Scheduler({}).run("fake/model", call, 10))
+
+
+def test_other_errors_are_not_retried():
+    async def call():
+        raise ValueError("bad request")
+
+    scheduler = Scheduler({})
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run("fake/model", call, 10))
+    assert scheduler.retries == 0
+
+
+def test_rate_limit_info_reads_the_retry_hint():
+    assert rate_limit_info(TooManyRequests(retry_after=3)) == (True, 3)
+    assert rate_limit_info(Exception('RESOURCE_EXHAUSTED {"retryDelay": "12s"}')) == (True, 12.0)
+    assert rate_limit_info(ValueError("400 bad request")) == (False, None)
+
+
+def test_retry_hint_is_honoured_without_configured_limits(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.001)
+    attempts = []
+
+    async def call():
+        attempts.append(time.monotonic())
+        if len(attempts) < 2:
+            raise TooManyRequests(retry_after=0.3)
+        return "ok"
+
+    scheduler = Scheduler({})
+    assert scheduler.limiter("fake/model") is None
+    assert asyncio.run(scheduler.run("fake/model", call, 10)) == "ok"
+    assert attempts[1] - attempts[0] >= 0.3
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from agents.coder import CoderAgent
+from agents.llm import call_model
+from sdlc_common.cache import bypass_cache
+from sdlc_common.replay import (Fixtures, MissingFixture, RecordingModel, ReplayModel,
+                                recording_completion, replay_completion)
+
+
+class Provider:
+    """An async model client that numbers its answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_text_async(self, prompt):
+        self.calls += 1
+        return f"answer {self.calls} to {prompt}"
+
+
+def test_recorded_responses_replay_offline_in_order(tmp_path):
+    path = str(tmp_path / "fixtures" / "llm.jsonl")
+    provider = Provider()
+    recorder = RecordingModel(provider, Fixtures(path), "gemini-2.0-flash")
+
+    async def record():
+        return [await call_model(recorder, prompt, timeout=5) for prompt in ("plan", "code", "plan")]
+
+    recorded = asyncio.run(record())
+    assert recorded == ["answer 1 to plan", "answer 2 to code", "answer 3 to plan"]
+
+    # A new process reads the fixture file
+    fixtures = Fixtures(path)
+    assert len(fixtures) == 3
+    replayed = ReplayModel(fixtures, "gemini-2.0-flash", speed=0)
+
+    async def replay():
+        return [await call_model(replayed, prompt, timeout=5) for prompt in ("plan", "plan", "code", "plan")]
+
+    # Repeated prompts get their recorded answers in turn, then start over
+    assert asyncio.run(replay()) == ["answer 1 to plan", "answer 3 to plan", "answer 2 to code", "answer 1 to plan"]
+    assert replayed.calls == 4 and replayed.prompt_tokens > 0 and replayed.completion_tokens > 0
+
+
+def test_prompts_and_models_never_recorded_are_missing(tmp_path):
+    fixtures = Fixtures(str(tmp_path / "llm.jsonl"))
+    fixtures.record("gemini-2.0-flash", "plan", "a plan", 0.0)
+    with pytest.raises(MissingFixture):
+        asyncio.run(ReplayModel(fixtures, "gemini-2.0-flash", speed=0).generate_text_async("code"))
+    with pytest.raises(MissingFixture):
+        asyncio.run(ReplayModel(fixtures, "gemini-2.0-flash-lite", speed=0).generate_text_async("plan"))
+
+
+def test_replay_sleeps_the_recorded_latency_scaled_by_speed(tmp_path):
+    fixtures = Fixtures(str(tmp_path / "llm.jsonl"))
+    fixtures.record("gemini-2.0-flash", "plan", "a plan", 0.4)
+    started = time.perf_counter()
+    asyncio.run(ReplayModel(fixtures, "gemini-2.0-flash", speed=0.25).generate_text_async("plan"))
+    assert 0.1 <= time.perf_counter() - started < 0.3
+
+
+def test_agents_run_on_a_replayed_model(tmp_path):
+    fixtures = Fixtures(str(tmp_path / "llm.jsonl"))
+    fixtures.record("gemini-2.0-flash", "write it", '{"main.py": "x = 1"}', 0.0)
+    agent = CoderAgent()
+    agent.model = ReplayModel(fixtures, "gemini-2.0-flash", speed=0)
+
+    async def scenario():
+        bypass_cache.set(True)
+        return await agent.generate_response("write it")
+
+    assert asyncio.run(scenario()) == '{"main.py": "x = 1"}'
+
+
+def test_completions_record_usage_and_replay_it(tmp_path):
+    path = str(tmp_path / "llm.jsonl")
+
+    async def acompletion(model, messages, **params):
+        return {"choices": [{"message": {"role": "assistant", "content": "done"}}],
+                "usage": {"prompt_tokens": 12, "completion_tokens": 3}}
+
+    # A cache-marked prefix arrives as a list of parts
+    messages = [{"role": "system", "content": [{"type": "text", "text": "Fix it."}]},
+                {"role": "user", "content": "x = 1"}]
+    asyncio.run(recording_completion(acompletion, Fixtures(path))(model="gemini/gemini-2.0-flash",
+                                                                  messages=messages, temperature=0))
+    replayed = asyncio.run(replay_completion(Fixtures(path), speed=0)(model="gemini/gemini-2.0-flash",
+                                                                      messages=messages))
+    assert replayed["choices"][0]["message"]["content"] == "done"
+    assert replayed["usage"] == {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    with open(path) as f:
+        assert json.loads(f.readline())["prompt_preview"] == "Fix it.\nx = 1"
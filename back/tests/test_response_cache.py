@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from agents import base_agent
+from agents.coder import CoderAgent
+from sdlc_common.cache import ResponseCache
+from sdlc_common.routing import ModelRouter
+
+
+def rows(db_path):
+    with sqlite3.connect(db_path) as db:
+        return dict(db.execute("SELECT key, value FROM responses").fetchall())
+
+
+def test_set_returns_before_the_write_and_flush_commits_it(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=db_path)
+    for i in range(100):
+        cache.set(f"k{i}", f"v{i}")
+    assert cache.get("k5") == "v5"
+    cache.flush()
+    assert len(rows(db_path)) == 100
+    cache.close()
+
+    # A new process finds the entries on disk
+    reopened = ResponseCache(db_path=db_path)
+    assert reopened.get("k99") == "v99"
+    reopened.close()
+
+
+def test_expired_rows_are_deleted_periodically(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(ttl=0.2, db_path=db_path, expire_interval=0.1)
+    cache.set("old", "value")
+    cache.flush()
+    assert "old" in rows(db_path)
+    time.sleep(0.5)
+    assert rows(db_path) == {}
+    cache.close()
+
+
+def test_created_is_indexed(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    ResponseCache(db_path=db_path).close()
+    with sqlite3.connect(db_path) as db:
+        plan = db.execute("EXPLAIN QUERY PLAN DELETE FROM responses WHERE created < 0").fetchall()
+    assert "responses_created" in str(plan)
+
+
+def test_aget_reads_the_file_off_the_event_loop(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    writer = ResponseCache(db_path=db_path)
+    writer.set("k", "v")
+    writer.close()
+
+    cache = ResponseCache(db_path=db_path)
+    threads = []
+    load = cache._load
+
+    def record(*args):
+        threads.append(threading.get_ident())
+        return load(*args)
+
+    monkeypatch.setattr(cache, "_load", record)
+
+    async def scenario():
+        return await cache.aget("k"), await cache.aget("k"), await cache.aget("missing"), threading.get_ident()
+
+    first, second, missing, loop_thread = asyncio.run(scenario())
+    assert (first, second, missing) == ("v", "v", None)
+    # The second read is served from memory
+    assert len(threads) == 2 and loop_thread not in threads
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_only_accepted_routed_output_is_cached(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(base_agent, "response_cache", cache)
+    monkeypatch.setattr(base_agent, "router", ModelRouter({"code": ["cheap", "pricey"]}))
+    agent = CoderAgent()
+    calls = []
+
+    async def generate_response(prompt, on_delta=None, model_name=None, cache_result=True):
+        assert cache_result is False
+        calls.append(model_name)
+        return f"output of {model_name}"
+
+    monkeypatch.setattr(agent, "generate_response", generate_response)
+    text = asyncio.run(agent.generate_routed("write it", lambda text: "pricey" in text))
+    assert text == "output of pricey" and calls == ["cheap", "pricey"]
+    assert cache.get(cache.make_key("cheap", "write it")) is None
+    assert cache.get(cache.make_key("pricey", "write it")) == "output of pricey"
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from sdlc_common.deadline import DeadlineExceeded
+from sdlc_common.ratelimit import RateLimited
+from sdlc_common.routing import ModelRouter
+
+
+def router():
+    return ModelRouter({"code": ["cheap", "pricey"]})
+
+
+def run(router, fail, accept=None):
+    calls = []
+
+    async def call(model, final):
+        calls.append(model)
+        if model == "cheap" and fail is not None:
+            raise fail
+        return f"output of {model}"
+
+    try:
+        return asyncio.run(router.run("code", call, accept)), calls
+    except BaseException as e:
+        e.calls = calls
+        raise
+
+
+def test_a_rejected_output_escalates():
+    text, calls = run(router(), None, accept=lambda text: "pricey" in text)
+    assert text == "output of pricey" and calls == ["cheap", "pricey"]
+
+
+def test_a_provider_error_escalates():
+    text, calls = run(router(), ConnectionError("503 Service Unavailable"))
+    assert text == "output of pricey" and calls == ["cheap", "pricey"]
+
+
+@pytest.mark.parametrize("error", [
+    DeadlineExceeded("Request deadline exceeded"),
+    RateLimited("Rate limited by provider for cheap", 30),
+    asyncio.CancelledError()
+])
+def test_deadline_throttling_and_cancellation_do_not_escalate(error):
+    with pytest.raises(type(error)) as raised:
+        run(router(), error)
+    assert raised.value.calls == ["cheap"]
@@ -0,0 +1,63 @@
+import asyncio
+import socket
+
+import pytest
+
+from sdlc_common import sandbox
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    # The test interpreter may live where SANDBOX_USER cannot run it
+    monkeypatch.setattr(sandbox, "SANDBOX_USER", "")
+    monkeypatch.setattr(sandbox, "_probed", False)
+    if asyncio.run(sandbox._isolation_prefix()) is None:
+        pytest.skip("this host cannot create namespaces")
+    yield
+    sandbox._probed = False
+
+
+def run(files):
+    return asyncio.run(sandbox.execute(files))
+
+
+def test_raw_sockets_cannot_reach_the_host(isolated):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    port = server.getsockname()[1]
+    try:
+        result = run({"test_net.py": (
+            "import _socket\n"
+            "def test_connect():\n"
+            "    s = _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM)\n"
+            f"    s.connect(('127.0.0.1', {port}))\n"
+        )})
+    finally:
+        server.close()
+    assert result["status"] == "failed"
+    assert result["failures"][0]["kind"] == "test"
+    assert "test_connect" in result["failures"][0]["message"]
+
+
+def test_rlimits_apply_to_the_code(isolated):
+    memory = sandbox.SANDBOX_MEMORY_MB * 1024 * 1024
+    result = run({"test_limits.py": (
+        "import resource\n"
+        "def test_limits():\n"
+        f"    assert resource.getrlimit(resource.RLIMIT_AS) == ({memory}, {memory})\n"
+        f"    assert resource.getrlimit(resource.RLIMIT_CPU)[0] == {sandbox.SANDBOX_CPU_SECONDS}\n"
+    )})
+    assert result == {**result, "status": "passed", "tests_run": True}
+
+
+def test_syntax_errors_are_reported(isolated):
+    result = run({"app.py": "def broken(:\n"})
+    assert result["failures"][0]["kind"] == "syntax"
+
+
+def test_code_is_not_run_without_isolation(monkeypatch):
+    monkeypatch.setattr(sandbox, "_probed", True)
+    monkeypatch.setattr(sandbox, "_isolation", None)
+    result = run({"app.py": "raise SystemExit(1)\n"})
+    assert result["status"] == "skipped" and result["failures"] == []
@@ -0,0 +1,50 @@
+import contextvars
+
+import pytest
+
+from sdlc_common.fairshare import tenant
+from sdlc_common.semantic_cache import SemanticCache, same_terms, terms
+
+
+def same(a, b):
+    return same_terms(terms(a), terms(b))
+
+
+@pytest.mark.parametrize("a, b", [
+    ("sort dicts by key", "sort dictionaries by a given key"),
+    ("reverse a list", "reversing a list"),
+    ("count lines of a file", "count the line in a file"),
+    ("parse a config file", "parse a configuration file"),
+])
+def test_paraphrases_match(a, b):
+    assert same(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("primes below 10000", "primes below 1000"),
+    ("parse a datetime string", "parse a date string"),
+    ("sort dicts by key", "sort dicts by key in descending order"),
+    ("encode as utf8", "encode as utf16"),
+    ("read a file", "read a filesystem"),
+])
+def test_different_tasks_do_not_match(a, b):
+    assert not same(a, b)
+
+
+def in_tenant(name, call, *args, **kwargs):
+    def run():
+        tenant.set(name)
+        return call(*args, **kwargs)
+    return contextvars.copy_context().run(run)
+
+
+def test_entries_are_never_served_to_another_tenant():
+    cache = SemanticCache(max_entries=8)
+    in_tenant("team-a", cache.update, "sort dicts by key", plan="plan a")
+    assert in_tenant("team-b", cache.lookup, "sort dictionaries by key") is None
+    assert in_tenant("team-a", cache.lookup, "sort dictionaries by key")["plan"] == "plan a"
+
+    in_tenant("team-b", cache.update, "sort dicts by key", plan="plan b")
+    assert in_tenant("team-a", cache.lookup, "sort dicts by key")["plan"] == "plan a"
+    assert in_tenant("team-b", cache.lookup, "sort dicts by key")["plan"] == "plan b"
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+import main
+from sdlc_common.deadline import remaining, set_deadline
+from sdlc_common.fairshare import tenant
+
+
+@pytest.fixture
+def pipeline_runs(monkeypatch):
+    """Replace the pipeline with one that records who started it and how long it had."""
+    runs = []
+
+    async def run_pipeline(task_description, emit=None):
+        runs.append((tenant.get(), remaining()))
+        await asyncio.sleep(0.2)
+        return {"status": "completed", "tenant": tenant.get()}
+
+    monkeypatch.setattr(main, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(main, "SINGLE_FLIGHT", True)
+    return runs
+
+
+def start(name, timeout, task="sort a list"):
+    async def call():
+        tenant.set(name)
+        set_deadline(timeout)
+        return await main.run_once(main.TaskRequest(task_description=task), None, timeout)
+    return asyncio.ensure_future(call())
+
+
+def test_identical_requests_of_one_tenant_share_a_run(pipeline_runs):
+    async def scenario():
+        return await asyncio.gather(start("team-a", 5), start("team-a", 5), start("team-a", 5, "sort  a list"))
+
+    assert all(result["tenant"] == "team-a" for result in asyncio.run(scenario()))
+    assert len(pipeline_runs) == 1
+
+
+def test_tenants_never_share_a_run(pipeline_runs):
+    async def scenario():
+        return await asyncio.gather(start("team-a", 5), start("team-b", 5))
+
+    results = asyncio.run(scenario())
+    assert [result["tenant"] for result in results] == ["team-a", "team-b"]
+    assert sorted(name for name, _ in pipeline_runs) == ["team-a", "team-b"]
+
+
+def test_requests_with_another_timeout_get_their_own_run(pipeline_runs):
+    async def scenario():
+        return await asyncio.gather(start("team-a", 0.5), start("team-a", 30))
+
+    asyncio.run(scenario())
+    # The longer request is not run under the shorter one's deadline
+    assert sorted(round(left) for _, left in pipeline_runs) == [0, 30]
+
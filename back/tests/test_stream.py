@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import pipeline
+
+
+@pytest.fixture
+def agents(monkeypatch):
+    """Fake agents that stream one delta each; "bug" tasks fail their tests, "broken" ones fail to plan."""
+
+    async def create_plan(task_description, on_delta=None):
+        if "broken" in task_description:
+            raise ValueError("planner is down")
+        await on_delta("plan")
+        return f"plan for {task_description}"
+
+    async def code(input):
+        await input["on_delta"]("code")
+        return {"code": input["plan"].replace("plan for", "code for")}
+
+    async def test(input):
+        if "bug" in input["code"]:
+            return {"status": "failure", "errors": ["boom"]}
+        return {}
+
+    async def fix(input):
+        return {"code": input["code"] + " (fixed)"}
+
+    monkeypatch.setattr(pipeline.planner, "create_plan", create_plan)
+    monkeypatch.setattr(pipeline.coder, "process", code)
+    monkeypatch.setattr(pipeline.tester, "process", test)
+    monkeypatch.setattr(pipeline.fixer, "process", fix)
+
+
+def stream(task_description):
+    with TestClient(main.app) as client:
+        response = client.post("/task/stream", json={"task_description": task_description, "no_cache": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        event = json.loads(data[len("data: "):])
+        assert name == f"event: {event['event']}"
+        events.append(event)
+    return events
+
+
+def test_phases_stream_in_order_and_end_with_the_result(agents):
+    events = stream("bug in sub")
+    assert [(e["event"], e.get("phase")) for e in events] == [
+        ("delta", "planning"), ("phase", "planning"),
+        ("delta", "coding"), ("phase", "coding"),
+        ("phase", "testing"), ("phase", "fixing"), ("done", None)
+    ]
+    assert events[1]["result"] == "plan for bug in sub"
+    assert events[4]["result"] == {"status": "failure", "errors": ["boom"]}
+    assert events[5]["result"] == "code for bug in sub (fixed)"
+    assert events[-1]["result"]["status"] == "fixed"
+
+
+def test_a_passing_task_skips_the_fixing_phase(agents):
+    events = stream("add")
+    assert [e.get("phase") for e in events if e["event"] == "phase"] == ["planning", "coding", "testing"]
+    # A test response without a status counts as a success
+    assert events[-1]["result"]["test_results"] == {"status": "success"}
+
+
+def test_a_failed_run_ends_the_stream_with_an_error_event(agents):
+    assert stream("broken mul") == [{"event": "error", "detail": "planner is down"}]
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+from sdlc_common.structured import ensure_code_map, parse_code_map
+
+FILES = {"main.py": "def add(a, b):\n    return a + b\n", "test_main.py": "from main import add\n"}
+TEXT = json.dumps(FILES)
+
+
+def test_plain_json():
+    assert parse_code_map(TEXT) == FILES
+
+
+@pytest.mark.parametrize("reply", [
+    f"```json\n{TEXT}\n```",
+    f"```\n{TEXT}\n```",
+    f"Here are the files:\n```json\n{TEXT}\n```\nLet me know if you need changes.",
+])
+def test_fenced_json(reply):
+    assert parse_code_map(reply) == FILES
+
+
+def test_trailing_prose():
+    assert parse_code_map(f"{TEXT}\n\nThe add function returns the sum {{a, b}}.") == FILES
+    assert parse_code_map(f"Sure! {TEXT} Hope this helps.") == FILES
+
+
+def test_truncated_object_keeps_the_complete_files():
+    cut = TEXT[:TEXT.index("from main") + 4]
+    assert parse_code_map(cut) == {"main.py": FILES["main.py"], "test_main.py": "from"}
+    # A key cut off before its value is dropped
+    assert parse_code_map('{"main.py": "x = 1\\n", "util') == {"main.py": "x = 1\n"}
+    assert parse_code_map('{"main.py": "x = 1\\n", "util.py":') == {"main.py": "x = 1\n"}
+
+
+@pytest.mark.parametrize("reply", ['["main.py", "print(1)"]', '"main.py"', "42", "null", "{}"])
+def test_non_dict_json_is_rejected(reply):
+    assert parse_code_map(reply) is None
+
+
+@pytest.mark.parametrize("reply", [
+    '{"main.py": 1}',
+    '{"main.py": ["print(1)"]}',
+    '{"main.py": null}',
+    '{"main.py": "print(1)", "config.json": {"debug": true}}',
+])
+def test_non_string_values_are_rejected(reply):
+    assert parse_code_map(reply) is None
+
+
+@pytest.mark.parametrize("name", ["/etc/passwd", "../outside.py", "  "])
+def test_unsafe_filenames_are_rejected(name):
+    assert parse_code_map(json.dumps({name: "x = 1"})) is None
+
+
+def test_unusable_replies_are_reasked_once():
+    prompts = []
+
+    async def reask(correction):
+        prompts.append(correction)
+        return TEXT
+
+    assert asyncio.run(ensure_code_map("I cannot do that.", reask)) == FILES
+    assert len(prompts) == 1 and "I cannot do that." in prompts[0]
+    assert asyncio.run(ensure_code_map(TEXT, reask)) == FILES
+    assert len(prompts) == 1
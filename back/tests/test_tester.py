@@ -0,0 +1,16 @@
+import asyncio
+
+from agents.tester import TesterAgent
+
+
+def test_review_chunks_keeps_a_finding_repeated_in_another_file(monkeypatch):
+    finding = "Function main has no error handling for missing input"
+    agent = TesterAgent()
+
+    async def generate_routed(prompt):
+        # Every file gets the same finding, twice
+        return f"{finding}\n{finding}"
+
+    monkeypatch.setattr(agent, "generate_routed", generate_routed)
+    report = asyncio.run(agent.review_chunks({"a.py": "{}", "b.py": "{}"}))
+    assert report == f"### a.py\n{finding}\n\n### b.py\n{finding}"
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+from agents.coder import CoderAgent
+from sdlc_common import tracing
+from sdlc_common.cache import bypass_cache
+from sdlc_common.tracing import NOOP, current_span, span, to_otlp
+
+
+class Model:
+    async def generate_text_async(self, prompt):
+        return '{"main.py": "x = 1"}'
+
+
+@pytest.fixture
+def traces(tmp_path, monkeypatch):
+    """Sample every trace into a JSONL file; returns a reader of the exported spans."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT", "jsonl")
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(path))
+
+    def exported():
+        tracing.flush()
+        with open(path) as f:
+            return {s["name"]: s for s in map(json.loads, f)}
+
+    return exported
+
+
+def test_model_calls_are_traced_with_their_tokens(traces):
+    agent = CoderAgent()
+    agent.model = Model()
+    tokens = agent.metrics.prompt_tokens
+
+    async def scenario():
+        bypass_cache.set(True)
+        with span("task.start"):
+            with agent.track():
+                return await agent.generate_response("write it")
+
+    asyncio.run(scenario())
+    spans = traces()
+    root, call = spans["task.start"], spans["llm.call"]
+    assert spans["agent.coder"]["parent_id"] == root["span_id"]
+    assert call["parent_id"] == spans["agent.coder"]["span_id"]
+    assert {s["trace_id"] for s in spans.values()} == {root["trace_id"]}
+    assert call["attributes"]["agent"] == "coder" and call["attributes"]["cache_hit"] is False
+    assert call["attributes"]["completion_tokens"] > 0
+    assert agent.metrics.prompt_tokens - tokens == call["attributes"]["prompt_tokens"]
+
+
+def test_a_failed_span_records_its_error(traces):
+    with pytest.raises(ValueError):
+        with span("pipeline") as trace:
+            trace.set(mode="sequential")
+            raise ValueError("planner is down")
+    exported = traces()["pipeline"]
+    assert exported["error"] == "ValueError" and exported["attributes"] == {"mode": "sequential"}
+    assert exported["duration"] >= 0
+
+
+def test_unsampled_traces_do_no_work(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(tracing, "TRACE_EXPORT", "jsonl")
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(tracing._exporter, "submit", submitted.append)
+    with span("task.start") as root:
+        with span("pipeline") as child:
+            assert root is NOOP and child is NOOP and current_span() is NOOP
+    assert submitted == []
+
+
+def test_otlp_payload_carries_parents_attributes_and_status():
+    parent = tracing.Span("pipeline", "a" * 32, None, {"tasks": 3, "dag": False})
+    child = tracing.Span("llm.call", parent.trace_id, parent.span_id, {"model": "gemini-2.0-flash"})
+    child.error = "TimeoutError"
+    spans = to_otlp([parent, child])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert "parentSpanId" not in spans[0] and spans[1]["parentSpanId"] == parent.span_id
+    assert spans[0]["attributes"] == [{"key": "tasks", "value": {"intValue": "3"}},
+                                      {"key": "dag", "value": {"boolValue": False}}]
+    assert spans[0]["status"] == {"code": 1}
+    assert spans[1]["status"] == {"code": 2, "message": "TimeoutError"}
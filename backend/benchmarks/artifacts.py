@@ -0,0 +1,146 @@
+"""
+Session state and event state-delta bytes per task: full texts inline in the
+state vs references into the content-addressed artifact store.
+
+Both modes drive the real tool callbacks through the orchestrator's
+``_Session``/``_ToolContext`` with fake tools: a PRD, a project of
+``--files`` files (some boilerplate shared by every task), then one fix
+round per buggy file, each changing a single file. Inline mode swaps the
+artifact helpers for the old behaviour of storing every text in the state.
+The store run also checks that every iteration round-trips through the zip
+stream and that each fix diff names exactly the patched file. Run from the
+``backend`` directory:
+
+    python -m benchmarks.artifacts --tasks 20 --files 12 --bugs 3
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+os.environ["ARTIFACT_DIR"] = os.path.join(tempfile.mkdtemp(prefix="artifacts-bench-"), "store")
+
+from sdlc_cycle import callbacks  # noqa: E402
+from sdlc_cycle.artifacts import artifact_store, diff, iteration_files, iterations, load_text, manifest, zip_stream  # noqa: E402
+from sdlc_cycle.orchestrator import SdlcOrchestrator, _Session  # noqa: E402
+from sdlc_cycle.workspace import FileMap, SUCCESS_SIGNAL  # noqa: E402
+
+BOILERPLATE = {
+    "requirements.txt": "fastapi==0.110.0\nuvicorn==0.29.0\npydantic==2.6.4\n",
+    "README.md": "# Generated service\n\nRun with `uvicorn app:app`.\n" + "See the PRD for details.\n" * 20,
+}
+
+
+def make_project(task: int, n_files: int, bugs: int):
+    files = dict(BOILERPLATE)
+    for i in range(n_files - len(BOILERPLATE)):
+        marker = "    # BUG\n" if i < bugs else ""
+        files[f"mod{i}.py"] = (f"def helper{i}_{task}(items):\n" + marker
+                               + "".join(f"    items = [x + {j} for x in items]\n" for j in range(40))
+                               + "    return items\n")
+    return files
+
+
+class FakeTools:
+    def __init__(self, task: int, n_files: int, bugs: int):
+        self.task = task
+        self.n_files = n_files
+        self.bugs = bugs
+
+    def tools(self):
+        async def generate_plan(input):
+            return f"# PRD for task {self.task}\n\n## Goals\n" + f"- Goal for {input}\n" * 80
+
+        async def generate_code(prd):
+            return json.dumps(make_project(self.task, self.n_files, self.bugs))
+
+        async def test_code(input):
+            files = json.loads(input)
+            findings = [f"### {name}\nhelper() mutates its input on every call" for name, code in files.items()
+                        if "# BUG" in code]
+            return "\n\n".join(findings) if findings else SUCCESS_SIGNAL
+
+        async def fix_code(input):
+            files = json.loads(input.split("\n\nTest Result:\n", 1)[0])
+            name = next(name for name in sorted(files) if "# BUG" in files[name])
+            return json.dumps({name: files[name].replace("    # BUG\n", "    items = list(items)\n")})
+
+        return {"plan": generate_plan, "code": generate_code, "test": test_code, "fix": fix_code}
+
+
+def inline():
+    # The callbacks as they were before the store: every text in the state
+    callbacks.save_text = lambda session, key, text: session.__setitem__(key, text)
+    callbacks.load_text = lambda session, key, default="": session.get(key) or default
+    callbacks.save_code = lambda session, tool, code: session.__setitem__("code", code)
+    callbacks.save_filemap = lambda session, fmap: session.__setitem__("files", fmap.to_dict())
+    callbacks.load_filemap = lambda session: FileMap.from_dict(session["files"]) if session.get("files") else None
+
+
+async def run_task(task: int, n_files: int, bugs: int):
+    tools = FakeTools(task, n_files, bugs).tools()
+    session = _Session(f"task{task}", {})
+    delta_bytes = 0
+    step, request = "plan", f"service number {task}"
+    while step is not None:
+        before = dict(session)
+        result = await SdlcOrchestrator._call(tools[step], SdlcOrchestrator._args(step, request, session), session)
+        delta = {key: value for key, value in session.items() if before.get(key) != value}
+        delta_bytes += len(json.dumps(delta)) + len(json.dumps(result))
+        if step == "plan":
+            step = "code"
+        elif step in ("code", "fix"):
+            step = "test"
+        elif SUCCESS_SIGNAL in callbacks.load_text(session, "test") or (isinstance(result, dict) and "error" in result):
+            step = None
+        else:
+            step = "fix"
+    return session, delta_bytes
+
+
+def check(session, bugs: int):
+    history = iterations(session)
+    assert len(history) == bugs + 1, f"{len(history)} iterations for {bugs} fix rounds"
+    for n in range(len(history)):
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(zip_stream(manifest(session, n)["files"]))))
+        assert {name: archive.read(name).decode() for name in archive.namelist()} == iteration_files(session, n)
+    for n in range(1, len(history)):
+        changed = diff(session, n)["files"]
+        assert len(changed) == 1 and next(iter(changed.values()))["status"] == "modified", changed
+    assert "# BUG" not in load_text(session, "code")
+
+
+async def run(args):
+    for label in ("store", "inline"):
+        if label == "inline":
+            inline()
+        state_bytes = delta_bytes = 0
+        for task in range(args.tasks):
+            session, delta = await run_task(task, args.files, args.bugs)
+            if label == "store":
+                check(session, args.bugs)
+            state_bytes += len(json.dumps(session))
+            delta_bytes += delta
+        print(f"{label:<7} state {state_bytes / args.tasks / 1024:7.1f} KiB/task  "
+              f"event deltas {delta_bytes / args.tasks / 1024:7.1f} KiB/task")
+        if label == "store":
+            stats = artifact_store.stats()
+            print(f"        store {stats['raw_bytes'] / args.tasks / 1024:.1f} KiB/task of unique text, "
+                  f"{stats['stored_bytes'] / args.tasks / 1024:.1f} KiB/task on disk, "
+                  f"{stats['duplicates']}/{stats['puts']} puts deduplicated")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--bugs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
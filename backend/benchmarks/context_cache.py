@@ -0,0 +1,122 @@
+"""
+Input tokens and prefill latency per fix/test iteration with and without
+provider-side context caching.
+
+A fake provider behind ``llm.acompletion`` emulates explicit prefix caching:
+a message marked with ``cache_control`` creates a cache entry, and later
+requests with the same marked prefix report it as cached tokens, which are
+billed at CACHED_PRICE and skip prefill. Iterations either keep failing on
+the same file (the usual case of a fix that needs another attempt) or move
+to another file each time. Run from the ``backend`` directory:
+
+    python -m benchmarks.context_cache --files 12 --iterations 3
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+from sdlc_cycle import context_cache, fixer, llm, tester
+from sdlc_common.cache import bypass_cache
+from sdlc_cycle.workspace import FileMap, SUCCESS_SIGNAL
+
+# Cached input tokens cost a quarter of the normal input price
+CACHED_PRICE = 0.25
+SECONDS_PER_PREFILL_TOKEN = 0.00005
+SECONDS_PER_OUTPUT_TOKEN = 0.002
+
+
+def tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def text(content) -> str:
+    return "".join(part["text"] for part in content) if isinstance(content, list) else content
+
+
+class FakeProvider:
+    def __init__(self):
+        self.caches = set()
+        self.bug = None
+        self.input_tokens = self.cached = 0
+
+    async def acompletion(self, model, messages, **params):
+        prompt = "\n".join(text(message["content"]) for message in messages)
+        first = messages[0]["content"]
+        cached = 0
+        if isinstance(first, list) and first[0].get("cache_control"):
+            key = hashlib.sha256(first[0]["text"].encode("utf-8")).hexdigest()
+            if key in self.caches:
+                cached = tokens(first[0]["text"])
+            self.caches.add(key)
+
+        if "QA engineer" in prompt:
+            reply = f"### {self.bug}\nhelper() returns an undefined name" if self.bug in prompt else SUCCESS_SIGNAL
+        else:
+            reply = json.dumps({self.bug: f"def helper(items):\n    return sorted(items)  # {time.time()}\n"})
+        self.input_tokens += tokens(prompt)
+        self.cached += cached
+        await asyncio.sleep(0.05 + (tokens(prompt) - cached) * SECONDS_PER_PREFILL_TOKEN
+                            + tokens(reply) * SECONDS_PER_OUTPUT_TOKEN)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": reply}}],
+            "usage": {"prompt_tokens": tokens(prompt), "completion_tokens": tokens(reply),
+                      "total_tokens": tokens(prompt) + tokens(reply),
+                      "prompt_tokens_details": {"cached_tokens": cached}}
+        }
+
+
+def make_project(n):
+    files = {"main.py": "\n".join(f"from mod{i} import helper{i}" for i in range(n - 1))}
+    for i in range(n - 1):
+        files[f"mod{i}.py"] = f"def helper{i}(items):\n" + f"    items = sorted(items, key=str)  # step {i}\n" * 60
+    return files
+
+
+async def run(n_files, iterations, caching, moving):
+    context_cache.CONTEXT_CACHE = caching
+    context_cache.cache_session.set(f"bench-{caching}-{moving}")
+    bypass_cache.set(True)
+    provider = FakeProvider()
+    llm.acompletion = provider.acompletion
+
+    fmap = FileMap(make_project(n_files))
+    fmap.record_review(list(fmap.files), SUCCESS_SIGNAL)
+    rows = []
+    for i in range(iterations):
+        provider.bug = f"mod{i % (n_files - 1) if moving else 0}.py"
+        fmap.apply({provider.bug: fmap.files[provider.bug] + "\n# regression"})
+        provider.input_tokens = provider.cached = 0
+        started = time.perf_counter()
+
+        reviewing = fmap.dirty()
+        report = await tester.test_code(fmap.to_json(reviewing))
+        fmap.record_review(reviewing, report)
+        result = await fixer.fix_code(f"{fmap.to_json()}{fixer.TEST_RESULT}{fmap.report()}")
+        fmap.apply(json.loads(result))
+
+        billed = provider.input_tokens - provider.cached * (1 - CACHED_PRICE)
+        rows.append((provider.input_tokens, provider.cached, billed, time.perf_counter() - started))
+    return rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    tester.SANDBOX_ENABLED = False
+    for moving in (False, True):
+        print("failing file moves each iteration" if moving else "same file keeps failing")
+        for label, caching in (("no cache", False), ("context cache", True)):
+            rows = asyncio.run(run(args.files, args.iterations, caching, moving))
+            for i, (tokens_in, cached, billed, seconds) in enumerate(rows, 1):
+                print(f"  {label:<14} iteration {i}: {tokens_in:>6} in  {cached:>6} cached  "
+                      f"{billed:>8.0f} billed  {seconds:.2f}s")
+    print(context_cache.context_cache.stats())
+
+
+if __name__ == "__main__":
+    main_cli()
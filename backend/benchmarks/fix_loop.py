@@ -0,0 +1,91 @@
+"""
+Tokens and latency per fix/test iteration: full-project vs incremental.
+
+Uses a fake model whose latency grows with the number of output tokens.
+Full mode re-sends and re-reviews every file and the fixer returns the whole
+project; incremental mode uses FileMap so only changed files and their
+dependents are reviewed and the fixer returns only the patched file.
+Run from the ``backend`` directory:
+
+    python -m benchmarks.fix_loop --files 8 --iterations 3
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from sdlc_cycle import fixer, llm, tester
+from sdlc_cycle.workspace import FileMap, SUCCESS_SIGNAL
+
+SECONDS_PER_OUTPUT_TOKEN = 0.002
+
+
+def tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeModel:
+    def __init__(self, files, incremental):
+        self.files = files
+        self.incremental = incremental
+        self.bug = None
+        self.input_tokens = self.output_tokens = 0
+
+    async def complete(self, model, prompt, prefix="", **kwargs):
+        prompt = prefix + prompt
+        if "QA engineer" in prompt:
+            reply = f"### {self.bug}\nhelper() returns an undefined name" if self.bug in prompt else SUCCESS_SIGNAL
+        else:
+            fixed = {self.bug: self.files[self.bug] + "\n# fixed"}
+            reply = json.dumps(fixed if self.incremental else {**self.files, **fixed})
+        self.input_tokens += tokens(prompt)
+        self.output_tokens += tokens(reply)
+        await asyncio.sleep(0.05 + tokens(reply) * SECONDS_PER_OUTPUT_TOKEN)
+        return reply
+
+
+def make_project(n):
+    files = {"main.py": "\n".join(f"from mod{i} import helper{i}" for i in range(n - 1))}
+    for i in range(n - 1):
+        files[f"mod{i}.py"] = f"def helper{i}(items):\n" + "    items = sorted(items)\n" * 40 + "    return items\n"
+    return files
+
+
+async def run(n_files, iterations, incremental):
+    files = make_project(n_files)
+    fake = FakeModel(files, incremental)
+    llm.complete = fixer.complete = fake.complete
+    fmap = FileMap(files)
+    fmap.record_review(list(files), SUCCESS_SIGNAL)
+    rows = []
+    for i in range(iterations):
+        fake.bug = f"mod{i % (n_files - 1)}.py"
+        fmap.apply({fake.bug: files[fake.bug] + "\n# regression"})
+        fake.files = dict(fmap.files)
+        fake.input_tokens = fake.output_tokens = 0
+        started = time.perf_counter()
+
+        reviewing = fmap.dirty() if incremental else list(fmap.files)
+        report = await tester.test_code(fmap.to_json(reviewing))
+        fmap.record_review(reviewing, report)
+        result = await fixer.fix_code(f"{fmap.to_json()}\n\nTest Result:\n{fmap.report()}")
+        fmap.apply(json.loads(result))
+
+        rows.append((fake.input_tokens, fake.output_tokens, time.perf_counter() - started))
+    return rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    for label, incremental in (("full", False), ("incremental", True)):
+        rows = asyncio.run(run(args.files, args.iterations, incremental))
+        for i, (tokens_in, tokens_out, seconds) in enumerate(rows, 1):
+            print(f"{label:<12} iteration {i}: {tokens_in:>6} in  {tokens_out:>6} out  {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,50 @@
+"""
+Parse success rate of the structured-output layer on captured model outputs.
+
+Compares a plain json.loads of the reply against the layered parser
+(extraction, repair, schema validation) and counts the re-asks avoided.
+Drop further captured replies into ``json_corpus/`` as .txt files.
+Run from the ``backend`` directory:
+
+    python -m benchmarks.json_parse
+"""
+import glob
+import json
+import os
+import time
+
+from sdlc_common import structured
+
+CORPUS = os.path.join(os.path.dirname(__file__), "json_corpus")
+
+
+def naive(text):
+    try:
+        return not structured.validate_code_map(json.loads(text))
+    except ValueError:
+        return False
+
+
+def main_cli():
+    paths = sorted(glob.glob(os.path.join(CORPUS, "*.txt")))
+    naive_ok = layered_ok = 0
+    started = time.perf_counter()
+    for path in paths:
+        with open(path) as f:
+            text = f.read()
+        plain = naive(text)
+        layered = structured.parse_code_map(text) is not None
+        naive_ok += plain
+        layered_ok += layered
+        print(f"{os.path.basename(path):<24} naive={'ok' if plain else 'FAIL':<5} layered={'ok' if layered else 'FAIL'}")
+    elapsed = time.perf_counter() - started
+
+    total = len(paths)
+    print(f"\nnaive json.loads: {naive_ok}/{total} parsed")
+    print(f"layered parser:   {layered_ok}/{total} parsed in {elapsed * 1000:.1f}ms total")
+    print(f"re-asks avoided:  {layered_ok - naive_ok}")
+    print(f"resolved by stage: {structured.stats}")
+
+
+if __name__ == "__main__":
+    main_cli()
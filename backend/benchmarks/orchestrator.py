@@ -0,0 +1,178 @@
+"""
+LLM calls and wall time per completed task: LLM-routed root agent vs the
+deterministic state-machine orchestrator.
+
+Both modes run through an ADK Runner with the same fake tool model behind
+``llm.acompletion``: the first ``--failing`` reviews report a bug, later ones
+pass. In LLM mode every hop is decided by a scripted stand-in for the
+router model (one round trip of ``--router-latency`` each): the root agent
+transfers to a sub-agent, the sub-agent calls its tool and transfers back.
+Run from the ``backend`` directory:
+
+    python -m benchmarks.orchestrator --tasks 3 --failing 2
+"""
+import argparse
+import logging
+import asyncio
+import json
+import os
+import time
+from typing import AsyncGenerator
+
+os.environ.setdefault("SANDBOX_ENABLED", "0")
+
+from google.adk.agents import Agent  # noqa: E402
+from google.adk.models.base_llm import BaseLlm  # noqa: E402
+from google.adk.models.llm_response import LlmResponse  # noqa: E402
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from sdlc_cycle import llm  # noqa: E402
+from sdlc_common.cache import bypass_cache  # noqa: E402
+from sdlc_cycle.callbacks import adk_before_tool_callback, adk_after_tool_callback  # noqa: E402
+from sdlc_cycle.coder import generate_code  # noqa: E402
+from sdlc_cycle.fixer import fix_code  # noqa: E402
+from sdlc_cycle.orchestrator import SdlcOrchestrator  # noqa: E402
+from sdlc_cycle.planner import generate_plan  # noqa: E402
+from sdlc_cycle.tester import test_code  # noqa: E402
+from sdlc_cycle.workspace import SUCCESS_SIGNAL  # noqa: E402
+
+APP = "sdlc_cycle"
+TOOLS = {"planner_agent": generate_plan, "coder_agent": generate_code,
+         "tester_agent": test_code, "fixer_agent": fix_code}
+
+
+class Progress:
+    """What has happened in the current task; the fake router reads it."""
+
+    def __init__(self, failing: int):
+        self.failing = failing
+        self.reset()
+
+    def reset(self):
+        self.planned = self.coded = self.tested = False
+        self.passed = False
+        self.reviews = self.fixes = 0
+        self.tool_calls = self.router_calls = 0
+
+
+class FakeToolModel:
+    def __init__(self, progress: Progress, latency: float):
+        self.progress = progress
+        self.latency = latency
+
+    async def acompletion(self, model, messages, **params):
+        prompt = "\n".join(m["content"] if isinstance(m["content"], str)
+                           else "".join(p["text"] for p in m["content"]) for m in messages)
+        p = self.progress
+        p.tool_calls += 1
+        if "product manager" in prompt:
+            reply, p.planned = ("# PRD\n## Goals\nAdd two numbers.\n## Key Features\nadd(a, b)\n"
+                                "## Technical Requirements\nPython 3"), True
+        elif "QA engineer" in prompt:
+            p.reviews += 1
+            p.passed = p.reviews > p.failing
+            reply = SUCCESS_SIGNAL if p.passed else "### main.py\nadd() subtracts instead of adding"
+            p.tested = True
+        elif "code fixer" in prompt:
+            reply = json.dumps({"main.py": f"def add(a, b):\n    return a + b  # fix {p.fixes}\n"})
+            p.fixes += 1
+            p.tested = False
+        else:
+            reply, p.coded = json.dumps({"main.py": "def add(a, b):\n    return a - b\n"}), True
+        await asyncio.sleep(self.latency)
+        return {"choices": [{"message": {"role": "assistant", "content": reply}}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4,
+                          "total_tokens": (len(prompt) + len(reply)) // 4}}
+
+
+class FakeRouter(BaseLlm):
+    """Scripted stand-in for the router model of the LLM-routed agents."""
+    progress: Progress
+    latency: float
+    max_fixes: int = 3
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        p = self.progress
+        p.router_calls += 1
+        await asyncio.sleep(self.latency)
+        tools = set(llm_request.tools_dict)
+        last = llm_request.contents[-1].parts[-1] if llm_request.contents else None
+        agent_tool = next((name for name in tools if name != "transfer_to_agent"), None)
+        if agent_tool is not None:
+            if last is not None and last.function_response and last.function_response.name == agent_tool:
+                call = types.FunctionCall(name="transfer_to_agent", args={"agent_name": "root_agent"})
+            else:
+                call = types.FunctionCall(name=agent_tool, args={"input": ""} if agent_tool != "generate_code" else {"prd": ""})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+            return
+
+        if not p.planned:
+            target = "planner_agent"
+        elif not p.coded:
+            target = "coder_agent"
+        elif not p.tested:
+            target = "tester_agent"
+        elif not p.passed and p.fixes < self.max_fixes:
+            target = "fixer_agent"
+        else:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="Done.")]))
+            return
+        call = types.FunctionCall(name="transfer_to_agent", args={"agent_name": target})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+
+
+def llm_root(router: FakeRouter) -> Agent:
+    sub_agents = [
+        Agent(name=name, model=router, instruction=f"Use the `{tool.__name__}` tool.", tools=[tool],
+              before_tool_callback=adk_before_tool_callback, after_tool_callback=adk_after_tool_callback)
+        for name, tool in TOOLS.items()
+    ]
+    return Agent(name="root_agent", model=router, instruction="Orchestrate the SDLC process.",
+                 sub_agents=sub_agents)
+
+
+async def run(mode: str, tasks: int, progress: Progress, router: FakeRouter):
+    agent = llm_root(router)
+    if mode == "state_machine":
+        agent = SdlcOrchestrator(name="sdlc_orchestrator", router=agent, sub_agents=[agent])
+    service = InMemorySessionService()
+    runner = Runner(app_name=APP, agent=agent, session_service=service)
+    bypass_cache.set(True)
+    rows = []
+    for i in range(tasks):
+        progress.reset()
+        session = await service.create_session(app_name=APP, user_id="bench", session_id=f"{mode}-{i}")
+        message = types.Content(role="user", parts=[types.Part(text=f"Write an add function, variant {i}")])
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+            pass
+        rows.append((progress.router_calls, progress.tool_calls, time.perf_counter() - started, progress.passed))
+    return rows
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--failing", type=int, default=2, help="reviews that report a bug before one passes")
+    parser.add_argument("--tool-latency", type=float, default=0.3)
+    parser.add_argument("--router-latency", type=float, default=0.4)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # ADK warns about the fake router's missing usage data
+    progress = Progress(args.failing)
+    llm.acompletion = FakeToolModel(progress, args.tool_latency).acompletion
+    router = FakeRouter(model="fake-router", progress=progress, latency=args.router_latency)
+    for mode in ("llm", "state_machine"):
+        rows = asyncio.run(run(mode, args.tasks, progress, router))
+        router_calls = sum(r[0] for r in rows) / len(rows)
+        tool_calls = sum(r[1] for r in rows) / len(rows)
+        seconds = sum(r[2] for r in rows) / len(rows)
+        passed = sum(1 for r in rows if r[3])
+        print(f"{mode:<14} per task: {router_calls:>5.1f} router calls  {tool_calls:>4.1f} tool LLM calls  "
+              f"{router_calls + tool_calls:>5.1f} total  {seconds:.2f}s  ({passed}/{len(rows)} passed)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,105 @@
+"""
+Concurrency check for SqliteSessionService across worker processes.
+
+Every worker process appends events to one shared session and to a session
+of its own user, each event carrying a state delta with a key unique to
+that worker. At the end every key and every event must be present: no
+worker may overwrite another's state. Run from the ``backend`` directory:
+
+    python -m benchmarks.sessions --workers 4 --events 200
+"""
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import tempfile
+import time
+
+from google.adk.events import Event, EventActions
+
+from sdlc_cycle.sessions import SqliteSessionService
+
+APP = "sdlc_cycle"
+
+
+async def work(db_path: str, worker: int, events: int, batch_size: int, start, times):
+    service = SqliteSessionService(db_path, batch_size=batch_size)
+    shared = await service.get_session(app_name=APP, user_id="shared", session_id="shared")
+    own = await service.create_session(app_name=APP, user_id=f"user{worker}", session_id="s")
+    # Workers import at different speeds; all start appending together
+    start.wait()
+    started = time.time()
+    for i in range(events):
+        for session in (shared, own):
+            await service.append_event(session, Event(
+                author="worker", invocation_id=f"{worker}-{i}",
+                actions=EventActions(state_delta={f"w{worker}_{i}": i, f"user:last{worker}": i})
+            ))
+    await service.flush()
+    times.put((started, time.time()))
+
+
+def worker_main(db_path: str, worker: int, events: int, batch_size: int, start, times):
+    # Leave the heap inherited from the parent out of garbage collection, as
+    # forking servers do; a full collection of it takes over a second
+    gc.freeze()
+    asyncio.run(work(db_path, worker, events, batch_size, start, times))
+
+
+async def verify(db_path: str, workers: int, events: int):
+    service = SqliteSessionService(db_path)
+    shared = await service.get_session(app_name=APP, user_id="shared", session_id="shared")
+    missing = [
+        f"w{w}_{i}" for w in range(workers) for i in range(events) if f"w{w}_{i}" not in shared.state
+    ]
+    problems = [f"shared session misses {len(missing)} state keys"] if missing else []
+    if len(shared.events) != workers * events:
+        problems.append(f"shared session has {len(shared.events)} of {workers * events} events")
+    for w in range(workers):
+        own = await service.get_session(app_name=APP, user_id=f"user{w}", session_id="s")
+        if len(own.events) != events or own.state.get(f"user:last{w}") != events - 1:
+            problems.append(f"session of user{w} is incomplete")
+    return problems
+
+
+def run(workers: int, events: int, batch_size: int):
+    with tempfile.TemporaryDirectory() as root:
+        db_path = os.path.join(root, "sessions.db")
+        asyncio.run(SqliteSessionService(db_path).create_session(
+            app_name=APP, user_id="shared", session_id="shared"
+        ))
+        start, times = multiprocessing.Barrier(workers), multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker_main, args=(db_path, w, events, batch_size, start, times))
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode for process in processes):
+            return 0.0, ["a worker process failed"]
+        # From the first event to the last worker's final flush, leaving out
+        # process start-up and imports
+        spans = [times.get() for _ in processes]
+        elapsed = max(end for _, end in spans) - min(start for start, _ in spans)
+        return elapsed, asyncio.run(verify(db_path, workers, events))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    total = args.workers * args.events * 2
+    for batch_size in (1, 16):
+        elapsed, problems = run(args.workers, args.events, batch_size)
+        status = "consistent" if not problems else "; ".join(problems)
+        print(f"batch size {batch_size:>2}: {total} events in {elapsed:.2f}s "
+              f"({total / elapsed:.0f} events/s), {status}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,70 +1,69 @@
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from agents.root import root_agent
+from typing import Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sdlc_cycle.sessions import create_session_service
+from sdlc_cycle.artifacts import artifact_store, diff, iterations, manifest, zip_stream
 
-# Initialize session service
-session_service = InMemorySessionService()
+# The agents run under ``adk web`` / ``adk api_server``, which load
+# sdlc_cycle.root_agent; this app serves the artifacts their sessions record.
+# Session service shared with them (SQLite by default, across worker processes)
+session_service = create_session_service()
 
-# Create session synchronously
-session_service.create_session_blocking(
-    app_name="sdlc_cycle",
-    user_id="user1",
-    session_id="session1"
-)
-MAX_ARG_LENGTH = 10000  # Gemini's function call argument limit
+# Generated code by iteration, for downloads and the code editor
+app = FastAPI(title="SDLC artifacts")
+SESSION_PATH = "/apps/sdlc_cycle/users/{user_id}/sessions/{session_id}"
 
-def before_tool_callback(tool, args, context):
-    # Validate and sanitize all inputs to prevent malformed calls
-    if tool.__name__ == "generate_code":
-        prd = context.session.get("prd")
-        if prd:
-            # Truncate long inputs to prevent overflow
-            args["input"] = prd[-MAX_ARG_LENGTH:]  
-            
-    if tool.__name__ == "test_code":
-        code = context.session.get("code", "")
-        # Always set input but sanitize first
-        args["input"] = code[-MAX_ARG_LENGTH:]  
-        if context.session.get("trigger_test_after_fix"):
-            context.session["trigger_test_after_fix"] = False 
-            
-    if tool.__name__ == "fix_code":
-        fix_count = context.session.get("fix_count", 0)
-        
-        # Error handling improvements
-        if context.session.get("panic"):
-            return {"error": "Panic mode activated. Fixer aborted."}
-    
-        if fix_count >= 3:
-            return {"error": "Fixer exceeded safe retry limit."}
-        
-        test_result = context.session.get("test", "")
-        if "U EE A E A U EE EE A E" in test_result:
-            return {"result": "No fixing needed. All tests passed."}
-    
-        code = context.session.get("code", "")
-        # Combine inputs safely
-        args["input"] = f"{code[:5000]}\n\nTest Result:\n{test_result[:5000]}"  
-        context.session["fix_count"] = fix_count + 1
+async def session_state(user_id, session_id):
+    session = await session_service.get_session(
+        app_name="sdlc_cycle", user_id=user_id, session_id=session_id
+    )
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session.state
 
-def after_tool_callback(context, tool, args, result):
-    # Validate results before storing
-    if not isinstance(result, str):
-        result = str(result)
-    
-    if tool.__name__ == "generate_plan":
-        context.session["prd"] = result[-MAX_ARG_LENGTH:]
-    elif tool.__name__ == "generate_code":
-        context.session["code"] = result[-MAX_ARG_LENGTH:]
-    elif tool.__name__ == "test_code":
-        context.session["test"] = result[-MAX_ARG_LENGTH:]
-    elif tool.__name__ == "fix_code":
-        context.session["code"] = result[-MAX_ARG_LENGTH:]
-        context.session["trigger_test_after_fix"] = True
-runner = Runner(
-    app_name="sdlc_cycle",
-    agent=root_agent,
-    session_service=session_service,
-    before_tool_callback=before_tool_callback,
-    after_tool_callback=after_tool_callback
-)
\ No newline at end of file
+@app.get(SESSION_PATH + "/iterations")
+async def list_iterations(user_id: str, session_id: str):
+    """Manifest of every code iteration: tool, time and per-file content hashes."""
+    state = await session_state(user_id, session_id)
+    try:
+        return iterations(state)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get(SESSION_PATH + "/iterations/{n}/diff")
+async def iteration_diff(user_id: str, session_id: str, n: int, base: Optional[int] = None):
+    """Files changed from iteration ``base`` (default: the previous one) to ``n``."""
+    state = await session_state(user_id, session_id)
+    try:
+        return diff(state, n, base)
+    except IndexError:
+        raise HTTPException(status_code=404, detail="Iteration not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get(SESSION_PATH + "/iterations/{n}/zip")
+async def download_iteration(user_id: str, session_id: str, n: int):
+    """Stream the files of iteration ``n`` (-1 for the latest) as a zip archive."""
+    state = await session_state(user_id, session_id)
+    try:
+        hashes = manifest(state, n)["files"]
+    except IndexError:
+        raise HTTPException(status_code=404, detail="Iteration not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        zip_stream(hashes),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{session_id}-{n}.zip"'}
+    )
+
+@app.get("/artifacts/{digest}", response_class=PlainTextResponse)
+async def get_artifact(digest: str):
+    """Content of one stored file or report; it never changes, so it is cacheable forever."""
+    try:
+        text = artifact_store.get(digest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return PlainTextResponse(text, headers={"Cache-Control": "public, max-age=31536000, immutable"})
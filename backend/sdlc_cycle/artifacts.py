@@ -0,0 +1,282 @@
+"""Content-addressed store for the PRD, code and test reports of a session.
+
+Every generated file, PRD and test report is stored once, keyed by the
+SHA-256 of its content, so a fix round that changes one file adds one blob.
+The session state only holds references: "sha256:<hex>" for a text, and
+"manifest:<n>" for the code of iteration n. ``session["manifests"]`` lists
+the hash of each iteration's manifest, which maps every filename to the
+hash of its content.
+Blobs are optionally zlib-compressed and live in a memory tier backed by
+files under ARTIFACT_DIR, which worker processes share; with a disk tier
+the memory tier is a size-bounded LRU cache.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+from collections import OrderedDict
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+import zlib
+
+from sdlc_common.structured import parse_code_map
+from .workspace import FileMap
+from .paths import data_path
+
+# On-disk tier shared by worker processes; empty keeps blobs in memory only
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", data_path("artifacts"))
+ARTIFACT_COMPRESS = os.getenv("ARTIFACT_COMPRESS", "1") == "1"
+# Bytes of blobs kept in memory when they are also on disk
+ARTIFACT_MEMORY_BYTES = int(os.getenv("ARTIFACT_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+BLOB_PREFIX = "sha256:"
+MANIFEST_PREFIX = "manifest:"
+# First byte of a stored blob: how the rest is encoded
+_RAW, _ZLIB = b"r", b"z"
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def check_digest(digest: str) -> str:
+    """``digest`` if it is a SHA-256 hex digest; ValueError otherwise.
+
+    Digests come from URLs and session state and become file paths, so
+    anything else (``..``, slashes, dots) is rejected before touching disk.
+    """
+    if not isinstance(digest, str) or _DIGEST.fullmatch(digest) is None:
+        raise ValueError(f"Invalid artifact digest: {digest!r}")
+    return digest
+
+
+class ArtifactStore:
+    def __init__(self, directory: str = "", compress: bool = True, memory_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.compress = compress
+        self.memory_bytes = memory_bytes
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.puts = 0
+        self.duplicates = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.disk_reads = 0
+
+    def _path(self, digest: str) -> str:
+        check_digest(digest)
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def _remember(self, digest: str, blob: bytes) -> None:
+        with self._lock:
+            if digest in self._blobs:
+                self._blobs.move_to_end(digest)
+                return
+            self._blobs[digest] = blob
+            self._size += len(blob)
+            # Only blobs that are also on disk may leave memory
+            while self.directory and self._size > self.memory_bytes and len(self._blobs) > 1:
+                _, evicted = self._blobs.popitem(last=False)
+                self._size -= len(evicted)
+
+    def put(self, text: str) -> str:
+        """Store ``text`` once and return its content hash."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        self.puts += 1
+        if digest in self._blobs or (self.directory and os.path.exists(self._path(digest))):
+            self.duplicates += 1
+            return digest
+        blob = _RAW + data
+        if self.compress:
+            packed = _ZLIB + zlib.compress(data)
+            if len(packed) < len(blob):
+                blob = packed
+        if self.directory:
+            path = self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so readers in other workers never see half a blob
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        self.raw_bytes += len(data)
+        self.stored_bytes += len(blob)
+        self._remember(digest, blob)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """The text stored under ``digest``; KeyError if there is none."""
+        check_digest(digest)
+        blob = self._blobs.get(digest)
+        if blob is None:
+            if not self.directory or not os.path.exists(self._path(digest)):
+                raise KeyError(digest)
+            with open(self._path(digest), "rb") as f:
+                blob = f.read()
+            self.disk_reads += 1
+            self._remember(digest, blob)
+        data = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+        return data.decode("utf-8")
+
+    def put_files(self, files: Dict[str, str]) -> Dict[str, str]:
+        return {name: self.put(code) for name, code in files.items()}
+
+    def get_files(self, hashes: Dict[str, str]) -> Dict[str, str]:
+        return {name: self.get(digest) for name, digest in hashes.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blobs_in_memory": len(self._blobs),
+            "memory_bytes": self._size,
+            "puts": self.puts,
+            "duplicates": self.duplicates,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "disk_reads": self.disk_reads
+        }
+
+
+artifact_store = ArtifactStore(ARTIFACT_DIR, ARTIFACT_COMPRESS, ARTIFACT_MEMORY_BYTES)
+
+
+def save_text(session, key: str, text: str) -> None:
+    session[key] = BLOB_PREFIX + artifact_store.put(text)
+
+
+def load_text(session, key: str, default: str = "") -> str:
+    '''
+    The text behind ``session[key]``: a blob, the code of an iteration, or a
+    plain string left by sessions from before the store.
+    '''
+    value = session.get(key)
+    if not value:
+        return default
+    if not isinstance(value, str):
+        return str(value)
+    if value.startswith(BLOB_PREFIX):
+        return artifact_store.get(value[len(BLOB_PREFIX):])
+    if value.startswith(MANIFEST_PREFIX):
+        return json.dumps(iteration_files(session, int(value[len(MANIFEST_PREFIX):])))
+    return value
+
+
+def save_code(session, tool: str, code: str) -> None:
+    '''
+    Records ``code`` as the session's next iteration. A filename -> code JSON
+    gets a manifest of per-file hashes; any other reply is stored as one blob.
+    '''
+    files = parse_code_map(code)
+    if files is None:
+        save_text(session, "code", code)
+        return
+    manifest = {"tool": tool, "created": time.time(), "files": artifact_store.put_files(files)}
+    manifests = list(session.get("manifests") or [])
+    manifests.append(artifact_store.put(json.dumps(manifest, sort_keys=True)))
+    session["manifests"] = manifests
+    session["code"] = f"{MANIFEST_PREFIX}{len(manifests) - 1}"
+
+
+def manifest(session, n: int) -> Dict[str, Any]:
+    '''
+    Manifest of iteration ``n`` (negative counts from the latest); IndexError
+    if the session has no such iteration, ValueError if it names a file by
+    anything but a valid hash.
+    '''
+    data = json.loads(artifact_store.get((session.get("manifests") or [])[n]))
+    # Checked up front, so a bad hash fails the request before a zip starts streaming
+    for digest in data["files"].values():
+        check_digest(digest)
+    return data
+
+
+def iterations(session) -> List[Dict[str, Any]]:
+    return [{"iteration": n, **manifest(session, n)} for n in range(len(session.get("manifests") or []))]
+
+
+def iteration_files(session, n: int) -> Dict[str, str]:
+    return artifact_store.get_files(manifest(session, n)["files"])
+
+
+def save_filemap(session, fmap: FileMap) -> None:
+    # The review state keeps hashes of the files and findings, not their text
+    data = fmap.to_dict()
+    data["files"] = artifact_store.put_files(data["files"])
+    data["findings"] = {name: [fingerprint, artifact_store.put(findings)]
+                        for name, (fingerprint, findings) in data["findings"].items()}
+    session["files"] = data
+
+
+def load_filemap(session) -> Optional[FileMap]:
+    data = session.get("files")
+    if not data:
+        return None
+    return FileMap.from_dict({
+        **data,
+        "files": artifact_store.get_files(data["files"]),
+        "findings": {name: [fingerprint, artifact_store.get(findings)]
+                     for name, (fingerprint, findings) in data["findings"].items()}
+    })
+
+
+def diff(session, n: int, base: Optional[int] = None) -> Dict[str, Any]:
+    '''
+    File-level changes from iteration ``base`` (default: the one before) to
+    iteration ``n``: the hash of each added or modified file, a unified diff
+    for modified files and the names of deleted ones. Unchanged files are
+    left out, so an editor only refetches what changed.
+    '''
+    n = n if n >= 0 else len(session.get("manifests") or []) + n
+    new = manifest(session, n)["files"]
+    old = manifest(session, base)["files"] if base is not None else (manifest(session, n - 1)["files"] if n > 0 else {})
+    changes = {}
+    for name in sorted(set(old) | set(new)):
+        if old.get(name) == new.get(name):
+            continue
+        if name not in new:
+            changes[name] = {"status": "deleted"}
+        elif name not in old:
+            changes[name] = {"status": "added", "sha256": new[name]}
+        else:
+            changes[name] = {
+                "status": "modified",
+                "sha256": new[name],
+                "diff": "".join(difflib.unified_diff(
+                    artifact_store.get(old[name]).splitlines(keepends=True),
+                    artifact_store.get(new[name]).splitlines(keepends=True),
+                    fromfile=f"a/{name}", tofile=f"b/{name}"
+                ))
+            }
+    return {"iteration": n, "base": base if base is not None else n - 1, "files": changes}
+
+
+class _Chunks:
+    """Write-only file object whose output is drained piece by piece."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def zip_stream(hashes: Dict[str, str]) -> Iterator[bytes]:
+    '''
+    Yields a zip archive of the files in a manifest, loading and compressing
+    one file at a time, so the whole archive is never held in memory.
+    '''
+    out = _Chunks()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(hashes):
+            archive.writestr(name, artifact_store.get(hashes[name]))
+            yield out.drain()
+    yield out.drain()
@@ -0,0 +1,205 @@
+"""Token-aware context budgeting for the SDLC tool inputs.
+
+Instead of cutting PRD, code and test output at a fixed character offset,
+the budget engine counts tokens and decides which files and which test
+findings are worth sending, ranked by relevance to the failing findings.
+A file too large for the budget on its own is sent as line-range excerpts
+keyed ``"<filename>:<start>-<end>"``; ``merge_pieces`` splices edited
+excerpts back into their files.
+"""
+from typing import Dict, List, Optional
+import json
+import os
+import re
+
+from litellm import token_counter
+
+# Context window (tokens) per model; unknown models fall back to the default
+MODEL_WINDOWS = {
+    "gemini/gemini-2.0-flash": 1048576,
+    "gemini/gemini-2.0-flash-lite": 1048576,
+    "groq/llama3-70b-8192": 8192,
+    "groq/llama-3.1-8b-instant": 131072,
+}
+DEFAULT_WINDOW = 8192
+# Hard cap on the tokens spent on one tool input, whatever the window
+INPUT_BUDGET = int(os.getenv("INPUT_TOKEN_BUDGET", "8000"))
+# Tokens reserved for the tool's own instructions and the model's answer
+RESERVED_TOKENS = 2048
+
+_PIECE = re.compile(r"^(.+):(\d+)-(\d+)$")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_SEVERE = re.compile(r"\b(error|bug|crash|exception|fail\w*|missing|undefined|syntax|critical)\b", re.I)
+
+
+def count_tokens(text: str, model: str = "gemini/gemini-2.0-flash") -> int:
+    '''
+    Counts tokens with the model's tokenizer, or approximates 4 chars/token.
+    '''
+    if not text:
+        return 0
+    try:
+        return token_counter(model=model, text=text)
+    except Exception:
+        return len(text) // 4 + 1
+
+
+def budget_for(model: str, share: float = 1.0) -> int:
+    '''
+    Tokens available for a tool input to ``model``, optionally a share of it.
+    '''
+    window = MODEL_WINDOWS.get(model, DEFAULT_WINDOW) - RESERVED_TOKENS
+    return int(min(window, INPUT_BUDGET) * share)
+
+
+def fit_text(text: str, budget: int, model: str = "gemini/gemini-2.0-flash") -> str:
+    '''
+    Keeps the head of ``text`` up to ``budget`` tokens, cutting at a line break.
+    '''
+    if count_tokens(text, model) <= budget:
+        return text
+    lines, kept, used = text.splitlines(keepends=True), [], 0
+    for line in lines:
+        cost = count_tokens(line, model)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "".join(kept)
+
+
+def piece_name(name: str, start: int, end: int) -> str:
+    return f"{name}:{start}-{end}"
+
+
+def file_of(key: str) -> str:
+    '''
+    Filename of an excerpt key; whole filenames are returned unchanged.
+    '''
+    match = _PIECE.match(key)
+    return match.group(1) if match else key
+
+
+def split_file(name: str, code: str, budget: int, model: str = "gemini/gemini-2.0-flash") -> Dict[str, str]:
+    '''
+    Splits ``code`` at line breaks into excerpts of at most ``budget`` tokens
+    (a single longer line is an excerpt of its own), keyed by 1-based
+    inclusive line ranges.
+    '''
+    pieces, lines, start, used = {}, [], 1, 0
+    for number, line in enumerate(code.splitlines(keepends=True), 1):
+        cost = count_tokens(line, model)
+        if lines and used + cost > budget:
+            pieces[piece_name(name, start, number - 1)] = "".join(lines)
+            lines, start, used = [], number, 0
+        lines.append(line)
+        used += cost
+    if lines:
+        pieces[piece_name(name, start, start + len(lines) - 1)] = "".join(lines)
+    return pieces
+
+
+def merge_pieces(patch: Dict[str, Optional[str]], files: Dict[str, str]) -> Dict[str, Optional[str]]:
+    '''
+    Replaces excerpt keys of ``patch`` by the whole files they belong to,
+    with the excerpt's lines swapped in. A whole file in the patch wins over
+    excerpts of it.
+    '''
+    merged, edits = {}, {}
+    for key, code in patch.items():
+        match = _PIECE.match(key)
+        if match and key not in files and match.group(1) in files:
+            edits.setdefault(match.group(1), []).append((int(match.group(2)), int(match.group(3)), code or ""))
+        else:
+            merged[key] = code
+    for name, pieces in edits.items():
+        if name in merged:
+            continue
+        lines = files[name].splitlines(keepends=True)
+        # Bottom-up, so the line numbers of the remaining excerpts stay valid
+        for start, end, code in sorted(pieces, reverse=True):
+            if code and not code.endswith("\n") and end < len(lines):
+                code += "\n"
+            lines[start - 1:end] = code.splitlines(keepends=True)
+        merged[name] = "".join(lines)
+    return merged
+
+
+def split_findings(test_result: str) -> List[str]:
+    '''
+    Splits a test report into individual findings (paragraphs or list items).
+    '''
+    findings, current = [], []
+    for line in test_result.splitlines():
+        starts_item = re.match(r"\s*([-*•]|\d+[.)])\s+", line)
+        if (not line.strip() or starts_item) and current:
+            findings.append("\n".join(current).strip())
+            current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        findings.append("\n".join(current).strip())
+    return [f for f in findings if f]
+
+
+def select_findings(test_result: str, budget: int, model: str = "gemini/gemini-2.0-flash") -> str:
+    '''
+    Keeps the most severe findings that fit in ``budget``, in report order.
+    '''
+    findings = split_findings(test_result)
+    ranked = sorted(range(len(findings)), key=lambda i: (-len(_SEVERE.findall(findings[i])), i))
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(findings[i], model)
+        if used + cost <= budget:
+            chosen.add(i)
+            used += cost
+    return "\n\n".join(findings[i] for i in sorted(chosen))
+
+
+def mentions(name: str, findings: str) -> bool:
+    '''
+    True when the report names the file by path or by basename.
+    '''
+    report = findings.lower()
+    name = file_of(name)
+    return name.lower() in report or os.path.basename(name).lower() in report
+
+
+def rank_files(files: Dict[str, str], findings: str) -> List[str]:
+    '''
+    Orders filenames by relevance to ``findings``: files named in the report
+    first, then by identifier overlap with it.
+    '''
+    words = set(w.lower() for w in _IDENTIFIER.findall(findings))
+
+    def score(name: str):
+        mentioned = mentions(name, findings)
+        overlap = len(words & set(w.lower() for w in _IDENTIFIER.findall(files[name])))
+        return (not mentioned, -overlap)
+
+    return sorted(files, key=score)
+
+
+def select_files(files: Dict[str, str], findings: str, budget: int,
+                 model: str = "gemini/gemini-2.0-flash") -> Dict[str, str]:
+    '''
+    Picks whole files, most relevant first, until ``budget`` tokens are used.
+    A file larger than the whole budget contributes its most relevant
+    excerpts instead of being left out.
+    '''
+    chosen, used = {}, 0
+    for name in rank_files(files, findings):
+        cost = count_tokens(json.dumps({name: files[name]}), model)
+        if used + cost <= budget:
+            chosen[name] = files[name]
+            used += cost
+        elif cost > budget:
+            # Quarter-budget excerpts, so the relevant parts of several large files fit
+            pieces = split_file(name, files[name], max(budget // 4, 1), model)
+            for piece in rank_files(pieces, findings):
+                cost = count_tokens(json.dumps({piece: pieces[piece]}), model)
+                if used + cost <= budget:
+                    chosen[piece] = pieces[piece]
+                    used += cost
+    return chosen
@@ -0,0 +1,160 @@
+"""Tool callbacks shared by the LLM-routed root agent and the orchestrator.
+
+``before_tool_callback`` fits each tool input into the model's token budget
+and enforces the fix-loop limits; ``after_tool_callback`` stores the tool
+results in the artifact store and references to them in the session state.
+Both work on a plain dict view of the state; ``adk_before_tool_callback`` and
+``adk_after_tool_callback`` adapt them to the ADK ``Agent`` callback
+signature.
+"""
+from .budget import budget_for, count_tokens, fit_text, merge_pieces, select_files, select_findings
+from sdlc_common.structured import parse_code_map
+from .workspace import FileMap, SUCCESS_SIGNAL
+from .artifacts import load_filemap, load_text, save_code, save_filemap, save_text
+from .context_cache import cache_session
+from sdlc_common.routing import start_tier
+from sdlc_common.fairshare import tenant, DEFAULT_TENANT
+from typing import Any, Dict
+import json
+
+TOOL_MODEL = "gemini/gemini-2.0-flash"
+# Fix rounds allowed per task before the fixer refuses
+MAX_FIXES = 3
+
+class _Session(dict):
+    """Working copy of the session state, in the shape the tool callbacks expect."""
+
+    def __init__(self, session_id: str, state: Dict[str, Any], user_id: str = ""):
+        super().__init__(state)
+        self.id = session_id
+        self.user_id = user_id
+
+
+class _ToolContext:
+    def __init__(self, session: _Session):
+        self.session = session
+
+def budget_code(code, findings, budget):
+    # Send whole files ranked by relevance instead of a character slice
+    files = parse_code_map(code)
+    if files is None:
+        return fit_text(code, budget, TOOL_MODEL)
+    return json.dumps(select_files(files, findings, budget, TOOL_MODEL))
+
+def before_tool_callback(tool, args, context):
+    # Provider-side prompt caches are tracked per session
+    cache_session.set(context.session.id)
+    # Model calls count against the fair share of the session's user
+    tenant.set(context.session.user_id or DEFAULT_TENANT)
+    # Each fix round whose code still failed the tests starts a model tier higher
+    start_tier.set(context.session.get("fix_count", 0) if tool.__name__ == "fix_code" else 0)
+
+    # Validate and sanitize all inputs to prevent malformed calls
+    if tool.__name__ == "generate_code":
+        prd = load_text(context.session, "prd")
+        if prd:
+            # Keep inputs within the model's token budget
+            args["prd"] = fit_text(prd, budget_for(TOOL_MODEL), TOOL_MODEL)
+            
+    if tool.__name__ == "test_code":
+        if context.session.get("trigger_test_after_fix"):
+            context.session["trigger_test_after_fix"] = False 
+        fmap = load_filemap(context.session)
+        if fmap is not None:
+            # Only re-review files that changed (or whose imports changed)
+            dirty = fmap.dirty()
+            if not dirty:
+                return {"result": fmap.report()}
+            # Every dirty file is sent; the tester reviews large inputs in
+            # chunks, so none is skipped and reported as passing
+            context.session["reviewing"] = dirty
+            args["input"] = fmap.to_json(dirty)
+        else:
+            code = load_text(context.session, "code")
+            # Always set input but sanitize first
+            args["input"] = budget_code(code, "", budget_for(TOOL_MODEL))
+            
+    if tool.__name__ == "fix_code":
+        fix_count = context.session.get("fix_count", 0)
+        
+        # Error handling improvements
+        if context.session.get("panic"):
+            return {"error": "Panic mode activated. Fixer aborted."}
+    
+        if fix_count >= MAX_FIXES:
+            return {"error": "Fixer exceeded safe retry limit."}
+        
+        test_result = load_text(context.session, "test")
+        if SUCCESS_SIGNAL in test_result:
+            return {"result": "No fixing needed. All tests passed."}
+    
+        code = load_text(context.session, "code")
+        # Findings get up to a quarter of the budget, relevant files the rest
+        findings = select_findings(test_result, budget_for(TOOL_MODEL, 0.25), TOOL_MODEL)
+        code_budget = budget_for(TOOL_MODEL) - count_tokens(findings, TOOL_MODEL)
+        args["input"] = f"{budget_code(code, findings, code_budget)}\n\nTest Result:\n{findings}"
+        context.session["fix_count"] = fix_count + 1
+
+def after_tool_callback(context, tool, args, result):
+    # Validate results before storing
+    if not isinstance(result, str):
+        result = str(result)
+    
+    # Full results are kept, once each, in the artifact store; budgeting
+    # happens when they are sent to a tool
+    if tool.__name__ == "generate_plan":
+        save_text(context.session, "prd", result)
+    elif tool.__name__ == "generate_code":
+        save_code(context.session, tool.__name__, result)
+        files = parse_code_map(result)
+        if files:
+            save_filemap(context.session, FileMap(files))
+        else:
+            context.session["files"] = None
+    elif tool.__name__ == "test_code":
+        reviewing = context.session.pop("reviewing", None)
+        fmap = load_filemap(context.session)
+        if fmap is not None and reviewing is not None:
+            # Merge fresh findings with the cached ones for unchanged files
+            fmap.record_review(reviewing, result)
+            save_filemap(context.session, fmap)
+            result = fmap.report()
+        save_text(context.session, "test", result)
+    elif tool.__name__ == "fix_code":
+        # The fixer returns only the files it changed; apply them as patches
+        fixed = parse_code_map(result)
+        fmap = load_filemap(context.session)
+        if fmap is not None and fixed is not None:
+            # Excerpts of oversized files are spliced back into the whole file
+            fmap.apply(merge_pieces(fixed, fmap.files))
+            save_filemap(context.session, fmap)
+            result = fmap.to_json()
+        save_code(context.session, tool.__name__, result)
+        context.session["trigger_test_after_fix"] = True
+
+def _view(tool_context):
+    state = tool_context.state
+    return _Session(tool_context.session.id, state.to_dict() if hasattr(state, "to_dict") else dict(state),
+                    tool_context.session.user_id)
+
+def _write_back(tool_context, before, view):
+    # Only changed keys go into the event's state delta; removed keys become None
+    for key, value in view.items():
+        if before.get(key) != value:
+            tool_context.state[key] = value
+    for key in before:
+        if key not in view:
+            tool_context.state[key] = None
+
+def adk_before_tool_callback(tool, args, tool_context):
+    view = _view(tool_context)
+    before = dict(view)
+    result = before_tool_callback(tool.func, args, _ToolContext(view))
+    _write_back(tool_context, before, view)
+    return result
+
+def adk_after_tool_callback(tool, args, tool_context, tool_response):
+    view = _view(tool_context)
+    before = dict(view)
+    after_tool_callback(_ToolContext(view), tool.func, args, tool_response)
+    _write_back(tool_context, before, view)
@@ -1,7 +1,11 @@
 from google.adk.agents import Agent
-from litellm import completion
+from .callbacks import adk_before_tool_callback, adk_after_tool_callback
+from .llm import complete, complete_routed, router, JSON_RESPONSE
+from sdlc_common.ratelimit import PRIORITY
+from sdlc_common.structured import ensure_code_map, parse_code_map
+import json
 
-def generate_code(prd: str) -> str:
+async def generate_code(prd: str) -> str:
     '''
         Reads the PRD from session memory and generates corresponding code.
     '''
@@ -20,19 +24,22 @@ def generate_code(prd: str) -> str:
     {prd}
     """
     
-    response = completion(
-        model="gemini/gemini-2.0-flash",
-        messages=[{"role":"user", "content":prompt}]
-    )
+    # A cheap tier's reply is only kept if it parses as a code map
+    code = await complete_routed("code", prompt, accept=lambda text: parse_code_map(text) is not None, **JSON_RESPONSE)
     
-    code = response["choices"][0]["message"]["content"]
+    async def reask(correction):
+        return await complete(router.tiers("code")[-1], f"{prompt}\n\n{correction}", priority=PRIORITY["code"], **JSON_RESPONSE)
     
-    return code
+    # Normalise to plain JSON; keep the raw reply if it cannot be parsed at all
+    files = await ensure_code_map(code, reask)
+    return json.dumps(files) if files is not None else code
     
 coder_agent = Agent(
     name="coder_agent",
     model='gemini-2.0-flash',
     description="Reads PRD and writes clean Python code.",
     instruction="Use the PRD from the planner to write code. Use generate_code.",
-    tools=[generate_code]
+    tools=[generate_code],
+    before_tool_callback=adk_before_tool_callback,
+    after_tool_callback=adk_after_tool_callback
 )
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Provider-side context caching for the fix/test loop.
+
+Tool prompts are laid out as a stable prefix (static instructions, then the
+code) followed by the part that varies between calls (the test findings).
+For providers with explicit caching, a long enough prefix is sent as its
+own message marked with ``cache_control``, which litellm turns into a Gemini
+``cachedContents`` entry or an Anthropic cache breakpoint. Providers that
+cache prefixes automatically get the same layout without the marker.
+
+Each session keeps the handles it created, with the expiry the provider was
+given, so later calls know whether they reuse a live cache or create one.
+"""
+from typing import Any, Dict, List, Tuple
+from collections import OrderedDict
+from contextvars import ContextVar
+import hashlib
+import os
+import threading
+import time
+
+from .budget import count_tokens
+
+CONTEXT_CACHE = os.getenv("CONTEXT_CACHE", "1") == "1"
+# Lifetime of a cached prefix in seconds
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "600"))
+# Live handles kept per session; older ones are forgotten first
+CONTEXT_CACHE_HANDLES = int(os.getenv("CONTEXT_CACHE_HANDLES", "8"))
+# Providers with explicit caching and the smallest prefix (tokens) they accept
+MIN_CACHE_TOKENS = {"gemini": 4096, "vertex_ai": 4096, "anthropic": 1024}
+# Anthropic only accepts fixed TTLs and extends them on every hit
+FIXED_TTL = {"anthropic": 300}
+
+# Session of the running tool call; set by the runner's tool callback
+cache_session: ContextVar[str] = ContextVar("cache_session", default="default")
+
+
+def _provider(model: str) -> str:
+    return model.split("/", 1)[0]
+
+
+def cached_tokens(usage: Any) -> int:
+    '''
+    Prompt tokens the provider served from its cache, from a litellm usage.
+    '''
+    details = usage.get("prompt_tokens_details") or {}
+    if not isinstance(details, dict):
+        details = vars(details)
+    return details.get("cached_tokens") or usage.get("cache_read_input_tokens") or 0
+
+
+class Handle:
+    __slots__ = ("tokens", "expires", "uses")
+
+    def __init__(self, tokens: int, expires: float):
+        self.tokens = tokens
+        self.expires = expires
+        self.uses = 0
+
+
+class ContextCache:
+    def __init__(self, ttl: int = CONTEXT_CACHE_TTL, max_handles: int = CONTEXT_CACHE_HANDLES):
+        self.ttl = ttl
+        self.max_handles = max_handles
+        self._sessions: Dict[str, "OrderedDict[str, Handle]"] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.expired = 0
+        self.cached_tokens = 0
+
+    def messages(self, model: str, prefix: str, prompt: str) -> Tuple[List[Dict[str, Any]], str]:
+        '''
+        Chat messages for ``prefix`` followed by ``prompt``, and whether the
+        prefix "created" or "reused" a provider cache ("" when not cached).
+        '''
+        provider = _provider(model)
+        tokens = count_tokens(prefix, model) if CONTEXT_CACHE and provider in MIN_CACHE_TOKENS else 0
+        if not prefix or tokens < MIN_CACHE_TOKENS.get(provider, 1):
+            return [{"role": "user", "content": prefix + prompt}], ""
+
+        status = self._track(cache_session.get(), model, prefix, tokens)
+        marker = {"type": "ephemeral"}
+        if provider not in FIXED_TTL:
+            marker["ttl"] = f"{self.ttl}s"
+        return [
+            {"role": "user", "content": [{"type": "text", "text": prefix, "cache_control": marker}]},
+            {"role": "user", "content": prompt}
+        ], status
+
+    def _track(self, session: str, model: str, prefix: str, tokens: int) -> str:
+        key = hashlib.sha256(f"{model}\0{prefix}".encode("utf-8")).hexdigest()
+        fixed_ttl = FIXED_TTL.get(_provider(model))
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            handles = self._sessions.setdefault(session, OrderedDict())
+            handle = handles.get(key)
+            if handle is not None:
+                handle.uses += 1
+                if fixed_ttl:
+                    handle.expires = now + fixed_ttl
+                handles.move_to_end(key)
+                self.reused += 1
+                return "reused"
+            handles[key] = Handle(tokens, now + (fixed_ttl or self.ttl))
+            while len(handles) > self.max_handles:
+                handles.popitem(last=False)
+            self.created += 1
+            return "created"
+
+    def _expire(self, now: float) -> None:
+        for session in list(self._sessions):
+            handles = self._sessions[session]
+            for key in [key for key, handle in handles.items() if handle.expires <= now]:
+                del handles[key]
+                self.expired += 1
+            if not handles:
+                del self._sessions[session]
+
+    def record(self, usage: Any) -> int:
+        '''
+        Counts the cached prompt tokens a response reports; returns them.
+        '''
+        tokens = cached_tokens(usage) if usage else 0
+        with self._lock:
+            self.cached_tokens += tokens
+        return tokens
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire(time.time())
+            return {
+                "sessions": len(self._sessions),
+                "handles": sum(len(handles) for handles in self._sessions.values()),
+                "created": self.created,
+                "reused": self.reused,
+                "expired": self.expired,
+                "cached_tokens": self.cached_tokens
+            }
+
+
+context_cache = ContextCache()
@@ -1,45 +1,81 @@
 from google.adk.agents import Agent
-from litellm import completion
+from .callbacks import adk_before_tool_callback, adk_after_tool_callback
+from .llm import complete, complete_routed, router, JSON_RESPONSE
+from sdlc_common.ratelimit import PRIORITY
+from .budget import mentions
+from sdlc_common.structured import ensure_code_map, parse_code_map
+import json
 
 
-def fix_code(input: str) -> str:
-    '''
-    The input is a JSON string of code and/or test report.
-    The tool fixes the bugs found and returns an updated code JSON.
-    '''
-
-    prompt = f"""
-You are a senior code fixer and bug resolver. The input is a string that includes:
-- The original code (as JSON with filenames as keys)
+# Static instructions lead every fixer prompt so providers can cache them
+INSTRUCTIONS = """
+You are a senior code fixer and bug resolver. The input includes:
+- The code, as JSON objects with filenames as keys: first the files the
+  test result does not name, then the files it names
 - The test result describing bugs or enhancements
+- A key of the form "path/to/file:START-END" is an excerpt holding lines
+  START to END of a file too large to send whole
 
 Your task:
 1. Carefully parse the code JSON
 2. Fix **only the bugs and errors mentioned in the test result**
 3. Preserve the existing file structure and filenames
-4. Output only the corrected JSON with the same format:
-   {{
-     "path/to/file1": "fixed code here",
-     "path/to/file2": "..."
-   }}
+4. Output only the files you changed, each with its full corrected code, as JSON:
+   {
+     "path/to/changed_file": "fixed code here"
+   }
+   Files you did not change must be left out.
+   To change an excerpt, return it under the same key with its corrected
+   lines only.
 
 **Do not** include explanations, extra text, markdown, or comments.
 
 Input:
-{input}
 """
+TEST_RESULT = "\n\nTest Result:\n"
+
+
+def layout(input: str) -> tuple:
+    '''
+    Splits the fixer input into a stable prefix and the varying rest. Files
+    the test result does not name are unlikely to change between iterations,
+    so they follow the instructions in name order; the named files and the
+    test result come last.
+    '''
+    code, _, findings = input.partition(TEST_RESULT)
+    files = parse_code_map(code)
+    if not files or not findings:
+        return INSTRUCTIONS + code, (TEST_RESULT + findings) if findings else ""
+    named = [name for name in sorted(files) if mentions(name, findings)]
+    stable = {name: files[name] for name in sorted(files) if name not in named}
+    changing = {name: files[name] for name in named}
+    return INSTRUCTIONS + json.dumps(stable) + "\n", json.dumps(changing) + TEST_RESULT + findings
+
+
+async def fix_code(input: str) -> str:
+    '''
+    The input is a JSON string of code and/or test report.
+    The tool fixes the bugs found and returns a JSON of the changed files only.
+    '''
+    prefix, prompt = layout(input)
+    # Starts a tier higher for each earlier fix round whose code failed the tests
+    fixed = await complete_routed("fix", prompt, accept=lambda text: parse_code_map(text) is not None,
+                                  prefix=prefix, **JSON_RESPONSE)
+
+    async def reask(correction):
+        return await complete(router.tiers("fix")[-1], f"{prompt}\n\n{correction}", prefix=prefix,
+                              priority=PRIORITY["fix"], **JSON_RESPONSE)
 
-    response = completion(
-        model="gemini/gemini-2.0-flash",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return response["choices"][0]["message"]["content"]
+    # Normalise to plain JSON; keep the raw reply if it cannot be parsed at all
+    files = await ensure_code_map(fixed, reask)
+    return json.dumps(files) if files is not None else fixed
 
 fixer_agent = Agent(
     name="fixer_agent",
     model='gemini-2.0-flash',
     description="Fixes bugs in code based on test result.",
     instruction="Use the `fix_code` tool to correct code provided as JSON based on the test report.",
-    tools=[fix_code]
+    tools=[fix_code],
+    before_tool_callback=adk_before_tool_callback,
+    after_tool_callback=adk_after_tool_callback
 )
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Async model-call layer shared by the SDLC tools."""
+from typing import Optional
+import litellm
+from litellm import acompletion
+from sdlc_common.cache import response_cache, bypass_cache
+from .context_cache import context_cache
+from sdlc_common.ratelimit import scheduler, estimate_tokens, PRIORITY, DEFAULT_PRIORITY
+from sdlc_common.fairshare import fair_share
+from sdlc_common.routing import Accept, ModelRouter, load_policy
+from sdlc_common import replay
+from sdlc_common.tracing import span
+import asyncio
+import inspect
+import os
+
+# Default per-call timeout in seconds, overridable per call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Ask the provider for JSON output where a tool expects JSON
+JSON_MODE = os.getenv("JSON_MODE", "1") == "1"
+JSON_RESPONSE = {"response_format": {"type": "json_object"}} if JSON_MODE else {}
+# Keep-alive pool shared by all provider calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "20"))
+# Model tiers per stage, cheapest first; MODEL_ROUTING overrides them. Reviews
+# decide whether code passes, so the tester stays on the stronger model.
+DEFAULT_TIERS = {
+    "plan": ["groq/llama-3.1-8b-instant", "groq/llama3-70b-8192"],
+    "code": ["gemini/gemini-2.0-flash-lite", "gemini/gemini-2.0-flash"],
+    "test": ["gemini/gemini-2.0-flash"],
+    "fix": ["gemini/gemini-2.0-flash-lite", "gemini/gemini-2.0-flash"],
+}
+router = ModelRouter(load_policy(os.getenv("MODEL_ROUTING", ""), DEFAULT_TIERS))
+
+
+# LLM_REPLAY=record captures responses to LLM_FIXTURES; replay serves them offline
+if replay.LLM_REPLAY == "record":
+    acompletion = replay.recording_completion(acompletion, replay.fixtures())
+elif replay.LLM_REPLAY == "replay":
+    acompletion = replay.replay_completion(replay.fixtures(), replay.LLM_REPLAY_SPEED)
+
+
+def _configure_http_pool():
+    '''
+    Installs one shared keep-alive HTTP client for litellm on first use.
+    '''
+    if litellm.aclient_session is not None:
+        return
+    import httpx
+
+    litellm.aclient_session = httpx.AsyncClient(limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS
+    ))
+
+
+def response_key(model: str, prompt: str, prefix: str = "", **params) -> str:
+    '''
+    Response-cache key of a ``complete`` call with these arguments.
+    '''
+    return response_cache.make_key(model, prefix + prompt, **params)
+
+
+async def complete(model: str, prompt: str, timeout: Optional[float] = None,
+                   use_cache: bool = True, priority: int = DEFAULT_PRIORITY,
+                   prefix: str = "", cache_result: bool = True, **params) -> str:
+    '''
+    Sends ``prefix`` + ``prompt`` to ``model`` and returns the message content.
+    Identical calls are answered from the response cache; all others wait
+    for the session user's fair share, then go through the rate-limit
+    scheduler in the given priority lane. A stable
+    ``prefix`` (instructions and code) is cached provider-side when possible.
+    With ``cache_result`` off the response is not stored; routed calls
+    store it only once it is accepted.
+    '''
+    with span("llm.call", model=model) as trace:
+        use_cache = use_cache and not bypass_cache.get()
+        key = response_key(model, prompt, prefix, **params)
+        if use_cache:
+            cached = await response_cache.aget(key)
+            if cached is not None:
+                trace.set(cache_hit=True)
+                return cached
+
+        _configure_http_pool()
+        timeout = LLM_TIMEOUT if timeout is None else timeout
+        estimated = estimate_tokens(prefix + prompt)
+        messages, context_cached = context_cache.messages(model, prefix, prompt)
+
+        async def call():
+            return await asyncio.wait_for(
+                acompletion(
+                    model=model,
+                    messages=messages,
+                    timeout=timeout,
+                    **params
+                ),
+                timeout
+            )
+
+        async def limited():
+            return await scheduler.run(model, call, estimated, priority)
+
+        response = await fair_share.run(limited, estimated)
+        usage = response.get("usage") or {}
+        scheduler.record_usage(model, estimated, usage.get("total_tokens", 0))
+        fair_share.record_usage(estimated, usage.get("total_tokens", 0))
+        trace.set(cache_hit=False, prompt_tokens=usage.get("prompt_tokens", 0),
+                  completion_tokens=usage.get("completion_tokens", 0),
+                  context_cache=context_cached, cached_prompt_tokens=context_cache.record(usage))
+        content = response["choices"][0]["message"]["content"]
+        if use_cache and cache_result:
+            response_cache.set(key, content)
+        return content
+
+
+async def complete_routed(stage: str, prompt: str, accept: Optional[Accept] = None,
+                          use_cache: bool = True, **params) -> str:
+    '''
+    Runs ``complete`` on the model tiers of ``stage``, cheapest first, until
+    ``accept`` takes a tier's output. Calls go in the stage's priority lane.
+    Only an accepted output is cached: a rejected one served from the cache
+    would skip the escalation next time.
+    '''
+    outcome = {}
+
+    async def attempt(model, final):
+        outcome["model"] = model
+        return await complete(model, prompt, use_cache=use_cache, priority=PRIORITY[stage],
+                              cache_result=False, **params)
+
+    async def check(text):
+        ok = True if accept is None else accept(text)
+        if inspect.isawaitable(ok):
+            ok = await ok
+        outcome["accepted"] = ok
+        return ok
+
+    text = await router.run(stage, attempt, check)
+    if outcome.get("accepted") and use_cache and not bypass_cache.get():
+        params.pop("timeout", None)
+        response_cache.set(response_key(outcome["model"], prompt, **params), text)
+    return text
@@ -0,0 +1,125 @@
+"""Deterministic orchestrator for the plan -> code -> test -> fix cycle.
+
+``SdlcOrchestrator`` runs the same steps as the LLM-routed ``root_agent``,
+with the same semantics: the fix/test loop stops on the success signal,
+after MAX_FIXES fix rounds, or when the session is in panic mode. The tools
+are called directly, through the shared tool callbacks, so no model call is
+spent on deciding the next hop. Follow-ups in a session that already has
+code ("retest", "fix again", questions) go to the LLM router.
+"""
+from typing import Any, AsyncGenerator, Dict, Optional
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.genai import types
+from .callbacks import before_tool_callback, after_tool_callback, MAX_FIXES, _Session, _ToolContext
+from .planner import generate_plan
+from .coder import generate_code
+from .tester import test_code
+from .fixer import fix_code
+from .workspace import SUCCESS_SIGNAL
+from .artifacts import load_text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Step -> (tool, sub-agent the step's events are attributed to)
+STEPS = {
+    "plan": (generate_plan, "planner_agent"),
+    "code": (generate_code, "coder_agent"),
+    "test": (test_code, "tester_agent"),
+    "fix": (fix_code, "fixer_agent"),
+}
+
+
+class SdlcOrchestrator(BaseAgent):
+    router: BaseAgent
+    max_fixes: int = MAX_FIXES
+
+    async def _run_async_impl(self, ctx) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        if state.get("code"):
+            # Free-form follow-up on existing work: let the LLM router decide
+            async for event in self.router.run_async(ctx):
+                yield event
+            return
+
+        session = _Session(ctx.session.id, state.to_dict() if hasattr(state, "to_dict") else dict(state),
+                           ctx.session.user_id)
+        request = "".join(part.text or "" for part in (ctx.user_content.parts if ctx.user_content else []))
+        step: Optional[str] = "plan"
+        fixes = 0
+        while step is not None:
+            if session.get("panic"):
+                yield self._message(ctx, "Panic mode is active, so the run was stopped.")
+                return
+            tool, author = STEPS[step]
+            before = dict(session)
+            try:
+                result = await self._call(tool, self._args(step, request, session), session)
+            except Exception as e:
+                logger.error(f"{tool.__name__} failed: {str(e)}")
+                yield self._event(ctx, author, tool.__name__, None, session, before)
+                yield self._message(ctx, f"The {step} step failed ({type(e).__name__}). Please try again.")
+                return
+            yield self._event(ctx, author, tool.__name__, result, session, before)
+            if isinstance(result, dict) and "error" in result:
+                yield self._message(ctx, f"The {step} step stopped: {result['error']}")
+                return
+
+            if step == "plan":
+                step = "code"
+            elif step == "code":
+                step = "test"
+            elif step == "fix":
+                fixes += 1
+                step = "test"
+            elif SUCCESS_SIGNAL in load_text(session, "test"):
+                yield self._message(ctx, f"All tests passed after {fixes} fix round(s). Final code is in the session.")
+                return
+            elif fixes >= self.max_fixes:
+                yield self._message(ctx, f"Tests still report issues after {fixes} fix rounds; latest report is in the session.")
+                return
+            else:
+                step = "fix"
+
+    @staticmethod
+    def _args(step: str, request: str, session: _Session) -> Dict[str, Any]:
+        # The callbacks replace these with budgeted inputs where they apply
+        if step == "plan":
+            return {"input": request}
+        if step == "code":
+            return {"prd": load_text(session, "prd")}
+        if step == "test":
+            return {"input": load_text(session, "code")}
+        return {"input": f"{load_text(session, 'code')}\n\nTest Result:\n{load_text(session, 'test')}"}
+
+    @staticmethod
+    async def _call(tool, args: Dict[str, Any], session: _Session) -> Any:
+        context = _ToolContext(session)
+        result = before_tool_callback(tool, args, context)
+        if result is None:
+            result = await tool(**args)
+        after_tool_callback(context, tool, args, result)
+        return result
+
+    def _event(self, ctx, author: str, name: str, result: Any, session: _Session,
+               before: Dict[str, Any]) -> Event:
+        delta = {key: value for key, value in session.items() if before.get(key) != value}
+        delta.update({key: None for key in before if key not in session})
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=author,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(function_response=types.FunctionResponse(
+                name=name, response={"result": result}
+            ))]),
+            actions=EventActions(state_delta=delta)
+        )
+
+    def _message(self, ctx, text: str) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
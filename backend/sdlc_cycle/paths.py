@@ -0,0 +1,12 @@
+"""Where the backend keeps its local data (sessions database, artifact store).
+
+DATA_DIR defaults to ``backend/data`` whatever the working directory, and
+that directory is ignored by git.
+"""
+import os
+
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
@@ -1,9 +1,19 @@
 from google.adk.agents import Agent
-from litellm import completion
-from google.adk.models.lite_llm import LiteLlm
+from .callbacks import adk_before_tool_callback, adk_after_tool_callback
+from .llm import complete_routed
+from sdlc_common.cache import bypass_cache
+from sdlc_common.semantic_cache import semantic_cache
 
+# A cheap tier's PRD is only kept if it has the core sections
+PRD_SECTIONS = ("goals", "key features", "technical requirements")
 
-def generate_plan(input: str) -> str:
+
+def is_prd(text: str) -> bool:
+    lowered = text.lower()
+    return all(section in lowered for section in PRD_SECTIONS)
+
+
+async def generate_plan(input: str) -> str:
     '''
     This tool is used to generate a PRD document for building a software.
     
@@ -12,7 +22,16 @@ def generate_plan(input: str) -> str:
     
     Returns:
         str: A well-formatted PRD.
+
+    Near-duplicate inputs reuse the stored PRD, which in turn makes the
+    coder prompt identical and lets the response cache serve its code.
     '''
+    use_cache = not bypass_cache.get()
+    hit = semantic_cache.lookup(input) if use_cache else None
+    # Entries stored by other callers may hold code but no plan
+    if hit is not None and hit.get("plan"):
+        return hit["plan"]
+
     prompt = f"""
         You are a senior product manager. Based on the following user input, create a clean Product Requirements Document (PRD) using markdown format, with sections:
         - Introduction
@@ -28,25 +47,17 @@ def generate_plan(input: str) -> str:
         User input: {input}
     """
 
-    response = completion(
-        model="groq/llama3-70b-8192",
-        messages=[{"role": "user", "content": prompt}],
-    )
-    
-    prd = response["choices"][0]["message"]["content"]
-    
+    prd = await complete_routed("plan", prompt, accept=is_prd)
+    if use_cache:
+        semantic_cache.update(input, plan=prd)
     return prd
 
-groq_llm = LiteLlm(model="groq/llama3-70b-8192")
-    
-def after_tool_callback(context, tool, args, result):
-    if tool.__name__ == "generate_plan":
-        context.session["prd"] = result
-
 planner_agent = Agent(
     name="planner_agent",
     model='gemini-2.0-flash',
     description="Creates a PRD from user input.",
     instruction="Use the `generate_plan` tool to convert user task requests into a proper PRD.",
-    tools=[generate_plan]
+    tools=[generate_plan],
+    before_tool_callback=adk_before_tool_callback,
+    after_tool_callback=adk_after_tool_callback
 )
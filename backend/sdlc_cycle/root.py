@@ -3,6 +3,12 @@ from .coder import coder_agent
 from .tester import tester_agent
 from .fixer import fixer_agent
 from google.adk.agents import Agent
+from .orchestrator import SdlcOrchestrator
+import os
+
+# "llm": the root agent routes every hop; "state_machine": hops are programmatic
+# and the LLM router only handles follow-ups such as "retest" or "fix again"
+ORCHESTRATOR = os.getenv("ORCHESTRATOR", "llm")
 
 root_agent = Agent(
     name="root_agent",
@@ -28,4 +34,12 @@ If the user asks to "retest", "run tests again", or similar, call the tester_age
 If the user asks to "fix again", call the fixer_agent with the latest code and test results.
 """,
     sub_agents=[planner_agent, coder_agent, tester_agent, fixer_agent]
-)
\ No newline at end of file
+)
+
+if ORCHESTRATOR == "state_machine":
+    root_agent = SdlcOrchestrator(
+        name="sdlc_orchestrator",
+        description="Runs plan, code, test and fix deterministically; delegates follow-ups to root_agent.",
+        router=root_agent,
+        sub_agents=[root_agent]
+    )
@@ -0,0 +1,344 @@
+"""Session services for the ADK ``Runner``.
+
+``SqliteSessionService`` keeps sessions in a SQLite file in WAL mode, so
+several uvicorn workers can serve the same users and sessions. State follows
+the ADK scopes: ``app:`` keys are shared by the app, ``user:`` keys by all
+sessions of one user, ``temp:`` keys are never stored and everything else
+belongs to the session. Events are written in batches, and state deltas are
+merged inside a write transaction, so concurrent workers never drop each
+other's keys.
+"""
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from .paths import data_path
+
+# "sqlite" (shared across worker processes) or "memory" (single process)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_DB = os.getenv("SESSION_DB", data_path("sessions.db"))
+# Events are written once this many are pending for a session...
+SESSION_BATCH_SIZE = int(os.getenv("SESSION_BATCH_SIZE", "16"))
+# ...or the oldest pending event is this many seconds old (by timer, even
+# if no further event arrives), or a turn ends
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))
+# Compaction drops sessions idle this long and trims older events
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", "200"))
+SESSION_COMPACT_EVERY = int(os.getenv("SESSION_COMPACT_EVERY", "500"))
+
+Key = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    state TEXT NOT NULL, updated REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT PRIMARY KEY, state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL, event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, timestamp);
+"""
+
+
+def split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    '''
+    Splits a state dict or delta into (app, user, session) scopes, with the
+    scope prefixes removed and temp: keys dropped.
+    '''
+    app, user, session = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def merge_state(app: Dict[str, Any], user: Dict[str, Any], session: Dict[str, Any]) -> Dict[str, Any]:
+    state = dict(session)
+    state.update({State.APP_PREFIX + key: value for key, value in app.items()})
+    state.update({State.USER_PREFIX + key: value for key, value in user.items()})
+    return state
+
+
+class SqliteSessionService(BaseSessionService):
+    def __init__(self, db_path: str, batch_size: int = 16, flush_interval: float = 1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flushes = 0
+        # Timer-driven flushes in progress, kept referenced until done
+        self._timers = set()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; SQLite serialises writers across processes
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self, work, *args):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(db, *args)
+            db.execute("COMMIT")
+            return result
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _merge_into(db: sqlite3.Connection, table: str, where: str, params: tuple, delta: Dict[str, Any]):
+        if not delta:
+            return
+        row = db.execute(f"SELECT state FROM {table} WHERE {where}", params).fetchone()
+        state = json.loads(row[0]) if row else {}
+        state.update(delta)
+        columns = where.replace(" = ?", "").split(" AND ")
+        db.execute(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, state) "
+            f"VALUES ({', '.join('?' * len(columns))}, ?)",
+            (*params, json.dumps(state))
+        )
+
+    def _load(self, db: sqlite3.Connection, key: Key) -> Optional[Tuple[Dict[str, Any], float]]:
+        app_name, user_id, session_id = key
+        row = db.execute(
+            "SELECT state, updated FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        app = db.execute("SELECT state FROM app_state WHERE app_name = ?", (app_name,)).fetchone()
+        user = db.execute(
+            "SELECT state FROM user_state WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        state = merge_state(
+            json.loads(app[0]) if app else {}, json.loads(user[0]) if user else {}, json.loads(row[0])
+        )
+        return state, row[1]
+
+    async def create_session(self, *, app_name: str, user_id: str,
+                             state: Optional[Dict[str, Any]] = None,
+                             session_id: Optional[str] = None) -> Session:
+        session_id = (session_id or "").strip() or uuid.uuid4().hex
+        key = (app_name, user_id, session_id)
+        app, user, own = split_state(state or {})
+        now = time.time()
+
+        def work(db):
+            exists = db.execute(
+                "SELECT 1 FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+            ).fetchone()
+            if exists:
+                raise ValueError(f"Session {session_id} already exists")
+            db.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", (*key, json.dumps(own), now))
+            self._merge_into(db, "app_state", "app_name = ?", (app_name,), app)
+            self._merge_into(db, "user_state", "app_name = ? AND user_id = ?", (app_name, user_id), user)
+            return self._load(db, key)
+
+        merged, updated = await asyncio.to_thread(self._transaction, work)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=merged, last_update_time=updated)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str,
+                          config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        await self.flush(key)
+
+        def read():
+            loaded = self._load(self._db(), key)
+            if loaded is None:
+                return None
+            query, params = "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", list(key)
+            if config is not None and config.after_timestamp is not None:
+                query += " AND timestamp >= ?"
+                params.append(config.after_timestamp)
+            query += " ORDER BY timestamp DESC, rowid DESC"
+            if config is not None and config.num_recent_events is not None:
+                query += " LIMIT ?"
+                params.append(config.num_recent_events)
+            rows = self._db().execute(query, params).fetchall()
+            return loaded, [row[0] for row in reversed(rows)]
+
+        result = await asyncio.to_thread(read)
+        if result is None:
+            return None
+        (state, updated), events = result
+        return Session(
+            id=session_id, app_name=app_name, user_id=user_id, state=state,
+            events=[Event.model_validate_json(event) for event in events], last_update_time=updated
+        )
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+
+        def read():
+            query, params = "SELECT user_id, session_id FROM sessions WHERE app_name = ?", [app_name]
+            if user_id is not None:
+                query += " AND user_id = ?"
+                params.append(user_id)
+            rows = self._db().execute(query + " ORDER BY updated", params).fetchall()
+            sessions = []
+            for row_user, row_session in rows:
+                loaded = self._load(self._db(), (app_name, row_user, row_session))
+                if loaded is not None:
+                    sessions.append(Session(id=row_session, app_name=app_name, user_id=row_user,
+                                            state=loaded[0], last_update_time=loaded[1]))
+            return sessions
+
+        return ListSessionsResponse(sessions=await asyncio.to_thread(read))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            batch = self._pending.pop(key, None)
+        if batch is not None:
+            batch["timer"].cancel()
+
+        def work(db):
+            db.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            db.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+
+        await asyncio.to_thread(self._transaction, work)
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> Dict[str, Any]:
+        row = await asyncio.to_thread(lambda: self._db().execute(
+            "SELECT state FROM user_state WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone())
+        return json.loads(row[0]) if row else {}
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session, event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                # Written at the latest flush_interval seconds after its first event
+                timer = asyncio.get_running_loop().call_later(self.flush_interval, self._flush_later, key)
+                batch = self._pending[key] = {"events": [], "delta": {}, "timer": timer}
+            batch["events"].append((event.timestamp, event.model_dump_json(exclude_none=True)))
+            if event.actions and event.actions.state_delta:
+                batch["delta"].update(event.actions.state_delta)
+            batch["updated"] = event.timestamp
+            # A turn ends with a final response the user sees; state-only
+            # events are final responses too, but must not end the batch
+            due = (
+                len(batch["events"]) >= self.batch_size
+                or (event.is_final_response() and event.content is not None)
+            )
+        if due:
+            await self.flush(key)
+        return event
+
+    def _flush_later(self, key: Key) -> None:
+        task = asyncio.ensure_future(self.flush(key))
+        self._timers.add(task)
+        task.add_done_callback(self._timers.discard)
+
+    async def flush(self, key: Optional[Key] = None) -> None:
+        '''
+        Writes pending events and state deltas, for one session or for all,
+        in a single transaction.
+        '''
+        with self._lock:
+            if key is None:
+                batches, self._pending = self._pending, {}
+            else:
+                batches = {key: self._pending.pop(key)} if key in self._pending else {}
+        if not batches:
+            return
+        for batch in batches.values():
+            batch["timer"].cancel()
+
+        def work(db):
+            for (app_name, user_id, session_id), batch in batches.items():
+                app, user, own = split_state(batch["delta"])
+                self._merge_into(db, "app_state", "app_name = ?", (app_name,), app)
+                self._merge_into(db, "user_state", "app_name = ? AND user_id = ?", (app_name, user_id), user)
+                row = db.execute(
+                    "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, user_id, session_id)
+                ).fetchone()
+                if row is None:
+                    continue  # deleted meanwhile
+                state = json.loads(row[0])
+                state.update(own)
+                db.execute(
+                    "UPDATE sessions SET state = ?, updated = MAX(updated, ?) "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (json.dumps(state), batch["updated"], app_name, user_id, session_id)
+                )
+                db.executemany(
+                    "INSERT INTO events VALUES (?, ?, ?, ?, ?)",
+                    [(app_name, user_id, session_id, timestamp, event) for timestamp, event in batch["events"]]
+                )
+
+        await asyncio.to_thread(self._transaction, work)
+        self._flushes += 1
+        if SESSION_COMPACT_EVERY and self._flushes % SESSION_COMPACT_EVERY == 0:
+            await self.compact()
+
+    async def compact(self, ttl: float = SESSION_TTL, max_events: int = SESSION_MAX_EVENTS) -> Dict[str, int]:
+        '''
+        Deletes sessions idle for longer than ``ttl`` seconds, keeps only the
+        newest ``max_events`` events per session and truncates the WAL.
+        '''
+        cutoff = time.time() - ttl
+
+        def work(db):
+            stale = db.execute("SELECT app_name, user_id, session_id FROM sessions WHERE updated < ?",
+                               (cutoff,)).fetchall()
+            db.executemany("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", stale)
+            db.executemany("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", stale)
+            trimmed = db.execute(
+                "DELETE FROM events WHERE rowid IN (SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER ("
+                "PARTITION BY app_name, user_id, session_id ORDER BY timestamp DESC, rowid DESC) AS n "
+                "FROM events) WHERE n > ?)", (max_events,)
+            ).rowcount
+            return {"sessions_deleted": len(stale), "events_trimmed": trimmed}
+
+        result = await asyncio.to_thread(self._transaction, work)
+        await asyncio.to_thread(lambda: self._db().execute("PRAGMA wal_checkpoint(TRUNCATE)"))
+        return result
+
+
+def create_session_service() -> BaseSessionService:
+    '''
+    Builds the session service selected by SESSION_BACKEND.
+    '''
+    if SESSION_BACKEND == "memory":
+        return InMemorySessionService()
+    return SqliteSessionService(SESSION_DB, SESSION_BATCH_SIZE, SESSION_FLUSH_INTERVAL)
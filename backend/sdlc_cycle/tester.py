@@ -1,35 +1,142 @@
 from google.adk.agents import Agent
-from litellm import completion
+from .callbacks import adk_before_tool_callback, adk_after_tool_callback
+from .llm import complete_routed
+from .budget import INPUT_BUDGET, count_tokens, file_of, split_file
+from sdlc_common.structured import parse_code_map
+from .workspace import SUCCESS_SIGNAL, split_sections
+from sdlc_common import sandbox
+import asyncio
+import json
+import os
 
-def test_code(input: str) -> str:
-    prompt = f"""
+# Execute the code locally before asking the LLM to review it
+SANDBOX_ENABLED = os.getenv("SANDBOX_ENABLED", "1") == "1"
+# Review large projects as concurrent per-module chunks (map-reduce)
+TESTER_FANOUT = os.getenv("TESTER_FANOUT", "1") == "1"
+# Maximum number of chunk reviews running at once
+TESTER_CONCURRENCY = int(os.getenv("TESTER_CONCURRENCY", "4"))
+# Files of one directory are grouped into a chunk up to this many tokens
+CHUNK_TOKENS = int(os.getenv("TESTER_CHUNK_TOKENS", "3000"))
+
+
+# Static review instructions; the code under review follows them
+INSTRUCTIONS = """
     You are a senior QA engineer. You are given a software project as a JSON string:
     - Each key is a filename (e.g., "backend/server.js")
     - Each value is the full source code of that file
-    
+
     Your job is to:
     1. **Perform a static code review** — do not execute code
     2. Identify bugs, missing logic, or syntax issues
     3. Suggest critical fixes first
     4. Then suggest enhancements or improvements
-    5. If everything is perfect and nothing needs changing, reply only with:
-    
+    5. Start the findings for each file with a line "### <filename>" and omit files that need no changes
+    6. If everything is perfect and nothing needs changing, reply only with:
+
         U EE A E A U EE EE A E
-    
+
     Input JSON:
-    {input}
     """
-    response = completion(
-        model="gemini/gemini-2.0-flash",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
-    return response["choices"][0]["message"]["content"]
+
+
+async def review(input: str) -> str:
+    return await complete_routed("test", input, prefix=INSTRUCTIONS)
+
+
+def split_chunks(files: dict) -> list:
+    '''
+    Groups files by directory into chunks of at most CHUNK_TOKENS tokens. A
+    file larger than that is split into line-range excerpts, one per chunk.
+    '''
+    chunks, current, used, directory = [], {}, 0, None
+    for name in sorted(files, key=lambda n: (os.path.dirname(n), n)):
+        cost = count_tokens(files[name])
+        if cost > CHUNK_TOKENS:
+            if current:
+                chunks.append(current)
+                current, used = {}, 0
+            chunks.extend({piece: code} for piece, code in split_file(name, files[name], CHUNK_TOKENS).items())
+            continue
+        if current and (os.path.dirname(name) != directory or used + cost > CHUNK_TOKENS):
+            chunks.append(current)
+            current, used = {}, 0
+        current[name] = files[name]
+        directory = os.path.dirname(name)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def merge_reviews(chunks: list, reports: list) -> str:
+    '''
+    Merges per-chunk reports into one "### <filename>" report with findings
+    repeated for the same file removed. Returns the success signal when
+    every chunk passed.
+    '''
+    merged, seen = {}, set()
+    for chunk, report in zip(chunks, reports):
+        sections = {}
+        for name, findings in split_sections(report).items():
+            # Findings for an excerpt belong to its file
+            sections.setdefault(file_of(name), []).append(findings)
+        sections = {name: "\n".join(parts) for name, parts in sections.items()}
+        if not sections and SUCCESS_SIGNAL not in report:
+            sections = {", ".join(dict.fromkeys(file_of(name) for name in chunk)): report.strip()}
+        for name, findings in sections.items():
+            lines = []
+            for line in findings.splitlines():
+                key = (name, " ".join(line.lower().split()))
+                # Only whole findings are deduplicated, not short code/markup
+                # lines, and only within a file: the same finding in two files
+                # is two bugs
+                if len(key[1]) > 15 and key in seen:
+                    continue
+                seen.add(key)
+                lines.append(line)
+            if "".join(lines).strip():
+                merged[name] = (merged[name] + "\n" if name in merged else "") + "\n".join(lines).strip()
+    if not merged:
+        return SUCCESS_SIGNAL
+    return "\n\n".join(f"### {name}\n{findings}" for name, findings in merged.items())
+
+
+async def test_code(input: str) -> str:
+    '''
+    Reviews a JSON project. The code is first executed in the sandbox and
+    syntax, import or test failures are returned without an LLM call.
+    Multi-chunk projects are reviewed concurrently, one prompt per chunk,
+    and the findings merged into a single report. Input too large for one
+    prompt is always chunked, so no part of it goes unreviewed.
+    '''
+    files = parse_code_map(input)
+    if files and SANDBOX_ENABLED:
+        # Deterministic failures need no LLM review to be reported
+        result = await sandbox.execute(files)
+        if any(f["kind"] in ("syntax", "import", "test") for f in result["failures"]):
+            return sandbox.format_report(result)
+
+    if files is None and count_tokens(input) > CHUNK_TOKENS:
+        files = {"code": input}
+    chunks = split_chunks(files) if files and (TESTER_FANOUT or count_tokens(input) > INPUT_BUDGET) else []
+    if len(chunks) < 2:
+        return await review(input)
+
+    slots = asyncio.Semaphore(TESTER_CONCURRENCY)
+
+    async def review_chunk(chunk):
+        async with slots:
+            return await review(json.dumps(chunk))
+
+    reports = await asyncio.gather(*[review_chunk(chunk) for chunk in chunks])
+    return merge_reviews(chunks, reports)
 
 tester_agent = Agent(
     name="tester_agent",
     model='gemini-2.0-flash',
     description="Tests the generated code and reports issues or improvements.",
     instruction="Use the `test_code` tool to evaluate code passed as a JSON string. Focus first on errors, then enhancements.",
-    tools=[test_code]
+    tools=[test_code],
+    before_tool_callback=adk_before_tool_callback,
+    after_tool_callback=adk_after_tool_callback
 )
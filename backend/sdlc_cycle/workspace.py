@@ -0,0 +1,148 @@
+"""Versioned file map for incremental fix/test iterations.
+
+The fixer returns only the files it changed, which are applied as per-file
+patches. Every file is fingerprinted together with the files it imports, so
+after a patch only the changed files and their dependents need another
+review; findings for the rest are reused.
+"""
+from typing import Dict, List, Optional, Set
+import hashlib
+import json
+import os
+import re
+
+SUCCESS_SIGNAL = "U EE A E A U EE EE A E"
+
+_IMPORT = re.compile(
+    r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))"
+    r"|(?:require\(|from\s+|import\s+)['\"]([\w./-]+)['\"]",
+    re.M
+)
+_SECTION = re.compile(r"^#{2,4}\s*`?([^\s`]+)`?\s*$", re.M)
+
+
+def _module_keys(name: str) -> Set[str]:
+    stem = os.path.splitext(name)[0]
+    return {stem, stem.replace("/", "."), os.path.basename(stem)}
+
+
+class FileMap:
+    def __init__(self, files: Optional[Dict[str, str]] = None):
+        self.version = 0
+        self.files: Dict[str, str] = {}
+        # filename -> version in which the file last changed
+        self.changed_in: Dict[str, int] = {}
+        # filename -> [fingerprint, findings] from the last review
+        self.findings: Dict[str, List[str]] = {}
+        if files:
+            self.apply(files)
+
+    def apply(self, patch: Dict[str, Optional[str]]) -> List[str]:
+        '''
+        Applies per-file patches (new content, or None to delete a file) and
+        returns the names of the files that actually changed.
+        '''
+        changed = [name for name, code in patch.items() if self.files.get(name) != code]
+        if not changed:
+            return []
+        self.version += 1
+        for name in changed:
+            if patch[name] is None:
+                self.files.pop(name, None)
+                self.changed_in.pop(name, None)
+                self.findings.pop(name, None)
+            else:
+                self.files[name] = patch[name]
+                self.changed_in[name] = self.version
+        return changed
+
+    def imports(self, name: str) -> Set[str]:
+        '''
+        Files in the map that ``name`` imports.
+        '''
+        modules = set()
+        for match in _IMPORT.finditer(self.files[name]):
+            target = next(group for group in match.groups() if group)
+            modules.add(target.lstrip("./").replace("/", "."))
+            modules.add(target.lstrip("./"))
+        return {
+            other for other in self.files
+            if other != name and modules & _module_keys(other)
+        }
+
+    def fingerprint(self, name: str) -> str:
+        digest = hashlib.sha256(self.files[name].encode("utf-8"))
+        for dep in sorted(self.imports(name)):
+            digest.update(dep.encode("utf-8"))
+            digest.update(self.files[dep].encode("utf-8"))
+        return digest.hexdigest()
+
+    def dirty(self) -> List[str]:
+        '''
+        Files whose content or imported files changed since their last review.
+        '''
+        return [
+            name for name in self.files
+            if self.findings.get(name, [None])[0] != self.fingerprint(name)
+        ]
+
+    def record_review(self, reviewed: List[str], result: str) -> None:
+        '''
+        Stores the tester's findings for ``reviewed`` files. The report is
+        split on "### filename" headers; files without a section are clean.
+        '''
+        sections = split_sections(result)
+        if not sections and SUCCESS_SIGNAL not in result:
+            # Unstructured report: attribute it to every reviewed file
+            sections = {name: result.strip() for name in reviewed}
+        for name in reviewed:
+            if name in self.files:
+                self.findings[name] = [self.fingerprint(name), sections.get(name, "")]
+
+    def report(self) -> str:
+        '''
+        Merged findings over the whole project, or the success signal once
+        every file has a review of its current content.
+        '''
+        parts = [
+            f"### {name}\n{findings}"
+            for name, (_, findings) in self.findings.items()
+            if findings and name in self.files
+        ]
+        parts += [f"### {name}\nNot reviewed yet." for name in self.dirty()]
+        return "\n\n".join(parts) if parts else SUCCESS_SIGNAL
+
+    def to_json(self, names: Optional[List[str]] = None) -> str:
+        if names is None:
+            return json.dumps(self.files)
+        return json.dumps({name: self.files[name] for name in names if name in self.files})
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.version,
+            "files": self.files,
+            "changed_in": self.changed_in,
+            "findings": self.findings
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FileMap":
+        fmap = cls()
+        fmap.version = data["version"]
+        fmap.files = dict(data["files"])
+        fmap.changed_in = dict(data["changed_in"])
+        fmap.findings = {name: list(entry) for name, entry in data["findings"].items()}
+        return fmap
+
+
+def split_sections(report: str) -> Dict[str, str]:
+    '''
+    Splits a per-file review into {filename: findings} on "### filename" headers.
+    '''
+    matches = list(_SECTION.finditer(report))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(report)
+        body = report[match.end():end].strip()
+        sections[match.group(1)] = "" if SUCCESS_SIGNAL in body else body
+    return sections
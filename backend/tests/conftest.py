@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Keep databases and artifacts of a test run out of backend/data
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="sdlc-backend-tests-"))
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
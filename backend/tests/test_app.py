@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import main
+from sdlc_cycle.artifacts import manifest, save_code
+from sdlc_cycle.callbacks import adk_after_tool_callback, adk_before_tool_callback
+from sdlc_cycle.root import planner_agent, coder_agent, tester_agent, fixer_agent
+
+
+def test_sub_agents_run_the_tool_callbacks():
+    for agent in (planner_agent, coder_agent, tester_agent, fixer_agent):
+        assert agent.before_tool_callback is adk_before_tool_callback
+        assert agent.after_tool_callback is adk_after_tool_callback
+
+
+class RecordingState(dict):
+    """Every assignment to an ADK tool context's state becomes part of the event delta."""
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.written = {}
+
+    def __setitem__(self, key, value):
+        self.written[key] = value
+        super().__setitem__(key, value)
+
+
+def test_adk_callbacks_write_back_only_changed_keys():
+    async def fix_code(input: str) -> str:
+        return input
+
+    tool = SimpleNamespace(func=fix_code)
+    state = RecordingState({"fix_count": 0, "test": "", "untouched": "x"})
+    context = SimpleNamespace(state=state, session=SimpleNamespace(id="s1", user_id="u1"))
+    args = {"input": ""}
+    assert adk_before_tool_callback(tool=tool, args=args, tool_context=context) is None
+    assert state.written == {"fix_count": 1}
+
+    state.written.clear()
+    adk_after_tool_callback(tool=tool, args=args, tool_context=context, tool_response='{"a.py": "x = 1\\n"}')
+    assert manifest(state, -1)["tool"] == "fix_code"
+    assert "untouched" not in state.written and state.written["trigger_test_after_fix"] is True
+
+
+def test_app_serves_session_iterations():
+    session = asyncio.run(main.session_service.create_session(app_name="sdlc_cycle", user_id="u1"))
+    with TestClient(main.app) as client:
+        path = f"/apps/sdlc_cycle/users/u1/sessions/{session.id}/iterations"
+        assert client.get(path).json() == []
+        assert client.get("/apps/sdlc_cycle/users/u1/sessions/missing/iterations").status_code == 404
+        assert client.get("/artifacts/..%2F.env").status_code in (400, 404)
+        assert client.get("/artifacts/" + "0" * 64).status_code == 404
+
+        state = {}
+        save_code(state, "generate_code", '{"main.py": "print(1)\\n"}')
+        digest = manifest(state, 0)["files"]["main.py"]
+        response = client.get(f"/artifacts/{digest}")
+        assert response.status_code == 200 and response.text == "print(1)\n"
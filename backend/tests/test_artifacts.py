@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from sdlc_cycle.artifacts import ArtifactStore, artifact_store, diff, iteration_files, manifest, save_code, zip_stream
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "store"))
+
+
+def test_round_trip_and_dedup(store):
+    digest = store.put("print('hello')\n")
+    assert store.put("print('hello')\n") == digest
+    assert store.get(digest) == "print('hello')\n"
+    assert store.duplicates == 1
+
+
+def test_reads_from_disk_after_eviction(tmp_path):
+    store = ArtifactStore(str(tmp_path / "store"), memory_bytes=1)
+    first, second = store.put("a" * 100), store.put("b" * 100)
+    assert store.get(first) == "a" * 100
+    assert store.get(second) == "b" * 100
+    assert store.disk_reads >= 1
+
+
+@pytest.mark.parametrize("digest", [
+    "../.env", "..%2F.env", "...env", "/etc/passwd", "ab/../../cd",
+    "A" * 64, "0" * 63, "0" * 65, "0" * 63 + "g", "",
+])
+def test_rejects_anything_but_a_sha256_digest(tmp_path, digest):
+    (tmp_path / ".env").write_text("GEMINI_API_KEY=secret123\n")
+    store = ArtifactStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.get(digest)
+
+
+def test_manifest_with_a_bad_hash_is_rejected():
+    session = {"manifests": [artifact_store.put(json.dumps({"tool": "generate_code", "files": {"main.py": "../../x"}}))]}
+    with pytest.raises(ValueError):
+        manifest(session, 0)
+
+
+def test_iterations_zip_and_diff():
+    session = {}
+    save_code(session, "generate_code", json.dumps({"main.py": "x = 1\n", "util.py": "y = 2\n"}))
+    save_code(session, "fix_code", json.dumps({"main.py": "x = 3\n", "util.py": "y = 2\n"}))
+    assert session["code"] == "manifest:1"
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(zip_stream(manifest(session, 1)["files"]))))
+    assert {name: archive.read(name).decode() for name in archive.namelist()} == iteration_files(session, 1)
+
+    changes = diff(session, 1)["files"]
+    assert list(changes) == ["main.py"]
+    assert changes["main.py"]["status"] == "modified"
+    assert "+x = 3" in changes["main.py"]["diff"]
+
+
+def test_default_directory_is_under_the_data_dir():
+    assert artifact_store.directory.startswith(os.environ["DATA_DIR"])
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from sdlc_cycle import tester
+from sdlc_cycle.budget import count_tokens, file_of, merge_pieces, select_files, split_file
+from sdlc_cycle.callbacks import _Session, _ToolContext, after_tool_callback, before_tool_callback
+from sdlc_cycle.fixer import fix_code
+from sdlc_cycle.tester import merge_reviews, split_chunks
+from sdlc_cycle.artifacts import load_text, save_code, save_filemap
+from sdlc_cycle.workspace import FileMap, SUCCESS_SIGNAL
+
+
+def big_file(lines: int) -> str:
+    return "".join(f"value_{i} = compute_{i}(items)\n" for i in range(lines))
+
+
+def test_split_file_covers_every_line_once():
+    code = big_file(300)
+    pieces = split_file("big.py", code, 200)
+    assert len(pieces) > 1
+    assert "".join(pieces.values()) == code
+    assert all(file_of(piece) == "big.py" for piece in pieces)
+    assert all(count_tokens(text) <= 200 for text in pieces.values())
+
+
+def test_select_files_sends_excerpts_of_an_oversized_file():
+    files = {"small.py": "x = 1\n", "big.py": big_file(2000)}
+    findings = "### big.py\ncompute_1500 is undefined"
+    chosen = select_files(files, findings, 1000)
+    assert "small.py" in chosen
+    excerpts = [key for key in chosen if file_of(key) == "big.py"]
+    assert excerpts and "big.py" not in chosen
+    # The excerpt naming the failing identifier is among the ones sent
+    assert any("compute_1500(" in chosen[key] for key in excerpts)
+    assert count_tokens(json.dumps(chosen)) <= 1000
+
+
+def test_merge_pieces_splices_edited_excerpts_back():
+    code = big_file(50)
+    pieces = split_file("big.py", code, 100)
+    first, last = list(pieces)[0], list(pieces)[-1]
+    patch = {first: pieces[first].replace("value_0 =", "fixed_0 ="),
+             last: pieces[last].replace("value_49 =", "fixed_49 =").rstrip("\n"),
+             "new.py": "y = 2\n"}
+    merged = merge_pieces(patch, {"big.py": code})
+    assert set(merged) == {"big.py", "new.py"}
+    lines = merged["big.py"].splitlines()
+    assert len(lines) == 50
+    assert lines[0].startswith("fixed_0 =") and lines[49].startswith("fixed_49 =")
+    assert lines[1:49] == code.splitlines()[1:49]
+
+
+def test_tester_reviews_every_excerpt_of_an_oversized_file():
+    files = {"small.py": "x = 1\n", "pkg/big.py": big_file(2000)}
+    chunks = split_chunks(files)
+    reviewed = [name for chunk in chunks for name in chunk]
+    assert "small.py" in reviewed and "pkg/big.py" not in reviewed
+    assert "".join(chunk[name] for chunk in chunks for name in chunk if file_of(name) == "pkg/big.py") \
+        == files["pkg/big.py"]
+
+    first_piece = next(name for chunk in chunks for name in chunk if file_of(name) == "pkg/big.py")
+    reports = [f"### {first_piece}\nreal bug" if first_piece in chunk else SUCCESS_SIGNAL for chunk in chunks]
+    assert merge_reviews(chunks, reports) == "### pkg/big.py\nreal bug"
+
+
+def test_oversized_file_is_reviewed_not_reported_as_passing(monkeypatch):
+    prompts = []
+
+    async def review(input):
+        prompts.append(json.loads(input))
+        return SUCCESS_SIGNAL
+
+    monkeypatch.setattr(tester, "review", review)
+    monkeypatch.setattr(tester, "SANDBOX_ENABLED", False)
+    session = _Session("s1", {})
+    save_filemap(session, FileMap({"small.py": "x = 1\n", "big.py": big_file(4000)}))
+    context, args = _ToolContext(session), {"input": ""}
+    assert before_tool_callback(tester.test_code, args, context) is None
+    result = asyncio.run(tester.test_code(**args))
+    after_tool_callback(context, tester.test_code, args, result)
+
+    sent = "".join(code for prompt in prompts for name, code in prompt.items() if file_of(name) == "big.py")
+    assert sent == big_file(4000)
+    assert load_text(session, "test") == SUCCESS_SIGNAL
+
+
+def test_unreviewed_files_are_never_reported_as_passing():
+    fmap = FileMap({"a.py": "x = 1\n", "b.py": "y = 2\n"})
+    fmap.record_review(["a.py"], SUCCESS_SIGNAL)
+    assert SUCCESS_SIGNAL not in fmap.report()
+    assert "### b.py" in fmap.report()
+
+
+def test_fix_round_edits_an_excerpt_of_an_oversized_file(monkeypatch):
+    session = _Session("s1", {})
+    code = big_file(4000)
+    save_code(session, "generate_code", json.dumps({"big.py": code}))
+    save_filemap(session, FileMap({"big.py": code}))
+    session["test"] = "### big.py\ncompute_3000 is undefined"
+    context, args = _ToolContext(session), {"input": ""}
+    assert before_tool_callback(fix_code, args, context) is None
+    sent = json.loads(args["input"].split("\n\nTest Result:\n", 1)[0])
+    piece = next(key for key in sent if "compute_3000(" in sent[key])
+    result = json.dumps({piece: sent[piece].replace("compute_3000(", "compute(")})
+    after_tool_callback(context, fix_code, args, result)
+    files = json.loads(load_text(session, "code"))
+    assert files == {"big.py": code.replace("compute_3000(", "compute(")}
+
+
+def test_a_finding_repeated_in_another_file_is_kept():
+    finding = "Function main has no error handling for missing input"
+    chunks = [{"a.py": "", "b.py": ""}, {"a.py:1-50": ""}]
+    reports = [f"### a.py\n{finding}\n\n### b.py\n{finding}", f"### a.py:1-50\n{finding}"]
+    assert merge_reviews(chunks, reports) == f"### a.py\n{finding}\n\n### b.py\n{finding}"
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from sdlc_common.cache import bypass_cache
+from sdlc_cycle import context_cache as cc
+from sdlc_cycle import llm
+from sdlc_cycle.context_cache import ContextCache, cache_session
+from sdlc_cycle.fixer import INSTRUCTIONS, TEST_RESULT, layout
+
+PREFIX = "Fix the bugs named in the test result.\n" * 20
+
+
+@pytest.fixture(autouse=True)
+def small_minimum(monkeypatch):
+    # Real minimums are thousands of tokens; the behaviour is the same
+    monkeypatch.setattr(cc, "MIN_CACHE_TOKENS", {"gemini": 50, "anthropic": 50})
+
+
+def test_a_short_prefix_or_uncached_provider_is_sent_inline():
+    cache = ContextCache()
+    assert cache.messages("gemini/gemini-2.0-flash", "Fix it.\n", "x") == \
+        ([{"role": "user", "content": "Fix it.\nx"}], "")
+    assert cache.messages("groq/llama3-70b-8192", PREFIX, "x") == \
+        ([{"role": "user", "content": PREFIX + "x"}], "")
+    assert cache.stats()["handles"] == 0
+
+
+def test_a_session_reuses_the_prefix_it_cached():
+    cache = ContextCache(ttl=600)
+    messages, status = cache.messages("gemini/gemini-2.0-flash", PREFIX, "findings 1")
+    assert status == "created"
+    assert messages == [
+        {"role": "user", "content": [{"type": "text", "text": PREFIX,
+                                      "cache_control": {"type": "ephemeral", "ttl": "600s"}}]},
+        {"role": "user", "content": "findings 1"}
+    ]
+    assert cache.messages("gemini/gemini-2.0-flash", PREFIX, "findings 2")[1] == "reused"
+    token = cache_session.set("other")
+    try:
+        assert cache.messages("gemini/gemini-2.0-flash", PREFIX, "findings 1")[1] == "created"
+    finally:
+        cache_session.reset(token)
+    stats = cache.stats()
+    assert (stats["sessions"], stats["created"], stats["reused"]) == (2, 2, 1)
+
+
+def test_expired_and_surplus_handles_are_forgotten():
+    cache = ContextCache(ttl=0, max_handles=2)
+    cache.messages("gemini/gemini-2.0-flash", PREFIX, "x")
+    # The provider dropped it too, so it is created again
+    assert cache.messages("gemini/gemini-2.0-flash", PREFIX, "x")[1] == "created"
+    assert cache.stats()["expired"] >= 1
+
+    cache = ContextCache(max_handles=2)
+    for n in range(3):
+        cache.messages("gemini/gemini-2.0-flash", f"{n}{PREFIX}", "x")
+    assert cache.stats()["handles"] == 2
+    assert cache.messages("gemini/gemini-2.0-flash", f"0{PREFIX}", "x")[1] == "created"
+
+
+def test_anthropic_gets_its_fixed_ttl():
+    messages, _ = ContextCache().messages("anthropic/claude-3-5-haiku", PREFIX, "x")
+    assert messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_cached_prompt_tokens_are_counted_for_both_usage_shapes():
+    cache = ContextCache()
+    assert cache.record({"prompt_tokens": 900, "prompt_tokens_details": {"cached_tokens": 800}}) == 800
+    assert cache.record({"prompt_tokens": 900, "cache_read_input_tokens": 700}) == 700
+    assert cache.record(None) == 0
+    assert cache.stats()["cached_tokens"] == 1500
+
+
+def test_the_fixer_prefix_stays_stable_across_iterations():
+    files = {"main.py": "from util import add\n", "util.py": "def add(a, b): return a - b\n",
+             "readme.md": "# add\n"}
+    first = layout(json.dumps(files) + TEST_RESULT + "### util.py\nadd subtracts")
+    files["util.py"] = "def add(a, b): return a * b\n"
+    second = layout(json.dumps(files) + TEST_RESULT + "### util.py\nadd multiplies")
+    # Only the file named in the findings moves to the varying part
+    assert first[0] == second[0]
+    assert first[0] == INSTRUCTIONS + json.dumps({"main.py": files["main.py"], "readme.md": "# add\n"}) + "\n"
+    assert second[1].startswith(json.dumps({"util.py": files["util.py"]}) + TEST_RESULT)
+
+
+def test_complete_sends_the_prefix_as_a_cached_message(monkeypatch):
+    sent = []
+
+    async def acompletion(model, messages, **params):
+        sent.append(messages)
+        return {"choices": [{"message": {"content": "{}"}}],
+                "usage": {"prompt_tokens": 400, "completion_tokens": 1, "total_tokens": 401,
+                          "prompt_tokens_details": {"cached_tokens": 300 if len(sent) > 1 else 0}}}
+
+    monkeypatch.setattr(llm, "acompletion", acompletion)
+    monkeypatch.setattr(llm, "context_cache", ContextCache())
+
+    async def scenario():
+        bypass_cache.set(True)
+        cache_session.set("fix-loop")
+        for findings in ("findings 1", "findings 2"):
+            await llm.complete("gemini/gemini-2.0-flash", findings, prefix=PREFIX)
+
+    asyncio.run(scenario())
+    assert [m[0]["content"][0]["text"] for m in sent] == [PREFIX, PREFIX]
+    assert [m[1]["content"] for m in sent] == ["findings 1", "findings 2"]
+    assert llm.context_cache.stats()["reused"] == 1 and llm.context_cache.stats()["cached_tokens"] == 300
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from sdlc_cycle import orchestrator, tester
+from sdlc_cycle.artifacts import load_text
+from sdlc_cycle.orchestrator import SdlcOrchestrator
+from sdlc_cycle.workspace import SUCCESS_SIGNAL
+
+APP = "sdlc_cycle"
+
+
+class Router(BaseAgent):
+    """Stands in for the LLM-routed root agent."""
+
+    async def _run_async_impl(self, ctx):
+        yield Event(invocation_id=ctx.invocation_id, author=self.name,
+                    content=types.Content(role="model", parts=[types.Part(text="routed")]))
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    """Fake tools under the real names; the tests fail while util.py subtracts."""
+    fake = SimpleNamespace(calls=[], fixed="def add(a, b):\n    return a + b\n")
+    calls = fake.calls
+
+    async def generate_plan(input):
+        calls.append("plan")
+        return "## Goals\nadd numbers"
+
+    async def generate_code(prd):
+        calls.append("code")
+        return json.dumps({"util.py": "def add(a, b):\n    return a - b\n"})
+
+    async def test_code(input):
+        calls.append("test")
+        return "### util.py\nadd subtracts" if "a - b" in input else SUCCESS_SIGNAL
+
+    async def fix_code(input):
+        calls.append("fix")
+        return json.dumps({"util.py": fake.fixed})
+
+    monkeypatch.setattr(tester, "SANDBOX_ENABLED", False)
+    monkeypatch.setattr(orchestrator, "STEPS", {
+        "plan": (generate_plan, "planner_agent"),
+        "code": (generate_code, "coder_agent"),
+        "test": (test_code, "tester_agent"),
+        "fix": (fix_code, "fixer_agent"),
+    })
+    return fake
+
+
+def run(*messages, max_fixes=3):
+    router = Router(name="root_agent")
+    agent = SdlcOrchestrator(name="sdlc_orchestrator", router=router, sub_agents=[router], max_fixes=max_fixes)
+    service = InMemorySessionService()
+    runner = Runner(app_name=APP, agent=agent, session_service=service)
+
+    async def scenario():
+        session = await service.create_session(app_name=APP, user_id="u", session_id="s")
+        replies = []
+        for message in messages:
+            events = [event async for event in runner.run_async(
+                user_id="u", session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=message)]))]
+            replies.append(events)
+        return replies, await service.get_session(app_name=APP, user_id="u", session_id=session.id)
+
+    return asyncio.run(scenario())
+
+
+def test_a_task_runs_plan_code_test_fix_test_without_routing(tools):
+    (events,), session = run("add two numbers")
+    assert tools.calls == ["plan", "code", "test", "fix", "test"]
+    assert [e.author for e in events] == ["planner_agent", "coder_agent", "tester_agent", "fixer_agent",
+                                          "tester_agent", "sdlc_orchestrator"]
+    assert events[-1].content.parts[0].text.startswith("All tests passed after 1 fix round(s)")
+    assert SUCCESS_SIGNAL in load_text(session.state, "test")
+    assert json.loads(load_text(session.state, "code")) == {"util.py": tools.fixed}
+    assert session.state["fix_count"] == 1
+
+
+def test_the_fix_loop_stops_after_max_fixes(tools):
+    tools.fixed = "def add(a, b):\n    return a - b  # still wrong\n"
+    (events,), session = run("add two numbers", max_fixes=2)
+    # The second fix changed nothing, so its test round reuses the last report
+    assert tools.calls == ["plan", "code", "test", "fix", "test", "fix"]
+    assert [e.author for e in events][-3:] == ["fixer_agent", "tester_agent", "sdlc_orchestrator"]
+    assert events[-1].content.parts[0].text.startswith("Tests still report issues after 2 fix rounds")
+
+
+def test_follow_ups_on_existing_code_go_to_the_router(tools):
+    (first, follow_up), _ = run("add two numbers", "retest")
+    assert tools.calls == ["plan", "code", "test", "fix", "test"]
+    assert [(e.author, e.content.parts[0].text) for e in follow_up] == [("root_agent", "routed")]
+
+
+def test_a_failed_step_ends_the_run_with_a_message(tools, monkeypatch):
+    async def generate_code(prd):
+        raise TimeoutError("provider timed out")
+
+    monkeypatch.setitem(orchestrator.STEPS, "code", (generate_code, "coder_agent"))
+    (events,), session = run("add two numbers")
+    assert [e.author for e in events] == ["planner_agent", "coder_agent", "sdlc_orchestrator"]
+    assert events[-1].content.parts[0].text == "The code step failed (TimeoutError). Please try again."
+    assert not session.state.get("code")
@@ -0,0 +1,21 @@
+import asyncio
+
+from sdlc_cycle import planner
+
+
+def test_generate_plan_ignores_a_semantic_hit_without_a_plan(monkeypatch):
+    class Cache:
+        def lookup(self, input):
+            return {"code": '{"main.py": "x = 1"}', "similarity": 0.9}
+
+        def update(self, input, **fields):
+            self.stored = fields
+
+    async def complete_routed(stage, prompt, accept=None):
+        return "## Goals\n## Key Features\n## Technical Requirements"
+
+    cache = Cache()
+    monkeypatch.setattr(planner, "semantic_cache", cache)
+    monkeypatch.setattr(planner, "complete_routed", complete_routed)
+    prd = asyncio.run(planner.generate_plan("sort a list"))
+    assert prd.startswith("## Goals") and cache.stored == {"plan": prd}
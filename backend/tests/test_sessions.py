@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+import sqlite3
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from sdlc_cycle.sessions import SqliteSessionService
+
+APP = "sdlc_cycle"
+
+
+def stored_events(db_path):
+    with sqlite3.connect(db_path) as db:
+        return db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def delta_event(i, **delta):
+    return Event(author="agent", invocation_id=f"i{i}", actions=EventActions(state_delta={f"k{i}": i, **delta}))
+
+
+def text_event(text):
+    return Event(author="agent", invocation_id="reply", content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def test_events_are_written_in_batches(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        service = SqliteSessionService(db_path, batch_size=4, flush_interval=60)
+        session = await service.create_session(app_name=APP, user_id="u", session_id="s")
+        for i in range(3):
+            await service.append_event(session, delta_event(i))
+        # State-only events do not end a turn, so nothing is written yet
+        assert stored_events(db_path) == 0
+        await service.append_event(session, delta_event(3))
+        assert stored_events(db_path) == 4
+        await service.append_event(session, delta_event(4))
+        await service.append_event(session, text_event("All tests passed."))
+        # The final reply of a turn flushes the batch
+        assert stored_events(db_path) == 6
+
+    asyncio.run(scenario())
+
+
+def test_pending_events_are_flushed_by_timer(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        service = SqliteSessionService(db_path, batch_size=100, flush_interval=0.1)
+        session = await service.create_session(app_name=APP, user_id="u", session_id="s")
+        await service.append_event(session, delta_event(0))
+        assert stored_events(db_path) == 0
+        # No further event arrives; the timer writes the batch
+        await asyncio.sleep(0.3)
+        assert stored_events(db_path) == 1
+
+    asyncio.run(scenario())
+
+
+def test_reads_see_pending_events(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        service = SqliteSessionService(db_path, batch_size=100, flush_interval=60)
+        session = await service.create_session(app_name=APP, user_id="u", session_id="s")
+        await service.append_event(session, delta_event(0, **{"user:name": "ada", "temp:scratch": 1}))
+        loaded = await service.get_session(app_name=APP, user_id="u", session_id="s")
+        assert len(loaded.events) == 1
+        assert loaded.state["k0"] == 0 and loaded.state["user:name"] == "ada"
+        assert "temp:scratch" not in loaded.state
+        assert await service.get_user_state(app_name=APP, user_id="u") == {"name": "ada"}
+
+    asyncio.run(scenario())
+
+
+def test_workers_sharing_a_session_keep_each_others_keys(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        workers = [SqliteSessionService(db_path, batch_size=3, flush_interval=60) for _ in range(3)]
+        await workers[0].create_session(app_name=APP, user_id="u", session_id="shared")
+        sessions = [await w.get_session(app_name=APP, user_id="u", session_id="shared") for w in workers]
+
+        async def write(n, worker, session):
+            for i in range(10):
+                await worker.append_event(session, delta_event(n * 100 + i))
+                await asyncio.sleep(0)
+            await worker.flush()
+
+        await asyncio.gather(*[write(n, w, s) for n, (w, s) in enumerate(zip(workers, sessions))])
+        loaded = await workers[0].get_session(app_name=APP, user_id="u", session_id="shared")
+        assert {f"k{n * 100 + i}" for n in range(3) for i in range(10)} <= set(loaded.state)
+        assert len(loaded.events) == 30
+
+    asyncio.run(scenario())
+
+
+def test_deleting_a_session_drops_its_pending_batch(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+
+    async def scenario():
+        service = SqliteSessionService(db_path, batch_size=100, flush_interval=0.05)
+        session = await service.create_session(app_name=APP, user_id="u", session_id="s")
+        await service.append_event(session, delta_event(0))
+        await service.delete_session(app_name=APP, user_id="u", session_id="s")
+        await asyncio.sleep(0.15)
+        assert stored_events(db_path) == 0
+        assert await service.get_session(app_name=APP, user_id="u", session_id="s") is None
+
+    asyncio.run(scenario())
+
+
+def _worker(db_path, worker, events):
+    async def work():
+        service = SqliteSessionService(db_path, batch_size=4, flush_interval=0.05)
+        shared = await service.get_session(app_name=APP, user_id="u", session_id="shared")
+        for i in range(events):
+            await service.append_event(shared, delta_event(worker * 1000 + i, **{f"user:last{worker}": i}))
+        # No explicit flush: the tail of the last batch is left to the timer
+        await asyncio.sleep(0.3)
+
+    asyncio.run(work())
+
+
+def test_worker_processes_sharing_a_session_keep_every_key_and_event(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    workers, events = 4, 30
+    asyncio.run(SqliteSessionService(db_path).create_session(app_name=APP, user_id="u", session_id="shared"))
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker, args=(db_path, w, events)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert [process.exitcode for process in processes] == [0] * workers
+
+    async def load():
+        return await SqliteSessionService(db_path).get_session(app_name=APP, user_id="u", session_id="shared")
+
+    shared = asyncio.run(load())
+    assert len(shared.events) == workers * events
+    assert {f"k{w * 1000 + i}" for w in range(workers) for i in range(events)} <= set(shared.state)
+    assert all(shared.state[f"user:last{w}"] == events - 1 for w in range(workers))
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+from sdlc_cycle import tester
+from sdlc_cycle.artifacts import load_filemap, load_text
+from sdlc_cycle.callbacks import _Session, _ToolContext, after_tool_callback, before_tool_callback
+from sdlc_cycle.coder import generate_code
+from sdlc_cycle.fixer import fix_code
+from sdlc_cycle.workspace import FileMap, SUCCESS_SIGNAL
+
+FILES = {
+    "main.py": "from util import add\n\nprint(add(1, 2))\n",
+    "util.py": "def add(a, b):\n    return a - b\n",
+    "other.py": "x = 1\n",
+}
+
+
+def test_apply_versions_only_real_changes():
+    fmap = FileMap(FILES)
+    assert fmap.version == 1
+    assert fmap.apply({"other.py": "x = 1\n"}) == [] and fmap.version == 1
+    assert fmap.apply({"util.py": "def add(a, b):\n    return a + b\n", "other.py": None}) \
+        == ["util.py", "other.py"]
+    assert fmap.version == 2 and set(fmap.files) == {"main.py", "util.py"}
+    assert fmap.changed_in == {"main.py": 1, "util.py": 2}
+
+
+def test_a_patch_dirties_the_changed_file_and_its_importers():
+    fmap = FileMap(FILES)
+    assert fmap.imports("main.py") == {"util.py"}
+    fmap.record_review(list(FILES), "### util.py\nadd subtracts")
+    assert fmap.dirty() == []
+    fmap.apply({"util.py": "def add(a, b):\n    return a + b\n"})
+    assert fmap.dirty() == ["main.py", "util.py"]
+
+
+def test_findings_of_unchanged_files_are_reused():
+    fmap = FileMap(FILES)
+    fmap.record_review(list(FILES), "### util.py\nadd subtracts\n\n### other.py\nunused x")
+    fmap.apply({"util.py": "def add(a, b):\n    return a + b\n"})
+    fmap.record_review(["main.py", "util.py"], SUCCESS_SIGNAL)
+    assert fmap.report() == "### other.py\nunused x"
+    fmap.apply({"other.py": None})
+    assert fmap.report() == SUCCESS_SIGNAL
+
+
+def test_round_trip_through_a_dict():
+    fmap = FileMap(FILES)
+    fmap.record_review(["util.py"], "### util.py\nadd subtracts")
+    restored = FileMap.from_dict(json.loads(json.dumps(fmap.to_dict())))
+    assert restored.to_dict() == fmap.to_dict()
+    assert restored.dirty() == fmap.dirty()
+
+
+def test_the_fix_test_loop_re_reviews_only_changed_files(monkeypatch):
+    reviewed = []
+
+    async def review(input):
+        files = json.loads(input)
+        reviewed.append(sorted(files))
+        return "### util.py\nadd subtracts" if "a - b" in files.get("util.py", "") else SUCCESS_SIGNAL
+
+    monkeypatch.setattr(tester, "review", review)
+    monkeypatch.setattr(tester, "SANDBOX_ENABLED", False)
+    context = _ToolContext(_Session("s1", {}))
+
+    def test_round():
+        args = {"input": ""}
+        result = before_tool_callback(tester.test_code, args, context)
+        if result is None:
+            result = asyncio.run(tester.test_code(**args))
+        else:
+            result = result["result"]
+        after_tool_callback(context, tester.test_code, args, result)
+        return load_text(context.session, "test")
+
+    after_tool_callback(context, generate_code, {}, json.dumps(FILES))
+    assert test_round() == "### util.py\nadd subtracts"
+    assert reviewed == [["main.py", "other.py", "util.py"]]
+
+    args = {"input": ""}
+    assert before_tool_callback(fix_code, args, context) is None
+    # The fixer returns only the file it changed
+    after_tool_callback(context, fix_code, args, json.dumps({"util.py": "def add(a, b):\n    return a + b\n"}))
+    assert json.loads(load_text(context.session, "code")) == {**FILES, "util.py": "def add(a, b):\n    return a + b\n"}
+    assert load_filemap(context.session).version == 2
+
+    assert test_round() == SUCCESS_SIGNAL
+    # other.py neither changed nor imports util.py, so it is not reviewed again
+    assert reviewed[1:] == [["main.py", "util.py"]]
+    # Nothing changed since: the report is served without a review
+    assert test_round() == SUCCESS_SIGNAL and len(reviewed) == 2
@@ -0,0 +1,7 @@
+"""Model-call plumbing shared by the ``back`` API and the ``backend`` ADK app.
+
+Caching, rate limiting, fair sharing, model routing, request deadlines,
+structured output, sandboxed test runs, record/replay and tracing live here
+once; both apps import them from this package. Install it next to either app
+with ``pip install -e ../common``.
+"""
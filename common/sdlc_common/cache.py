@@ -0,0 +1,180 @@
+"""Content-addressed cache for model responses.
+
+Responses are keyed on a hash of the model name, the rendered prompt and the
+sampling parameters. Entries live in an in-memory LRU with a TTL and can
+optionally be persisted to a SQLite file so they survive restarts. Writes to
+the file are handed to a background thread, which commits them in batches
+and deletes expired rows every ``expire_interval`` seconds, so ``set`` never
+blocks the event loop on disk I/O; ``aget`` does the same for reads that
+miss the in-memory tier.
+"""
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from contextvars import ContextVar
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Set to True for the duration of a request to skip the cache entirely
+bypass_cache: ContextVar[bool] = ContextVar("bypass_cache", default=False)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: Optional[str] = None,
+                 expire_interval: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serialises reads on the shared connection; writes have their own
+        self._read_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        self._writes: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_behind, args=(db_path,),
+                                            name="response-cache-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    @staticmethod
+    def make_key(model: str, prompt: str, **params: Any) -> str:
+        """Hash the model name, prompt and sampling parameters."""
+        payload = json.dumps([model, prompt, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key``; reads the file on a memory miss (use ``aget`` on a loop)."""
+        now = time.time()
+        value = self._recall(key, now)
+        if value is None:
+            value = self._admit(key, self._load(key, now) if self._db is not None else None)
+        return value
+
+    async def aget(self, key: str) -> Optional[str]:
+        """``get`` for the event loop: a memory miss reads the file in a worker thread."""
+        now = time.time()
+        value = self._recall(key, now)
+        if value is None:
+            row = await asyncio.to_thread(self._load, key, now) if self._db is not None else None
+            value = self._admit(key, row)
+        return value
+
+    def _recall(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if now - created < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.evictions += 1
+            return None
+
+    def _load(self, key: str, now: float) -> Optional[tuple]:
+        with self._read_lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        return row if row is not None and now - row[1] < self.ttl else None
+
+    def _admit(self, key: str, row: Optional[tuple]) -> Optional[str]:
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            if key not in self._entries:
+                # A set() since the read is newer than the row
+                self._put(key, row[0], row[1])
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        created = time.time()
+        with self._lock:
+            self._put(key, value, created)
+        if self._writer is not None:
+            self._writes.put((key, value, created))
+
+    def flush(self) -> None:
+        """Block until every ``set`` so far is committed to the file."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def close(self) -> None:
+        """Commit pending writes and stop the writer thread."""
+        if self._writer is not None and self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+
+    def _write_behind(self, db_path: str) -> None:
+        db = sqlite3.connect(db_path)
+        expired_at = time.time()
+        running = True
+        while running:
+            try:
+                rows = [self._writes.get(timeout=self.expire_interval)]
+            except queue.Empty:
+                rows = []
+            while True:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in rows
+            now = time.time()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    [row for row in rows if row is not None]
+                )
+                if now - expired_at >= self.expire_interval or not running:
+                    db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                    expired_at = now
+            for _ in rows:
+                self._writes.task_done()
+        db.close()
+
+    def _put(self, key: str, value: str, created: float) -> None:
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk": self._db is not None,
+            "pending_writes": self._writes.qsize()
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    db_path=os.getenv("RESPONSE_CACHE_DB") or None,
+    expire_interval=float(os.getenv("RESPONSE_CACHE_EXPIRE_INTERVAL", "60"))
+)
@@ -0,0 +1,46 @@
+"""Per-request deadlines for pipeline runs.
+
+The deadline lives in a context variable, so it follows the request into
+every agent and model call started from it, including tasks created on its
+behalf. Model calls cap their timeout at the time left, and the pipeline
+uses the time left to decide whether optional work is still worth starting.
+"""
+from typing import Optional
+from contextvars import ContextVar
+import time
+
+# Monotonic time by which the current request must finish, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before its work finished."""
+
+
+def set_deadline(seconds: Optional[float]):
+    """Give the current context ``seconds`` to finish; None or 0 clears it."""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check() -> None:
+    """Raise DeadlineExceeded when the deadline has passed."""
+    if expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def bounded(timeout: float) -> float:
+    """``timeout`` capped at the time left; raises if none is left."""
+    check()
+    left = remaining()
+    return timeout if left is None else min(timeout, left)
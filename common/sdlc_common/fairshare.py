@@ -0,0 +1,246 @@
+"""Weighted fair sharing of model calls between tenants.
+
+Every model call is admitted through a per-tenant queue before it reaches
+the provider rate limiter. Admission uses weighted fair queuing: a call is
+tagged with its tenant's virtual finish time, which advances by the call's
+estimated tokens divided by the tenant's weight, and the earliest tag among
+the tenants that may run goes next. A tenant with a burst of calls
+therefore only delays others by its share, not by its backlog.
+
+FAIR_SHARE_SLOTS bounds the calls admitted at once; set it to what the
+providers can serve concurrently, or calls queue again further down in
+arrival order. TENANTS (inline JSON or the path of a JSON file) sets the
+weight, concurrency and tokens-per-minute quota of named tenants; the
+"default" entry applies to all others, each of which still gets its own
+queue. The tenant of a call is taken from the ``tenant`` context variable;
+``load_api_keys`` maps the API keys requests authenticate with to tenants.
+Tenants without queued or running calls are dropped after
+FAIR_SHARE_IDLE seconds, and only tenants with queued calls are scanned
+on admission.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+from collections import deque
+from contextvars import ContextVar
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from .ratelimit import TokenBucket
+from .tracing import current_span
+
+FAIR_SHARE = os.getenv("FAIR_SHARE", "1") == "1"
+# Model calls admitted at once, across all tenants
+FAIR_SHARE_SLOTS = int(os.getenv("FAIR_SHARE_SLOTS", "16"))
+# Number of recent queue waits per tenant kept for the percentiles
+FAIR_SHARE_WINDOW = int(os.getenv("FAIR_SHARE_WINDOW", "1000"))
+# Seconds after which a tenant with nothing queued or running is forgotten
+FAIR_SHARE_IDLE = float(os.getenv("FAIR_SHARE_IDLE", "600"))
+
+DEFAULT_TENANT = "anonymous"
+# weight: share of the slots under contention; concurrency: calls running at
+# once (0 = no limit); tpm: tokens per minute (0 = no limit)
+DEFAULT_QUOTA = {"weight": 1.0, "concurrency": 0, "tpm": 0}
+
+# Tenant the model calls made in this context are charged to
+tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def _load_json(value: str) -> Dict[str, Any]:
+    if not value:
+        return {}
+    if value.lstrip().startswith("{"):
+        return json.loads(value)
+    with open(value, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_tenants(value: str) -> Dict[str, Dict[str, float]]:
+    """Tenant -> quota from ``value`` (JSON or a JSON file path), over DEFAULT_QUOTA."""
+    return {name: {**DEFAULT_QUOTA, **quota} for name, quota in _load_json(value).items()}
+
+
+def key_digest(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def load_api_keys(value: str) -> Dict[str, str]:
+    """SHA-256 of each API key -> its tenant, from ``value`` (JSON or a JSON file path)."""
+    return {key_digest(key): name for key, name in _load_json(value).items()}
+
+
+class _Waiter:
+    __slots__ = ("tag", "tokens", "future", "enqueued")
+
+    def __init__(self, tag: float, tokens: float, future: asyncio.Future):
+        self.tag = tag
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class Tenant:
+    def __init__(self, name: str, quota: Dict[str, float]):
+        self.name = name
+        self.weight = max(float(quota["weight"]), 1e-6)
+        self.concurrency = int(quota["concurrency"]) or math.inf
+        self.bucket = TokenBucket(quota["tpm"], quota.get("tpm_burst")) if quota["tpm"] else None
+        self.queue: deque = deque()
+        self.running = 0
+        self.finish = 0.0
+        self.admitted = 0
+        self.tokens_used = 0.0
+        self.wait_sum = 0.0
+        self.waits = deque(maxlen=FAIR_SHARE_WINDOW)
+        self.active = time.monotonic()
+
+    def observe(self, seconds: float) -> None:
+        self.admitted += 1
+        self.wait_sum += seconds
+        self.waits.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.waits:
+            return None
+        values = sorted(self.waits)
+        return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "concurrency": None if self.concurrency == math.inf else self.concurrency,
+            "tpm": self.bucket.limit if self.bucket is not None else None,
+            "running": self.running,
+            "queued": len(self.queue),
+            "admitted": self.admitted,
+            "tokens_used": self.tokens_used,
+            "wait_sum": self.wait_sum,
+            "wait_p50": self.percentile(50),
+            "wait_p95": self.percentile(95),
+            "wait_p99": self.percentile(99)
+        }
+
+
+class FairShare:
+    def __init__(self, slots: int, quotas: Dict[str, Dict[str, float]]):
+        self.slots = slots
+        self.quotas = quotas
+        self.running = 0
+        self._tenants: Dict[str, Tenant] = {}
+        # Tenants with queued calls, the only ones admission looks at
+        self._backlogged: Dict[str, Tenant] = {}
+        self._swept = time.monotonic()
+        # Virtual time: the tag of the call admitted last
+        self._vtime = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def tenant(self, name: str) -> Tenant:
+        if name not in self._tenants:
+            self._sweep()
+            self._tenants[name] = Tenant(name, self.quotas.get(name) or self.quotas.get("default") or DEFAULT_QUOTA)
+        t = self._tenants[name]
+        t.active = time.monotonic()
+        return t
+
+    def _sweep(self) -> None:
+        """Forget tenants idle for FAIR_SHARE_IDLE seconds, at most once per interval."""
+        now = time.monotonic()
+        if now - self._swept < FAIR_SHARE_IDLE:
+            return
+        self._swept = now
+        for name, t in list(self._tenants.items()):
+            if not t.queue and not t.running and now - t.active >= FAIR_SHARE_IDLE:
+                del self._tenants[name]
+
+    def _dispatch(self) -> None:
+        """Admit waiting calls, earliest virtual tag first, while slots and quotas allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        retry = None
+        while self.running < self.slots:
+            best = None
+            for t in list(self._backlogged.values()):
+                # Callers that gave up leave their entry behind until it reaches the head
+                while t.queue and t.queue[0].future.done():
+                    t.queue.popleft()
+                if not t.queue:
+                    del self._backlogged[t.name]
+                    continue
+                if t.running >= t.concurrency:
+                    continue
+                head = t.queue[0]
+                if t.bucket is not None:
+                    delay = t.bucket.delay(head.tokens)
+                    if delay > 0:
+                        retry = delay if retry is None else min(retry, delay)
+                        continue
+                if best is None or head.tag < best.queue[0].tag:
+                    best = t
+            if best is None:
+                break
+            waiter = best.queue.popleft()
+            if not best.queue:
+                del self._backlogged[best.name]
+            best.running += 1
+            self.running += 1
+            self._vtime = max(self._vtime, waiter.tag)
+            if best.bucket is not None:
+                best.bucket.consume(waiter.tokens)
+            waiter.future.set_result(None)
+        if retry is not None:
+            self._timer = asyncio.get_running_loop().call_later(retry, self._dispatch)
+
+    def _release(self, t: Tenant) -> None:
+        t.running -= 1
+        t.active = time.monotonic()
+        self.running -= 1
+        self._dispatch()
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: float) -> Any:
+        """Run ``call`` once the current tenant's turn comes, charging it ``tokens``."""
+        if not FAIR_SHARE:
+            return await call()
+        t = self.tenant(tenant.get())
+        tag = max(self._vtime, t.finish)
+        t.finish = tag + tokens / t.weight
+        waiter = _Waiter(tag, tokens, asyncio.get_running_loop().create_future())
+        t.queue.append(waiter)
+        self._backlogged[t.name] = t
+        self._dispatch()
+        try:
+            await waiter.future
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller left
+                self._release(t)
+            elif waiter in t.queue:
+                t.queue.remove(waiter)
+            raise
+        waited = time.perf_counter() - waiter.enqueued
+        t.observe(waited)
+        current_span().add("fair_share_wait_s", waited)
+        try:
+            return await call()
+        finally:
+            self._release(t)
+
+    def record_usage(self, estimated: float, actual: float) -> None:
+        """Charge the current tenant its real usage once it is known."""
+        if not FAIR_SHARE:
+            return
+        t = self.tenant(tenant.get())
+        t.tokens_used += actual or estimated
+        if t.bucket is not None and actual:
+            t.bucket.consume(actual - estimated)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "running": self.running,
+            "tenants": {name: t.snapshot() for name, t in self._tenants.items()}
+        }
+
+
+fair_share = FairShare(FAIR_SHARE_SLOTS, load_tenants(os.getenv("TENANTS", "")))
@@ -0,0 +1,27 @@
+"""Asyncio primitives created per running event loop.
+
+A semaphore or lock created at import time belongs to the loop that is
+current then (Python 3.9) or to the first loop that waits on it (3.10+), and
+fails under any other loop: a second ``asyncio.run``, a test, a worker
+thread with its own loop. ``per_loop`` creates one per running loop on first
+use instead.
+"""
+from typing import Callable, TypeVar
+import asyncio
+import weakref
+
+T = TypeVar("T")
+
+
+def per_loop(factory: Callable[[], T]) -> Callable[[], T]:
+    """Getter for the ``factory()`` object of the running loop, made on first use."""
+    made: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+
+    def get() -> T:
+        loop = asyncio.get_running_loop()
+        value = made.get(loop)
+        if value is None:
+            value = made[loop] = factory()
+        return value
+
+    return get
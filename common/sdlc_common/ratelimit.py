@@ -0,0 +1,230 @@
+"""Central scheduler for provider model calls.
+
+Every model call acquires capacity from per-provider/per-model token buckets
+(requests/min and tokens/min) before it is sent. Waiting calls are served by
+priority lane, so an in-progress fix loop goes ahead of new planning work.
+Rate-limit errors are retried with exponential backoff and jitter, honouring
+the provider's retry-after hint, and temporarily lower the bucket rate.
+
+No limits apply unless configured: RATE_LIMITS sets them per provider or
+model, and RATE_LIMIT_PRESET=free starts from the providers' free tiers.
+A bucket holds at most ``burst`` units (default: RATE_LIMIT_BURST_SECONDS
+of its rate), so a full minute's quota is not sent at once.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import re
+import time
+from .tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Lower number = served first
+PRIORITY = {"fix": 0, "test": 1, "code": 2, "plan": 3}
+DEFAULT_PRIORITY = 2
+
+# Requests/min and tokens/min per provider or per "provider/model", plus
+# optional "rpm_burst"/"tpm_burst": the most sent at once after an idle spell
+PRESETS = {
+    "free": {
+        "gemini": {"rpm": 15, "tpm": 1000000},
+        "groq": {"rpm": 30, "tpm": 6000},
+    },
+}
+RATE_LIMITS = {**PRESETS.get(os.getenv("RATE_LIMIT_PRESET", ""), {}), **json.loads(os.getenv("RATE_LIMITS", "{}"))}
+# Default bucket size, in seconds of the configured rate
+BURST_SECONDS = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "1"))
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF", "1.0"))
+BACKOFF_CAP = float(os.getenv("RATE_LIMIT_BACKOFF_CAP", "60"))
+# Tokens assumed for a completion when only the prompt size is known
+EXPECTED_OUTPUT_TOKENS = 1000
+
+
+class RateLimited(Exception):
+    """Raised when a call is still rate limited after all retries."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.limit = per_minute
+        self.rate = per_minute / 60.0
+        # Whole units: a bucket always admits at least one request
+        self.capacity = burst or max(1.0, math.ceil(self.rate * BURST_SECONDS))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` can be consumed."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def throttle(self, factor: float) -> None:
+        """Scale the refill rate, never above the configured limit."""
+        self.rate = max(self.limit / 600.0, min(self.limit / 60.0, self.rate * factor))
+
+
+class Limiter:
+    def __init__(self, limits: Dict[str, float]):
+        self.requests = TokenBucket(limits["rpm"], limits.get("rpm_burst"))
+        self.tokens = TokenBucket(limits["tpm"], limits.get("tpm_burst"))
+        self.blocked_until = 0.0
+        self.waiting: List[Tuple[int, int]] = []
+        self.changed = asyncio.Event()
+
+    def delay(self, tokens: float) -> float:
+        return max(
+            self.blocked_until - time.monotonic(),
+            self.requests.delay(1),
+            self.tokens.delay(tokens)
+        )
+
+
+def rate_limit_info(error: Exception) -> Tuple[bool, Optional[float]]:
+    """Whether ``error`` is a provider rate-limit error, and its retry-after hint."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    text = str(error)
+    limited = (
+        status == 429
+        or "RateLimit" in type(error).__name__
+        or "RESOURCE_EXHAUSTED" in text
+        or re.search(r"\b429\b", text) is not None
+    )
+    if not limited:
+        return False, None
+    retry_after = getattr(error, "retry_after", None)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    if retry_after is None and headers.get("retry-after"):
+        try:
+            retry_after = float(headers["retry-after"])
+        except ValueError:
+            retry_after = None
+    if retry_after is None:
+        match = re.search(r"retry(?:Delay| in| after)[\"':\s]*([\d.]+)\s*s", text, re.I)
+        retry_after = float(match.group(1)) if match else None
+    return True, retry_after
+
+
+class Scheduler:
+    def __init__(self, limits: Dict[str, Dict[str, float]]):
+        self.limits = limits
+        self._limiters: Dict[str, Limiter] = {}
+        self._seq = itertools.count()
+        self.retries = 0
+        self.rate_limited = 0
+
+    def limiter(self, model: str) -> Optional[Limiter]:
+        provider = model.split("/", 1)[0] if "/" in model else "gemini"
+        key = model if model in self.limits else provider
+        if key not in self.limits:
+            return None
+        if key not in self._limiters:
+            self._limiters[key] = Limiter(self.limits[key])
+        return self._limiters[key]
+
+    async def acquire(self, model: str, tokens: float, priority: int = DEFAULT_PRIORITY) -> None:
+        """Wait until ``model`` has capacity for one request of ``tokens`` tokens."""
+        limiter = self.limiter(model)
+        if limiter is None:
+            return
+        entry = (priority, next(self._seq))
+        heapq.heappush(limiter.waiting, entry)
+        try:
+            while True:
+                delay = None
+                if limiter.waiting[0] == entry:
+                    delay = limiter.delay(tokens)
+                    if delay <= 0:
+                        limiter.requests.consume(1)
+                        limiter.tokens.consume(tokens)
+                        return
+                limiter.changed.clear()
+                try:
+                    await asyncio.wait_for(limiter.changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            limiter.waiting.remove(entry)
+            heapq.heapify(limiter.waiting)
+            limiter.changed.set()
+
+    def record_usage(self, model: str, estimated: float, actual: float) -> None:
+        """Correct the token bucket once the real usage is known."""
+        limiter = self.limiter(model)
+        if limiter is not None and actual:
+            limiter.tokens.consume(actual - estimated)
+
+    async def run(self, model: str, call: Callable[[], Awaitable[Any]], tokens: float,
+                  priority: int = DEFAULT_PRIORITY) -> Any:
+        """Run ``call`` under the limits for ``model``, retrying rate-limit errors."""
+        attempt = 0
+        trace = current_span()
+        while True:
+            waited = time.perf_counter()
+            await self.acquire(model, tokens, priority)
+            trace.add("rate_limit_wait_s", time.perf_counter() - waited)
+            try:
+                result = await call()
+            except Exception as e:
+                limited, retry_after = rate_limit_info(e)
+                if not limited:
+                    raise
+                self.rate_limited += 1
+                limiter = self.limiter(model)
+                if attempt >= MAX_RETRIES:
+                    raise RateLimited(f"Rate limited by provider for {model}: {str(e)}", retry_after) from e
+                backoff = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                wait = max(backoff, retry_after or 0)
+                if limiter is not None:
+                    limiter.blocked_until = max(limiter.blocked_until, time.monotonic() + wait)
+                    limiter.requests.throttle(0.5)
+                    limiter.tokens.throttle(0.5)
+                logger.warning(f"Rate limited on {model}, retrying in {wait:.1f}s (attempt {attempt + 1})")
+                if limiter is None:
+                    # No limiter holds the next acquire back, so wait here
+                    await asyncio.sleep(wait)
+                attempt += 1
+                self.retries += 1
+                trace.add("retries", 1)
+                continue
+            limiter = self.limiter(model)
+            if limiter is not None:
+                # Recover gradually towards the configured rate
+                limiter.requests.throttle(1.1)
+                limiter.tokens.throttle(1.1)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "waiting": {key: len(limiter.waiting) for key, limiter in self._limiters.items()}
+        }
+
+
+def estimate_tokens(prompt: str) -> int:
+    return len(prompt) // 4 + EXPECTED_OUTPUT_TOKENS
+
+
+scheduler = Scheduler(RATE_LIMITS)
@@ -0,0 +1,178 @@
+"""Record/replay backend for model calls.
+
+In record mode every model response is appended to a JSONL fixture file,
+together with its latency and token usage. In replay mode responses are
+served from that file offline, sleeping for the recorded latency scaled by
+``LLM_REPLAY_SPEED`` (1 = original timing, 0 = instant). Responses are keyed
+on the model name and the exact prompt. Repeated keys replay in recorded order.
+
+Two adapters are provided: ``RecordingModel``/``ReplayModel`` for the
+``BaseAgent.model`` client interface, and ``recording_completion``/
+``replay_completion`` for litellm's ``acompletion``.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+# "record", "replay" or empty to call the provider normally
+LLM_REPLAY = os.getenv("LLM_REPLAY", "")
+LLM_FIXTURES = os.getenv("LLM_FIXTURES", "fixtures/llm.jsonl")
+LLM_REPLAY_SPEED = float(os.getenv("LLM_REPLAY_SPEED", "1.0"))
+
+
+class MissingFixture(KeyError):
+    """Raised in replay mode for a prompt that was never recorded."""
+
+
+def fixture_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(json.dumps([model, prompt]).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class Fixtures:
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, model: str, prompt: str, response: str, latency: float,
+               usage: Optional[Dict[str, int]] = None) -> None:
+        entry = {
+            "key": fixture_key(model, prompt),
+            "model": model,
+            "prompt_preview": prompt[:200],
+            "response": response,
+            "latency": round(latency, 4),
+            "usage": usage or {
+                "prompt_tokens": estimate_tokens(prompt),
+                "completion_tokens": estimate_tokens(response)
+            }
+        }
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def lookup(self, model: str, prompt: str) -> Dict[str, Any]:
+        key = fixture_key(model, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise MissingFixture(f"No recorded response for {model}: {prompt[:80]!r}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[served % len(entries)]
+
+
+class RecordingModel:
+    """Wraps a model client, blocking or async, and records every response."""
+
+    def __init__(self, inner: Any, fixtures: Fixtures, model_name: str):
+        self.inner = inner
+        self.fixtures = fixtures
+        self.model_name = model_name
+        if hasattr(inner, "generate_text_async"):
+            self.generate_text_async = self._generate_text_async
+
+    async def _generate_text_async(self, prompt: str) -> str:
+        started = time.perf_counter()
+        text = await self.inner.generate_text_async(prompt)
+        self.fixtures.record(self.model_name, prompt, text, time.perf_counter() - started)
+        return text
+
+    def generate_text(self, prompt: str) -> Any:
+        started = time.perf_counter()
+        response = self.inner.generate_text(prompt)
+        text = response if isinstance(response, str) else getattr(response, "text", response)
+        text = text() if callable(text) else text
+        self.fixtures.record(self.model_name, prompt, str(text), time.perf_counter() - started)
+        return response
+
+
+class ReplayModel:
+    """Serves recorded responses with the recorded, scaled latency."""
+
+    def __init__(self, fixtures: Fixtures, model_name: str, speed: float = 1.0):
+        self.fixtures = fixtures
+        self.model_name = model_name
+        self.speed = speed
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def generate_text_async(self, prompt: str) -> str:
+        entry = self.fixtures.lookup(self.model_name, prompt)
+        self.calls += 1
+        self.prompt_tokens += entry["usage"]["prompt_tokens"]
+        self.completion_tokens += entry["usage"]["completion_tokens"]
+        if self.speed:
+            await asyncio.sleep(entry["latency"] * self.speed)
+        return entry["response"]
+
+
+def _text(content: Any) -> str:
+    # Content is a string or a list of parts (e.g. a cache-marked prefix)
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return str(content or "")
+
+
+def _prompt(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(_text(message.get("content")) for message in messages)
+
+
+def recording_completion(acompletion: Callable, fixtures: Fixtures) -> Callable:
+    """Wrap litellm's ``acompletion`` so responses are recorded."""
+    async def completion(model: str, messages: List[Dict[str, Any]], **params):
+        started = time.perf_counter()
+        response = await acompletion(model=model, messages=messages, **params)
+        usage = response.get("usage") or {}
+        fixtures.record(
+            model, _prompt(messages), response["choices"][0]["message"]["content"],
+            time.perf_counter() - started,
+            {"prompt_tokens": usage.get("prompt_tokens", 0),
+             "completion_tokens": usage.get("completion_tokens", 0)} if usage else None
+        )
+        return response
+    return completion
+
+
+def replay_completion(fixtures: Fixtures, speed: float = 1.0) -> Callable:
+    """An offline stand-in for litellm's ``acompletion``."""
+    async def completion(model: str, messages: List[Dict[str, Any]], **params):
+        entry = fixtures.lookup(model, _prompt(messages))
+        if speed:
+            await asyncio.sleep(entry["latency"] * speed)
+        usage = dict(entry["usage"])
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return {"choices": [{"message": {"role": "assistant", "content": entry["response"]}}], "usage": usage}
+    return completion
+
+
+_fixtures: Optional[Fixtures] = None
+
+
+def fixtures() -> Fixtures:
+    """The process-wide fixture file named by LLM_FIXTURES."""
+    global _fixtures
+    if _fixtures is None:
+        _fixtures = Fixtures(LLM_FIXTURES)
+    return _fixtures
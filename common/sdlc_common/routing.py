@@ -0,0 +1,176 @@
+"""Cheap-first model routing per pipeline stage.
+
+Each stage ("plan", "code", "test", "fix") has a list of model tiers,
+cheapest first. A call starts at the first tier and moves to the next one
+only when the tier fails: the model call raises a provider error, or the
+caller's check rejects the output (unparseable code, code that still fails
+its tests). A call that ran out of request time or stayed rate limited is
+not escalated; a pricier tier would hit the same wall.
+The last tier's output is returned as is. The policy is configuration
+(MODEL_ROUTING, inline JSON or the path of a JSON file), so agents and
+tools name a stage rather than a model.
+
+Latency and outcome are recorded per stage and tier. A cheap tier whose
+recent success rate for a stage drops below ROUTING_MIN_SUCCESS is skipped
+for that stage, except for every ROUTING_PROBE-th call, which keeps
+measuring it so the stage can go back to it once it works again.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from collections import deque
+from contextvars import ContextVar
+import inspect
+import json
+import logging
+import os
+import time
+from .deadline import DeadlineExceeded
+from .ratelimit import RateLimited
+from .tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Skip cheap tiers that keep failing for a stage
+ROUTING_ADAPT = os.getenv("ROUTING_ADAPT", "1") == "1"
+# Success rate below which a cheap tier is skipped, once it has this many samples
+ROUTING_MIN_SUCCESS = float(os.getenv("ROUTING_MIN_SUCCESS", "0.3"))
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "20"))
+# Every n-th call of a stage still tries skipped tiers
+ROUTING_PROBE = int(os.getenv("ROUTING_PROBE", "10"))
+# Number of recent calls per stage and tier kept for the statistics
+ROUTING_WINDOW = int(os.getenv("ROUTING_WINDOW", "200"))
+
+# Tier the next routed call in this context starts at; raised after failed fix rounds
+start_tier: ContextVar[int] = ContextVar("start_tier", default=0)
+
+# Receives the model of a tier and whether it is the last one tried
+Call = Callable[[str, bool], Awaitable[str]]
+# Whether a tier's output is good enough to stop escalating
+Accept = Callable[[str], Union[bool, Awaitable[bool]]]
+
+
+def load_policy(value: str, defaults: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Stage -> model tiers from ``value`` (JSON or a JSON file path), over ``defaults``."""
+    if not value:
+        return dict(defaults)
+    if value.lstrip().startswith("{"):
+        policy = json.loads(value)
+    else:
+        with open(value, encoding="utf-8") as f:
+            policy = json.load(f)
+    # A single model name is a one-tier stage
+    return {**defaults, **{stage: [tiers] if isinstance(tiers, str) else list(tiers)
+                           for stage, tiers in policy.items()}}
+
+
+class TierStats:
+    def __init__(self):
+        self.calls = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = 0
+        self.skipped = 0
+        self.recent = deque(maxlen=ROUTING_WINDOW)
+        self.latency = deque(maxlen=ROUTING_WINDOW)
+
+    def observe(self, seconds: float, outcome: str) -> None:
+        self.calls += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self.recent.append(outcome == "accepted")
+        self.latency.append(seconds)
+
+    def success_rate(self) -> Optional[float]:
+        return sum(self.recent) / len(self.recent) if self.recent else None
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latency:
+            return None
+        values = sorted(self.latency)
+        return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "success_rate": self.success_rate(),
+            "latency_p50": self.percentile(50),
+            "latency_p95": self.percentile(95)
+        }
+
+
+class ModelRouter:
+    def __init__(self, policy: Dict[str, List[str]]):
+        self.policy = policy
+        self._stats: Dict[str, Dict[str, TierStats]] = {}
+        self._calls: Dict[str, int] = {}
+
+    def tiers(self, stage: str) -> List[str]:
+        return self.policy[stage]
+
+    def models(self) -> List[str]:
+        """Every model named by the policy."""
+        return sorted({model for tiers in self.policy.values() for model in tiers})
+
+    def _tier_stats(self, stage: str, model: str) -> TierStats:
+        return self._stats.setdefault(stage, {}).setdefault(model, TierStats())
+
+    def _failing(self, stage: str, model: str) -> bool:
+        stats = self._tier_stats(stage, model)
+        rate = stats.success_rate()
+        return len(stats.recent) >= ROUTING_MIN_SAMPLES and rate < ROUTING_MIN_SUCCESS
+
+    def route(self, stage: str, start: int = 0) -> List[str]:
+        """Tiers to try for the next call of ``stage``, in order."""
+        tiers = self.tiers(stage)
+        tiers = tiers[min(start, len(tiers) - 1):]
+        self._calls[stage] = self._calls.get(stage, 0) + 1
+        if not ROUTING_ADAPT or self._calls[stage] % ROUTING_PROBE == 0:
+            return tiers
+        # The last tier is always kept
+        chosen = [model for model in tiers[:-1] if not self._failing(stage, model)] + tiers[-1:]
+        for model in tiers[:-1]:
+            if model not in chosen:
+                self._tier_stats(stage, model).skipped += 1
+        return chosen
+
+    async def run(self, stage: str, call: Call, accept: Optional[Accept] = None,
+                  start: Optional[int] = None) -> str:
+        """Run ``call`` on the tiers of ``stage`` until one's output is accepted."""
+        models = self.route(stage, start_tier.get() if start is None else start)
+        for i, model in enumerate(models):
+            final = i == len(models) - 1
+            started = time.perf_counter()
+            try:
+                text = await call(model, final)
+            except (DeadlineExceeded, RateLimited):
+                # Cancellation is not an Exception and passes through as well
+                self._tier_stats(stage, model).observe(time.perf_counter() - started, "errors")
+                raise
+            except Exception as e:
+                self._tier_stats(stage, model).observe(time.perf_counter() - started, "errors")
+                if final:
+                    raise
+                logger.warning(f"{stage} call on {model} failed, escalating: {str(e)}")
+                continue
+            ok = True
+            if accept is not None:
+                ok = accept(text)
+                if inspect.isawaitable(ok):
+                    ok = await ok
+            self._tier_stats(stage, model).observe(time.perf_counter() - started,
+                                                   "accepted" if ok else "rejected")
+            if ok or final:
+                current_span().set(tier=model, escalations=i)
+                return text
+            logger.debug("%s output of %s rejected, escalating", stage, model)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            stage: {
+                "tiers": self.tiers(stage),
+                **{model: stats.snapshot() for model, stats in self._stats.get(stage, {}).items()}
+            }
+            for stage in self.policy
+        }
@@ -0,0 +1,287 @@
+"""Sandboxed execution of generated code.
+
+The filename -> code map is written to a scratch workspace. A subprocess
+then compiles and imports every Python module and runs any generated
+pytest files. Syntax and import errors are caught in milliseconds without
+an LLM round-trip.
+
+The subprocess runs in its own network namespace (``unshare``), so it has
+only a loopback interface whatever socket API the code uses, under
+CPU, memory and file-size rlimits and a wall-clock timeout. When the
+server runs as root, the code runs as ``SANDBOX_USER`` instead. The
+rlimits are set by a small launcher inside the child, not by a
+``preexec_fn``, which is unsafe in a threaded server. If no namespace can
+be created the code is not executed at all and reviews go on without it.
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from .loops import per_loop
+from .tracing import span
+
+try:
+    import pwd
+    import resource
+except ImportError:  # Windows: no rlimits or user switching
+    pwd = resource = None
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "20"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "10"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+SANDBOX_FILE_MB = int(os.getenv("SANDBOX_FILE_MB", "16"))
+# Seconds a single module may spend importing before it is skipped
+IMPORT_TIMEOUT = float(os.getenv("SANDBOX_IMPORT_TIMEOUT", "2"))
+# Maximum number of sandboxes running at once across all jobs
+SANDBOX_CONCURRENCY = int(os.getenv("SANDBOX_CONCURRENCY", str(os.cpu_count() or 2)))
+# "unshare": no network and, when the server runs as root, an unprivileged
+# user; "none" runs generated code unisolated (trusted local development only)
+SANDBOX_ISOLATION = os.getenv("SANDBOX_ISOLATION", "unshare")
+# Account the code runs as when the server runs as root
+SANDBOX_USER = os.getenv("SANDBOX_USER", "nobody")
+# Parent directory of the per-run scratch workspaces (default: system temp)
+SANDBOX_DIR = os.getenv("SANDBOX_DIR") or None
+# Interpreter for the sandboxed code; SANDBOX_USER must be able to run it
+SANDBOX_PYTHON = os.getenv("SANDBOX_PYTHON", sys.executable)
+
+_slots = per_loop(lambda: asyncio.Semaphore(SANDBOX_CONCURRENCY))
+# Result of probing the isolation prefix once per process
+_isolation: Optional[List[str]] = None
+_probed = False
+
+# Runs first in the sandboxed interpreter: set the rlimits, then exec the
+# real command so they hold for it and everything it spawns
+_LAUNCH = r'''
+import os, resource, sys
+for name, value in zip(("RLIMIT_CPU", "RLIMIT_AS", "RLIMIT_FSIZE"), sys.argv[1:4]):
+    resource.setrlimit(getattr(resource, name), (int(value), int(value)))
+os.execv(sys.executable, [sys.executable, *sys.argv[4:]])
+'''
+
+_CHECK = r'''
+import importlib, json, os, signal, sys, traceback
+
+class ImportTimeout(Exception):
+    pass
+
+def on_alarm(signum, frame):
+    raise ImportTimeout()
+
+signal.signal(signal.SIGALRM, on_alarm)
+root = os.getcwd()
+sys.path.insert(0, root)
+local = {name.split("/")[0].split(".")[0] for name in os.listdir(root)}
+results = []
+for path in json.loads(sys.argv[1]):
+    try:
+        with open(path) as f:
+            compile(f.read(), path, "exec")
+    except SyntaxError as e:
+        results.append({"file": path, "kind": "syntax", "line": e.lineno, "message": f"{type(e).__name__}: {e.msg}"})
+        continue
+    if os.path.basename(path).startswith("test_") or path.endswith("_test.py"):
+        continue
+    module = path[:-3].replace("/", ".")
+    if module.endswith(".__init__"):
+        module = module[:-9]
+    signal.setitimer(signal.ITIMER_REAL, float(sys.argv[2]))
+    try:
+        importlib.import_module(module)
+    except ModuleNotFoundError as e:
+        # Missing third-party packages are not bugs in the generated code
+        if (e.name or "").split(".")[0] in local:
+            results.append({"file": path, "kind": "import", "message": f"ModuleNotFoundError: {e}"})
+    except ImportError as e:
+        results.append({"file": path, "kind": "import", "message": f"ImportError: {e}"})
+    except (ImportTimeout, SystemExit, KeyboardInterrupt, EOFError):
+        pass
+    except Exception as e:
+        tb = traceback.extract_tb(e.__traceback__)
+        line = next((frame.lineno for frame in reversed(tb) if frame.filename.endswith(path)), None)
+        if isinstance(e, (NameError, AttributeError, TypeError)):
+            results.append({"file": path, "kind": "import", "line": line, "message": f"{type(e).__name__}: {e}"})
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+print(json.dumps(results))
+'''
+
+
+def _account():
+    # (uid, gid) to drop to, or None when the server is not root
+    if pwd is None or os.geteuid() != 0 or not SANDBOX_USER:
+        return None
+    entry = pwd.getpwnam(SANDBOX_USER)
+    return entry.pw_uid, entry.pw_gid
+
+
+def _prefix() -> List[str]:
+    if SANDBOX_ISOLATION == "none":
+        return []
+    account = _account()
+    if account is not None:
+        return ["unshare", "--net", "--setgid", str(account[1]), "--setuid", str(account[0]), "--"]
+    # Unprivileged servers get a user namespace to own the network namespace
+    return ["unshare", "--user", "--map-root-user", "--net", "--"]
+
+
+async def _isolation_prefix() -> Optional[List[str]]:
+    '''
+    Command prefix that isolates the sandboxed process, or None if the host
+    cannot create the namespaces (probed once).
+    '''
+    global _isolation, _probed
+    if not _probed:
+        prefix = _prefix()
+        works = not prefix or shutil.which(prefix[0]) is not None
+        if works and prefix:
+            probe = await asyncio.create_subprocess_exec(
+                *prefix, SANDBOX_PYTHON, "-c", "", stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            works = await probe.wait() == 0
+        if not works:
+            logger.warning("Cannot run %s in an isolated sandbox; generated code will not be executed",
+                           SANDBOX_PYTHON)
+        _isolation, _probed = (prefix if works else None), True
+    return _isolation
+
+
+async def _run(args: List[str], cwd: str, timeout: float, prefix: List[str]):
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "PYTHONPATH": cwd,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "HOME": cwd,
+        "TMPDIR": cwd,
+    }
+    command = [SANDBOX_PYTHON, *args]
+    if resource is not None:
+        limits = [SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB * 1024 * 1024, SANDBOX_FILE_MB * 1024 * 1024]
+        command = [SANDBOX_PYTHON, "-c", _LAUNCH, *map(str, limits), *args]
+    process = await asyncio.create_subprocess_exec(
+        *prefix, *command,
+        cwd=cwd, env=env,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        # Own process group, so a timeout kills everything the code spawned
+        start_new_session=True,
+        # Supplementary groups of a root server are not inherited
+        **({"extra_groups": []} if _account() is not None and prefix else {})
+    )
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError):
+            process.kill()
+        await process.wait()
+        return None, ""
+    return process.returncode, output.decode("utf-8", "replace")
+
+
+def _write_workspace(root: str, files: Dict[str, str]) -> List[str]:
+    written = []
+    for name, code in files.items():
+        path = os.path.normpath(name).lstrip("/\\")
+        if path.startswith(".."):
+            continue
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full) or root, exist_ok=True)
+        with open(full, "w") as f:
+            f.write(code)
+        written.append(path.replace(os.sep, "/"))
+    account = _account()
+    if account is not None and SANDBOX_ISOLATION != "none":
+        # The unprivileged user owns its scratch workspace and nothing else
+        for directory, _, names in os.walk(root):
+            os.chown(directory, *account)
+            for name in names:
+                os.chown(os.path.join(directory, name), *account)
+    return written
+
+
+async def execute(files: Dict[str, str]) -> Dict[str, Any]:
+    '''
+    Runs syntax/import checks and generated pytest files for ``files``.
+    Returns {"status": "passed"|"failed"|"skipped", "failures": [...],
+    "tests_run": bool}; "skipped" means the code could not be isolated and
+    was not run.
+    '''
+    with span("sandbox.execute", files=len(files)) as trace:
+        result = await _execute(files)
+        trace.set(status=result["status"], failures=len(result["failures"]), tests_run=result["tests_run"])
+        return result
+
+
+async def _execute(files: Dict[str, str]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    failures: List[Dict[str, Any]] = []
+    tests_run = False
+    prefix = await _isolation_prefix()
+    if prefix is None:
+        return {"status": "skipped", "failures": [], "tests_run": False,
+                "duration": round(time.perf_counter() - started, 3)}
+    async with _slots():
+        with tempfile.TemporaryDirectory(prefix="sdlc-sandbox-", dir=SANDBOX_DIR) as root:
+            paths = _write_workspace(root, files)
+            python = [p for p in paths if p.endswith(".py")]
+            if python:
+                code, output = await _run(["-c", _CHECK, json.dumps(python), str(IMPORT_TIMEOUT)], root,
+                                          SANDBOX_TIMEOUT, prefix)
+                if code is None:
+                    failures.append({"file": None, "kind": "timeout", "message": "Syntax/import check timed out"})
+                else:
+                    try:
+                        failures.extend(json.loads(output.strip().splitlines()[-1]))
+                    except (ValueError, IndexError):
+                        failures.append({"file": None, "kind": "crash", "message": output[-2000:]})
+
+            tests = [p for p in python if os.path.basename(p).startswith("test_") or p.endswith("_test.py")]
+            if tests and not failures:
+                code, output = await _run(
+                    ["-m", "pytest", "-q", "-rf", "--tb=short", "-p", "no:cacheprovider", *tests],
+                    root, SANDBOX_TIMEOUT, prefix
+                )
+                tests_run = code is not None and code != 5 and "No module named pytest" not in output
+                if code is None:
+                    failures.append({"file": None, "kind": "timeout", "message": "Tests timed out"})
+                elif tests_run and code != 0:
+                    for line in output.splitlines():
+                        match = re.match(r"FAILED (\S+?)::(\S+)(?: - (.*))?", line)
+                        if match:
+                            failures.append({
+                                "file": match.group(1), "kind": "test",
+                                "message": f"{match.group(2)}: {match.group(3) or 'failed'}"
+                            })
+                    if not failures:
+                        failures.append({"file": None, "kind": "test", "message": output[-2000:]})
+    return {
+        "status": "failed" if failures else "passed",
+        "failures": failures,
+        "tests_run": tests_run,
+        "duration": round(time.perf_counter() - started, 3)
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    '''
+    Renders sandbox failures as a "### <filename>" report for the fixer.
+    '''
+    by_file: Dict[str, List[str]] = {}
+    for failure in result["failures"]:
+        line = f" (line {failure['line']})" if failure.get("line") else ""
+        by_file.setdefault(failure["file"] or "project", []).append(
+            f"- [{failure['kind']}]{line} {failure['message']}"
+        )
+    return "\n\n".join(f"### {name}\n" + "\n".join(items) for name, items in by_file.items())
@@ -0,0 +1,174 @@
+"""Near-duplicate task cache.
+
+Task descriptions are embedded locally with a signed hashing vectorizer
+(word unigrams plus character trigrams) and kept in a NumPy matrix. The
+nearest stored task above the similarity threshold is then checked term by
+term: every content word on either side must match a word on the other.
+Words match when they are equal after stemming and abbreviation expansion,
+or when one is the other plus an inflection ("sort" / "sorted"), so "sort
+dicts by key" matches "sort dictionaries by a given key" but not "... in
+descending order", and "datetime" does not match "date". Numbers must be
+equal. A hit reuses the stored plan and code, so paraphrased requests skip
+the planner and coder calls. Entries are keyed by the ``tenant`` of the
+request and never served to another tenant. The index is size bounded with
+least-recently-used eviction.
+"""
+from typing import Any, Dict, List, Optional
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+from .fairshare import tenant
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.6"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+
+_WORD = re.compile(r"[a-z0-9_]+")
+_STOPWORDS = frozenset(
+    "a an the of by to for in on with and or from into that this is are be as it "
+    "given some please write create make implement build using use via".split()
+)
+
+# Shorthands spelled out before words are compared
+_ABBREVIATIONS = {
+    "dict": "dictionary", "str": "string", "int": "integer", "func": "function", "fn": "function",
+    "arg": "argument", "args": "argument", "param": "parameter", "params": "parameter",
+    "num": "number", "nums": "number", "max": "maximum", "min": "minimum", "len": "length",
+    "char": "character", "chars": "character", "config": "configuration", "db": "database",
+    "env": "environment", "repo": "repository", "doc": "document", "docs": "document",
+    "msg": "message", "info": "information", "impl": "implementation", "calc": "calculate"
+}
+# Endings by which a word may differ from its base ("sort" / "sorted" / "sorting")
+_INFLECTIONS = ("d", "ed", "ing", "er", "ly")
+
+
+def _stem(word: str) -> str:
+    if len(word) <= 4:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("es") and word[:-2].endswith(("s", "x", "z", "ch", "sh")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def terms(text: str) -> List[str]:
+    """Stemmed content words of ``text``, abbreviations spelled out."""
+    stemmed = (_stem(w) for w in _WORD.findall(text.lower()) if w not in _STOPWORDS)
+    return [_ABBREVIATIONS.get(w, w) for w in stemmed]
+
+
+def _match(x: str, y: str) -> bool:
+    if x == y:
+        return True
+    if any(c.isdigit() for c in x + y):
+        # "1000" is not "10000", nor "utf8" "utf16"
+        return False
+    short, long = sorted((x, y), key=len)
+    if len(short) < 3:
+        return False
+    # A final "e" drops before an ending ("reverse" / "reversing")
+    base = short if long.startswith(short) else short[:-1] if short.endswith("e") else None
+    return base is not None and long.startswith(base) and long[len(base):] in _INFLECTIONS
+
+
+def same_terms(a: List[str], b: List[str]) -> bool:
+    """Whether every word of ``a`` matches a word of ``b`` and vice versa."""
+    return all(any(_match(x, y) for y in b) for x in a) and all(any(_match(y, x) for x in a) for y in b)
+
+
+def embed(text: str, dim: int = SEMANTIC_CACHE_DIM) -> np.ndarray:
+    """L2-normalised hashing-vectorizer embedding of ``text``."""
+    vector = np.zeros(dim, dtype=np.float32)
+    words = terms(text)
+    features = [(f"w:{w}", 1.0) for w in words]
+    for w in words:
+        padded = f"<{w}>"
+        features.extend((f"c:{padded[i:i + 3]}", 0.5) for i in range(len(padded) - 2))
+    for feature, weight in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += weight if digest[4] & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    def __init__(self, max_entries: int = 1000, threshold: float = 0.6, dim: int = 1024):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.dim = dim
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.similarity_sum = 0.0
+
+    def _search(self, task: str, vector: np.ndarray, scope: str):
+        sims = self._vectors @ vector
+        candidates = np.flatnonzero(sims >= self.threshold)
+        words = terms(task)
+        for slot in candidates[np.argsort(-sims[candidates])]:
+            entry = self._entries[slot]
+            if entry is not None and entry["tenant"] == scope and same_terms(words, entry["terms"]):
+                return int(slot), float(sims[slot])
+        return None, 0.0
+
+    def lookup(self, task: str) -> Optional[Dict[str, Any]]:
+        """Return the stored fields of the current tenant's closest task above the threshold."""
+        vector = embed(task, self.dim)
+        with self._lock:
+            slot, similarity = self._search(task, vector, tenant.get())
+            if slot is None:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            self.similarity_sum += similarity
+            return dict(self._entries[slot], similarity=similarity)
+
+    def update(self, task: str, **fields: Any) -> None:
+        """Store ``fields`` for ``task``, merging into a near-duplicate entry if there is one."""
+        vector = embed(task, self.dim)
+        scope = tenant.get()
+        with self._lock:
+            slot, _ = self._search(task, vector, scope)
+            if slot is None:
+                free = [i for i, entry in enumerate(self._entries) if entry is None]
+                if free:
+                    slot = free[0]
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+                self._entries[slot] = {"task": task, "terms": terms(task), "tenant": scope}
+                self._vectors[slot] = vector
+            self._entries[slot].update(fields)
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": sum(entry is not None for entry in self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+            "mean_hit_similarity": self.similarity_sum / self.hits if self.hits else 0.0
+        }
+
+
+semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_DIM)
@@ -0,0 +1,172 @@
+"""Fast-path JSON extraction, repair and validation for model outputs.
+
+Model replies that should be a filename -> code JSON often arrive wrapped
+in markdown fences or prose, or cut off mid-string. The layers here are
+tried cheapest first: plain parse, extraction, repair of truncated JSON.
+Only when all of them fail is the model asked again, once.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import json
+import re
+
+_FENCE = re.compile(r"```[\w-]*\s*\n(.*?)(?:\n```|$)", re.S)
+
+# How each parse was resolved, for the benchmark and /metrics style reporting
+stats = {"direct": 0, "extracted": 0, "repaired": 0, "reasked": 0, "failed": 0}
+
+
+def extract_json(text: str) -> str:
+    '''
+    Strips code fences and surrounding prose, returning the JSON candidate.
+    '''
+    text = text.strip()
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start > 0:
+        text = text[start:]
+    try:
+        # A complete document followed by prose, which may hold brackets too
+        _, length = json.JSONDecoder().raw_decode(text)
+        return text[:length]
+    except ValueError:
+        pass
+    end = max(text.rfind("}"), text.rfind("]"))
+    if start != -1 and end != -1 and text[end + 1:].strip():
+        # Trailing prose, unless the bracket was inside a truncated string
+        try:
+            json.loads(repair_json(text[:end + 1]))
+            text = text[:end + 1]
+        except ValueError:
+            pass
+    return text
+
+
+def repair_json(text: str) -> str:
+    '''
+    Closes a truncated JSON document: unterminated strings, dangling keys and
+    open brackets. Trailing commas before a closing bracket are dropped.
+    '''
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = escaped = is_key = False
+    expecting_key = pending_key = False
+    key_start = -1
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                pending_key = is_key
+            continue
+        if ch.isspace():
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+            is_key = bool(stack) and stack[-1] == "}" and expecting_key
+            if is_key:
+                key_start = len(out)
+            expecting_key = pending_key = False
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            expecting_key = ch == "{"
+            pending_key = False
+        elif ch in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            if stack:
+                stack.pop()
+            expecting_key = pending_key = False
+        elif ch == ",":
+            expecting_key = bool(stack) and stack[-1] == "}"
+            pending_key = False
+        elif ch == ":":
+            # pending_key stays set until the value starts
+            pass
+        else:
+            pending_key = False
+        out.append(ch)
+
+    if (in_string and is_key) or (not in_string and pending_key):
+        # A key without a value cannot be completed; drop it
+        out = out[:key_start]
+    elif in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    while repaired.endswith(","):
+        repaired = repaired[:-1].rstrip()
+    return repaired + "".join(reversed(stack))
+
+
+def validate_code_map(value: Any) -> List[str]:
+    '''
+    Schema check for the coder/fixer output: {relative path: source string}.
+    Returns a list of problems, empty when valid.
+    '''
+    if not isinstance(value, dict):
+        return [f"expected a JSON object, got {type(value).__name__}"]
+    if not value:
+        return ["the JSON object is empty"]
+    errors = []
+    for name, code in value.items():
+        if not name.strip() or name.startswith(("/", "\\")) or ".." in name.split("/"):
+            errors.append(f"invalid filename {name!r}")
+        if not isinstance(code, str):
+            errors.append(f"value for {name!r} must be a string of code")
+    return errors
+
+
+def parse_code_map(text: str) -> Optional[Dict[str, str]]:
+    '''
+    Parses a filename -> code JSON without any model call, or returns None.
+    '''
+    files, _ = _parse(text)
+    return files
+
+
+def _parse(text: str) -> Tuple[Optional[Dict[str, str]], str]:
+    if not text:
+        return None, "empty response"
+    error = ""
+    for stage, candidate in (("direct", lambda: text), ("extracted", lambda: extract_json(text)),
+                             ("repaired", lambda: repair_json(extract_json(text)))):
+        try:
+            value = json.loads(candidate())
+        except ValueError as e:
+            error = str(e)
+            continue
+        problems = validate_code_map(value)
+        if not problems:
+            stats[stage] += 1
+            return value, ""
+        error = "; ".join(problems)
+    return None, error
+
+
+async def ensure_code_map(text: str, reask: Callable[[str], Awaitable[str]]) -> Optional[Dict[str, str]]:
+    '''
+    Parses ``text`` as a filename -> code map. If extraction and repair both
+    fail, ``reask`` is called once with a targeted correction prompt.
+    '''
+    files, error = _parse(text)
+    if files is not None:
+        return files
+    retry = await reask(
+        f"Your previous answer could not be used ({error}). Return ONLY a JSON object mapping "
+        f"relative filenames to file contents as strings. No markdown, no explanation.\n\n"
+        f"Previous answer:\n{text[:4000]}"
+    )
+    files, _ = _parse(retry)
+    if files is not None:
+        stats["reasked"] += 1
+    else:
+        stats["failed"] += 1
+    return files
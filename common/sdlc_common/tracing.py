@@ -0,0 +1,200 @@
+"""Sampled tracing spans for the pipeline hot path.
+
+A span records its duration plus attributes such as token counts, queue
+wait and cache hits. The sampling decision is taken once per trace at the
+root span, and children inherit it. An unsampled trace costs one random
+draw and a context-variable lookup per span. Finished spans are exported in
+batches from a background thread, either as JSON lines (TRACE_EXPORT=jsonl)
+or to an OTLP/HTTP collector (TRACE_EXPORT=otlp).
+"""
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+# "", "jsonl" or "otlp"; tracing is off when empty
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE = os.getenv("TRACE_SERVICE", "sdlc")
+_BATCH_SIZE = 256
+_FLUSH_INTERVAL = 1.0
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error")
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, key: str, value: float) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration": (self.end_ns - self.start_ns) / 1e9,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    sampled = False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, key: str, value: float) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+_current: ContextVar[Optional[Any]] = ContextVar("current_span", default=None)
+
+
+def current_span():
+    """The innermost active span, or a no-op span."""
+    return _current.get() or NOOP
+
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Open a child of the current span, or a new sampled-or-not root."""
+    parent = _current.get()
+    if parent is NOOP or (parent is None and (not TRACE_EXPORT or random.random() >= TRACE_SAMPLE_RATE)):
+        # Unsampled: children see NOOP and skip all work
+        token = _current.set(NOOP)
+        try:
+            yield NOOP
+        finally:
+            _current.reset(token)
+        return
+
+    current = Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                   parent.span_id if parent else None, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        _exporter.submit(current)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON payload for ``spans``."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE}}]},
+        "scopeSpans": [{
+            "scope": {"name": "sdlc.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1}
+            } for s in spans]
+        }]
+    }]}
+
+
+class _Exporter:
+    def __init__(self):
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, finished: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _FLUSH_INTERVAL
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+            except Exception as e:
+                logger.warning(f"Trace export failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def export(batch: List[Span]) -> None:
+        if TRACE_EXPORT == "otlp":
+            request = urllib.request.Request(
+                OTLP_ENDPOINT, data=json.dumps(to_otlp(batch)).encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+        else:
+            with open(TRACE_FILE, "a") as f:
+                f.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch))
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until every submitted span has been exported (benchmarks, shutdown)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+_exporter = _Exporter()
+flush = _exporter.flush